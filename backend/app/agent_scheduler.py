@@ -0,0 +1,166 @@
+"""
+Agent Scheduler - จำกัดจำนวนการเรียก Gemini agent พร้อมกัน จัดคิวแบบยุติธรรมต่อผู้ใช้ และบังคับ deadline
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AgentTimeoutError(asyncio.TimeoutError):
+    """งานของ agent (รวมเวลารอคิว) ใช้เวลาเกิน deadline และถูกยกเลิกแล้ว"""
+
+
+class AgentQueueFullError(Exception):
+    """คิวของ agent เต็ม"""
+
+
+def _percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class AgentScheduler:
+    """Scheduler บน event loop หลักสำหรับ `agent_executor.ainvoke`
+
+    - ทำงานพร้อมกันได้ไม่เกิน `max_concurrency` งาน ที่เหลือรอในคิว
+    - คิวแยกต่อผู้ใช้และหมุนเวียนแบบ round-robin ผู้ใช้ที่ส่งข้อความรัวๆ จึงไม่แย่งคิวผู้ใช้อื่น
+    - `deadline` นับตั้งแต่ส่งงานเข้าคิว ถ้าเกินจะยกเลิกงาน (cancel coroutine ของ agent) แล้ว raise AgentTimeoutError
+    """
+
+    def __init__(self, max_concurrency: int = 4, deadline: float = 60.0, max_queue: int = 200,
+                 history_size: int = 500):
+        self.max_concurrency = max_concurrency
+        self.deadline = deadline
+        self.max_queue = max_queue
+        self._running = 0
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.queue_waits: Deque[float] = deque(maxlen=history_size)
+        self.run_times: Deque[float] = deque(maxlen=history_size)
+
+    # ---------------------------------------------------------------
+    # Slots
+    # ---------------------------------------------------------------
+
+    def _acquire_nowait(self) -> bool:
+        if self._running < self.max_concurrency and not self._queued:
+            self._running += 1
+            return True
+        return False
+
+    def _release(self):
+        self._running -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """มอบ slot ว่างให้งานถัดไป โดยวนผู้ใช้แบบ round-robin"""
+        while self._running < self.max_concurrency and self._queues:
+            user_id, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            self._queued -= 1
+            # Move the user to the back of the rotation (or drop it when empty)
+            del self._queues[user_id]
+            if queue:
+                self._queues[user_id] = queue
+            if waiter.done():
+                continue  # cancelled while waiting
+            self._running += 1
+            waiter.set_result(None)
+
+    def _remove_waiter(self, user_id: str, waiter: asyncio.Future):
+        queue = self._queues.get(user_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[user_id]
+
+    # ---------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------
+
+    async def run(self, user_id: str, factory: Callable[[], Awaitable[T]], deadline: Optional[float] = None) -> T:
+        """รอคิวแล้วรัน `factory()` (เช่น `lambda: agent_executor.ainvoke(...)`) ภายใน deadline"""
+        deadline = self.deadline if deadline is None else deadline
+        submitted = time.monotonic()
+        self.submitted += 1
+
+        if not self._acquire_nowait():
+            if self._queued >= self.max_queue:
+                self.rejected += 1
+                raise AgentQueueFullError(f"Agent queue is full ({self._queued} waiting)")
+            waiter = asyncio.get_running_loop().create_future()
+            self._queues.setdefault(user_id, deque()).append(waiter)
+            self._queued += 1
+            try:
+                await asyncio.wait_for(waiter, deadline)
+            except asyncio.TimeoutError:
+                self._remove_waiter(user_id, waiter)
+                self.timeouts += 1
+                self.queue_waits.append(time.monotonic() - submitted)
+                raise AgentTimeoutError(f"Agent run for {user_id} timed out after {deadline:g}s in queue")
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release()  # slot was granted just before the cancellation
+                else:
+                    self._remove_waiter(user_id, waiter)
+                raise
+
+        started = time.monotonic()
+        self.queue_waits.append(started - submitted)
+        try:
+            result = await asyncio.wait_for(factory(), max(0.0, deadline - (started - submitted)))
+            self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"⏱️ Agent run for {user_id} cancelled after {time.monotonic() - submitted:.1f}s")
+            raise AgentTimeoutError(f"Agent run for {user_id} timed out after {deadline:g}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.run_times.append(time.monotonic() - started)
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = list(self.queue_waits)
+        runs = list(self.run_times)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "deadline_seconds": self.deadline,
+            "running": self._running,
+            "queued": self._queued,
+            "queued_users": len(self._queues),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "queue_wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p95": round(_percentile(waits, 0.95) * 1000, 1),
+                "max": round(max(waits) * 1000, 1) if waits else 0.0,
+            },
+            "run_ms": {
+                "avg": round(sum(runs) / len(runs) * 1000, 1) if runs else 0.0,
+                "p95": round(_percentile(runs, 0.95) * 1000, 1),
+            },
+        }
@@ -0,0 +1,243 @@
+"""
+Answer Cache - แคชคำตอบของ agent ตามคำถามที่ normalize แล้ว (ตัดคำลงท้ายภาษาไทย ช่องว่าง และเครื่องหมาย)
+"""
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Sequence, Set, Tuple
+
+try:
+    from .ttl_cache import TTLCache
+except ImportError:
+    from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Polite particles and fillers that do not change the meaning of a question (longest first)
+THAI_TRAILING_PARTICLES = sorted([
+    "ครับผม", "คร้าบ", "ครับ", "คับ", "ค้าบ", "ค่ะ", "คะ", "ค่า", "จ้า", "จ้ะ", "จ๊ะ", "ฮะ",
+    "นะคะ", "นะครับ", "นะ", "น้า", "หน่อย", "ด้วย", "อ่ะ", "อะ", "เหรอ", "หรอ", "ไหม", "มั้ย", "มั๊ย",
+], key=len, reverse=True)
+THAI_LEADING_FILLERS = sorted([
+    "รบกวนสอบถาม", "ขอสอบถาม", "สอบถาม", "รบกวนถาม", "ขอถาม", "อยากทราบว่า", "อยากทราบ", "อยากถามว่า",
+    "ขอทราบ", "รบกวน", "ขอโทษนะ", "สวัสดีครับ", "สวัสดีค่ะ",
+], key=len, reverse=True)
+
+# Tools whose result depends on the user or that have side effects - answers using them are not cached
+UNCACHEABLE_TOOLS = frozenset({
+    "switch_to_manual_mode", "query_conversation_history", "summarize_conversation", "check_leave_balance",
+})
+
+_NON_WORD_RE = re.compile(r"[^0-9a-z\u0e00-\u0e7f]+")
+_REPEAT_RE = re.compile(r"(.)\1{2,}")
+
+
+def normalize_question(text: str) -> str:
+    """ทำให้คำถามที่ต่างกันแค่คำลงท้าย ช่องว่าง ตัวพิมพ์ หรือเครื่องหมาย ได้ key เดียวกัน"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = text.replace("ๆ", "")
+    text = _NON_WORD_RE.sub("", text)   # whitespace, punctuation, emoji
+    text = _REPEAT_RE.sub(r"\1", text)  # "ครับบบบ" -> "ครับ"
+    changed = True
+    while changed and text:
+        changed = False
+        for particle in THAI_TRAILING_PARTICLES:
+            if text.endswith(particle) and len(text) > len(particle):
+                text = text[:-len(particle)]
+                changed = True
+                break
+        for filler in THAI_LEADING_FILLERS:
+            if text.startswith(filler) and len(text) > len(filler):
+                text = text[len(filler):]
+                changed = True
+                break
+    return text
+
+
+def estimate_tokens(text: str) -> int:
+    """ประมาณจำนวน token แบบหยาบ (~3 ตัวอักษรต่อ token สำหรับข้อความไทยปนอังกฤษ)"""
+    return math.ceil(len(text or "") / 3)
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CachedAnswer(NamedTuple):
+    text: str
+    latency: float      # seconds the original agent run took
+    tokens: int         # estimated prompt + completion tokens of the original run
+    created_at: float
+
+
+class AnswerCache:
+    """แคชคำตอบที่ไม่ขึ้นกับผู้ใช้ (ไม่มี chat history และไม่ได้ใช้ tool ที่มีผลข้างเคียง)
+
+    - key คือคำถามที่ผ่าน `normalize_question()`
+    - ถ้า `similarity` > 0 จะยอมรับคำถามที่ใกล้เคียงกัน (Jaccard ของ character trigram >= similarity)
+    - แคชทั้งหมดจะถูกล้างเมื่อไฟล์ใน `source_files` เปลี่ยน (ตรวจ mtime ทุก `check_interval` วินาที)
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_size: int = 2000, similarity: float = 0.0,
+                 source_files: Iterable[str] = (), prompt_tokens: int = 0, check_interval: float = 5.0,
+                 min_length: int = 2):
+        self.similarity = similarity
+        self.source_files = list(source_files)
+        self.prompt_tokens = prompt_tokens
+        self.check_interval = check_interval
+        self.min_length = min_length
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._index: Dict[str, Set[str]] = defaultdict(set)
+        self._indexed: Set[str] = set()
+        self._source_mtimes = self._read_mtimes()
+        self._checked_at = time.monotonic()
+
+        # Metrics
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.uncacheable = 0
+        self.invalidations = 0
+        self.saved_tokens = 0
+        self.saved_seconds = 0.0
+
+    # ---------------------------------------------------------------
+    # Source file invalidation
+    # ---------------------------------------------------------------
+
+    def _read_mtimes(self) -> Tuple[Optional[float], ...]:
+        mtimes = []
+        for path in self.source_files:
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _check_sources(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        mtimes = self._read_mtimes()
+        if mtimes != self._source_mtimes:
+            self._source_mtimes = mtimes
+            self.invalidate()
+            logger.info("🔄 Answer cache cleared: HR data files changed")
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+            self._index.clear()
+            self._indexed.clear()
+            self.invalidations += 1
+
+    # ---------------------------------------------------------------
+    # Lookup / store
+    # ---------------------------------------------------------------
+
+    def get(self, question: str) -> Optional[str]:
+        self._check_sources()
+        key = normalize_question(question)
+        if len(key) < self.min_length:
+            return None
+        entry = self._cache.get(key)
+        near = False
+        if entry is None and self.similarity > 0:
+            entry = self._nearest(key)
+            near = entry is not None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if near:
+            self.near_hits += 1
+        else:
+            self.hits += 1
+        self.saved_tokens += entry.tokens
+        self.saved_seconds += entry.latency
+        return entry.text
+
+    def _nearest(self, key: str) -> Optional[CachedAnswer]:
+        grams = _trigrams(key)
+        with self._lock:
+            candidates = defaultdict(int)
+            for gram in grams:
+                for other in self._index.get(gram, ()):
+                    candidates[other] += 1
+        best, best_score = None, self.similarity
+        for other, shared in candidates.items():
+            score = shared / (len(grams) + len(_trigrams(other)) - shared)
+            if score >= best_score:
+                entry = self._cache.get(other)
+                if entry is None:
+                    self._unindex(other)  # expired or evicted
+                    continue
+                best, best_score = entry, score
+        return best
+
+    def put(self, question: str, answer: str, latency: float, tools_used: Sequence[str] = ()) -> bool:
+        """เก็บคำตอบ - คืน False ถ้าคำตอบใช้ tool ที่ขึ้นกับผู้ใช้ หรือคำถามสั้นเกินไป"""
+        key = normalize_question(question)
+        if len(key) < self.min_length or not answer:
+            return False
+        if UNCACHEABLE_TOOLS.intersection(tools_used):
+            self.uncacheable += 1
+            return False
+        tokens = self.prompt_tokens + estimate_tokens(question) + estimate_tokens(answer)
+        self._cache.set(key, CachedAnswer(answer, latency, tokens, time.time()))
+        self.stores += 1
+        if self.similarity > 0:
+            self._add_to_index(key)
+        return True
+
+    def _add_to_index(self, key: str):
+        with self._lock:
+            if key in self._indexed:
+                return
+            # Drop index entries of evicted answers once the index outgrows the cache
+            if len(self._indexed) > 2 * max(len(self._cache), 1):
+                for stale in [k for k in self._indexed if k not in self._cache]:
+                    self._unindex_locked(stale)
+            self._indexed.add(key)
+            for gram in _trigrams(key):
+                self._index[gram].add(key)
+
+    def _unindex(self, key: str):
+        with self._lock:
+            self._unindex_locked(key)
+
+    def _unindex_locked(self, key: str):
+        if key not in self._indexed:
+            return
+        self._indexed.discard(key)
+        for gram in _trigrams(key):
+            keys = self._index.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[gram]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "uncacheable": self.uncacheable,
+            "invalidations": self.invalidations,
+            "saved_tokens_estimate": self.saved_tokens,
+            "saved_latency_seconds": round(self.saved_seconds, 2),
+            "similarity": self.similarity,
+            "cache": self._cache.stats(),
+        }
@@ -0,0 +1,134 @@
+"""
+Broadcast Engine - ส่งข้อความถึงผู้ใช้จำนวนมากด้วย LINE multicast (ครั้งละไม่เกิน 500 คน) พร้อมติดตามความคืบหน้า
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from .outbox import Outbox
+except ImportError:
+    from outbox import Outbox
+
+logger = logging.getLogger(__name__)
+
+# LINE multicast accepts at most 500 recipients per request
+MAX_MULTICAST_RECIPIENTS = 500
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+PARTIAL = "partial"
+FAILED = "failed"
+
+
+class BroadcastJob:
+    """สถานะของการส่ง broadcast หนึ่งครั้ง"""
+
+    def __init__(self, job_id: str, recipients: List[str], chunk_size: int, text: Optional[str]):
+        self.job_id = job_id
+        self.text = text
+        self.total = len(recipients)
+        self.chunks = [recipients[i:i + chunk_size] for i in range(0, len(recipients), chunk_size)]
+        self.status = QUEUED
+        self.sent = 0
+        self.failed = 0
+        self.chunks_done = 0
+        self.errors: List[str] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        finished = self.finished_at or time.time()
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": self.total,
+            "sent": self.sent,
+            "failed": self.failed,
+            "chunks": len(self.chunks),
+            "chunks_done": self.chunks_done,
+            "progress": round((self.sent + self.failed) / self.total, 4) if self.total else 1.0,
+            "errors": self.errors[-10:],
+            "created_at": self.created_at,
+            "duration_seconds": round(finished - self.started_at, 3) if self.started_at else None,
+        }
+
+
+class BroadcastEngine:
+    """แบ่งผู้รับเป็นชุดละ `chunk_size` แล้วส่งผ่าน outbox (multicast) พร้อมกันไม่เกิน `concurrency` ชุด
+
+    rate limit ของ multicast ถูกคุมโดย token bucket ใน LineApiClient อยู่แล้ว
+    และ outbox จะบันทึก chat_messages ของแต่ละชุดด้วย bulk insert หลังส่งสำเร็จ
+    """
+
+    def __init__(self, outbox: Outbox, chunk_size: int = MAX_MULTICAST_RECIPIENTS, concurrency: int = 4,
+                 max_jobs: int = 100):
+        self.outbox = outbox
+        self.chunk_size = max(1, min(chunk_size, MAX_MULTICAST_RECIPIENTS))
+        self.concurrency = concurrency
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, BroadcastJob]" = OrderedDict()
+        self._tasks = set()
+
+    def start(self, user_ids: Iterable[str], messages, text: Optional[str] = None) -> BroadcastJob:
+        """สร้าง job และเริ่มส่งเบื้องหลัง (เรียกจาก event loop) - `text` คือข้อความที่บันทึกลง chat_messages"""
+        recipients = [uid for uid in dict.fromkeys(user_ids) if uid]
+        job = BroadcastJob(uuid.uuid4().hex[:12], recipients, self.chunk_size, text)
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+        task = asyncio.create_task(self._run(job, messages))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        logger.info(f"📣 Broadcast {job.job_id} started: {job.total} recipients in {len(job.chunks)} chunks")
+        return job
+
+    def get(self, job_id: str) -> Optional[BroadcastJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[BroadcastJob]:
+        return list(reversed(self._jobs.values()))
+
+    async def _run(self, job: BroadcastJob, messages):
+        job.status = RUNNING
+        job.started_at = time.time()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send_chunk(chunk: List[str]):
+            async with semaphore:
+                try:
+                    await self.outbox.multicast(chunk, messages, record_text=job.text)
+                    job.sent += len(chunk)
+                except Exception as e:
+                    job.failed += len(chunk)
+                    job.errors.append(str(e))
+                    logger.error(f"Broadcast {job.job_id} chunk of {len(chunk)} failed: {e}")
+                finally:
+                    job.chunks_done += 1
+
+        await asyncio.gather(*(send_chunk(chunk) for chunk in job.chunks))
+        job.finished_at = time.time()
+        if job.failed == 0:
+            job.status = COMPLETED
+        else:
+            job.status = PARTIAL if job.sent else FAILED
+        logger.info(f"📣 Broadcast {job.job_id} {job.status}: {job.sent} sent, {job.failed} failed "
+                    f"in {job.finished_at - job.started_at:.1f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        jobs = list(self._jobs.values())
+        return {
+            "chunk_size": self.chunk_size,
+            "concurrency": self.concurrency,
+            "jobs": len(jobs),
+            "running": sum(1 for job in jobs if job.status in (QUEUED, RUNNING)),
+            "recipients_sent": sum(job.sent for job in jobs),
+            "recipients_failed": sum(job.failed for job in jobs),
+        }
@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import date
-from .models import LineUser, ChatMessage, EventLog
+from typing import List, Optional
+from .models import LineUser, ChatMessage, EventLog, ConversationSummary
 from .schemas import LineUserSchema, ChatMessageSchema
 from .database import SessionLocal
 
@@ -68,9 +69,54 @@ def create_chat_message(db: Session, line_user_id: str, message: str, is_from_us
         db.rollback()
         raise e
 
+def create_chat_messages_bulk(db: Session, line_user_ids: List[str], message: str, is_from_user: bool):
+    """Insert the same message for many users in one statement (used by broadcasts)"""
+    try:
+        db.bulk_insert_mappings(ChatMessage, [
+            {"line_user_id": line_user_id, "message": message, "is_from_user": is_from_user}
+            for line_user_id in line_user_ids
+        ])
+        db.commit()
+        return len(line_user_ids)
+    except Exception as e:
+        print(f"Error creating {len(line_user_ids)} chat messages: {e}")
+        db.rollback()
+        raise e
+
 def get_chat_history(db: Session, line_user_id: str):
     return db.query(ChatMessage).filter(ChatMessage.line_user_id == line_user_id).all()
 
+def get_recent_messages(db: Session, line_user_id: str, limit: int = 10):
+    """Last `limit` messages of a user in chronological order (reads only `limit` rows)"""
+    messages = db.query(ChatMessage).filter(ChatMessage.line_user_id == line_user_id) \
+        .order_by(ChatMessage.id.desc()).limit(limit).all()
+    return list(reversed(messages))
+
+def get_messages_since(db: Session, line_user_id: str, after_id: int, limit: int = 200):
+    """Messages of a user with id > after_id, oldest first (incremental reads from a high-water mark)"""
+    return db.query(ChatMessage).filter(ChatMessage.line_user_id == line_user_id, ChatMessage.id > after_id) \
+        .order_by(ChatMessage.id).limit(limit).all()
+
+def get_conversation_summary(db: Session, line_user_id: str):
+    return db.query(ConversationSummary).filter(ConversationSummary.line_user_id == line_user_id).first()
+
+def save_conversation_summary(db: Session, line_user_id: str, summary: str, last_message_id: int, new_messages: int):
+    try:
+        row = get_conversation_summary(db, line_user_id)
+        if row is None:
+            row = ConversationSummary(line_user_id=line_user_id, summary="", last_message_id=0, message_count=0)
+            db.add(row)
+        row.summary = summary
+        row.last_message_id = last_message_id
+        row.message_count = (row.message_count or 0) + new_messages
+        db.commit()
+        db.refresh(row)
+        return row
+    except Exception as e:
+        print(f"Error saving conversation summary for {line_user_id}: {e}")
+        db.rollback()
+        raise e
+
 def create_event_log(db: Session, line_user_id: str, event_type: str):
     log = EventLog(line_user_id=line_user_id, event_type=event_type)
     db.add(log)
@@ -92,4 +138,11 @@ def get_dashboard_stats(db: Session):
     }
 
 def get_all_users(db: Session):
-    return db.query(LineUser).all()
\ No newline at end of file
+    return db.query(LineUser).all()
+
+def get_active_user_ids(db: Session, mode: Optional[str] = None):
+    """LINE ids of users who have not blocked the bot, optionally filtered by mode"""
+    query = db.query(LineUser.line_id).filter(LineUser.blocked_at.is_(None))
+    if mode:
+        query = query.filter(LineUser.mode == mode)
+    return [line_id for (line_id,) in query.all()]
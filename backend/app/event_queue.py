@@ -0,0 +1,164 @@
+"""
+Webhook Event Queue - คิวประมวลผล LINE webhook events แบบ asynchronous
+"""
+import asyncio
+import logging
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookEventQueue:
+    """คิวภายใน process + worker pool ของ asyncio สำหรับรัน event handler (ที่เป็น blocking)
+
+    webhook จะ `put()` event ลงคิวแล้วตอบ 200 ทันที ส่วน worker แต่ละตัวจะดึง event ออกมา
+    แล้วเรียก `dispatch(event)` บน thread pool เพื่อไม่ให้ Supabase / LINE / Gemini บล็อก event loop
+    """
+
+    def __init__(self, dispatch: Callable[[Any], None], workers: int = 4, max_size: int = 1000,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self.dispatch = dispatch
+        self.workers = max(1, workers)
+        self.max_size = max_size
+        self._executor = executor or ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix="line-webhook")
+        self._owns_executor = executor is None
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._started_at: Optional[float] = None
+
+        # Metrics
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_workers = 0
+        self._busy_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def _create_queues(self) -> List[asyncio.Queue]:
+        """คิวเดียวที่ worker ทุกตัวใช้ร่วมกัน"""
+        return [asyncio.Queue(maxsize=self.max_size)]
+
+    def _select_queue(self, event: Any) -> asyncio.Queue:
+        return self._queues[0]
+
+    async def start(self):
+        """สร้างคิวและ worker tasks (ต้องเรียกภายใน event loop)"""
+        if self.running:
+            return
+        self._queues = self._create_queues()
+        self._started_at = time.monotonic()
+        self._tasks = [
+            asyncio.create_task(self._worker(i, self._queues[i % len(self._queues)]))
+            for i in range(self.workers)
+        ]
+        logger.info(f"✅ {self.__class__.__name__} started with {self.workers} workers (max size {self.max_size})")
+
+    async def put(self, event: Any):
+        """ใส่ event ลงคิว (รอเมื่อคิวเต็ม เพื่อเป็น backpressure)"""
+        await self._select_queue(event).put((time.monotonic(), event))
+        self.enqueued += 1
+
+    async def _worker(self, index: int, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            enqueued_at, event = await queue.get()
+            started = time.monotonic()
+            wait = started - enqueued_at
+            self._wait_seconds += wait
+            self._max_wait_seconds = max(self._max_wait_seconds, wait)
+            self.busy_workers += 1
+            try:
+                await loop.run_in_executor(self._executor, self.dispatch, event)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Webhook worker {index} failed to process event: {e}")
+            finally:
+                self.busy_workers -= 1
+                self._busy_seconds += time.monotonic() - started
+                queue.task_done()
+
+    async def stop(self, timeout: float = 10.0):
+        """รอให้ event ที่ค้างในคิวประมวลผลเสร็จ (ไม่เกิน timeout) แล้วหยุด workers"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues)), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Webhook queue drain timed out with {self.queue_depth} events pending")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+        logger.info("🛑 Webhook event queue stopped")
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def stats(self) -> Dict[str, Any]:
+        """สถิติสำหรับปรับขนาด concurrency ของ Cloud Run"""
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        completed = self.processed + self.failed
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "busy_workers": self.busy_workers,
+            "queue_depth": self.queue_depth,
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "utilization": round(self._busy_seconds / (uptime * self.workers), 4) if uptime else 0.0,
+            "avg_wait_ms": round(self._wait_seconds / completed * 1000, 2) if completed else 0.0,
+            "max_wait_ms": round(self._max_wait_seconds * 1000, 2),
+        }
+
+
+def event_source_key(event: Any) -> str:
+    """คีย์สำหรับจัดลำดับ event: user_id ก่อน แล้วจึง group_id / room_id"""
+    source = getattr(event, "source", None)
+    for attr in ("user_id", "group_id", "room_id"):
+        value = getattr(source, attr, None)
+        if value:
+            return value
+    return ""
+
+
+class KeyedEventDispatcher(WebhookEventQueue):
+    """กระจาย event ลง N lanes ตาม hash ของผู้ส่ง
+
+    แต่ละ lane มี worker เดียว ดังนั้น event ของผู้ใช้คนเดียวกันจะถูกประมวลผลตามลำดับเสมอ
+    (โหมด bot/manual และประวัติแชทขึ้นกับลำดับนี้) ขณะที่ผู้ใช้ต่างคนกันทำงานพร้อมกันได้
+    """
+
+    def __init__(self, dispatch: Callable[[Any], None], lanes: int = 8, max_size: int = 1000,
+                 key: Optional[Callable[[Any], str]] = None, executor: Optional[ThreadPoolExecutor] = None):
+        super().__init__(dispatch, workers=lanes, max_size=max_size, executor=executor)
+        self.key = key or event_source_key
+
+    def lane_for(self, key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % self.workers
+
+    def _create_queues(self) -> List[asyncio.Queue]:
+        return [asyncio.Queue(maxsize=self.max_size) for _ in range(self.workers)]
+
+    def _select_queue(self, event: Any) -> asyncio.Queue:
+        return self._queues[self.lane_for(self.key(event))]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["lanes"] = self.workers
+        stats["lane_depths"] = [q.qsize() for q in self._queues]
+        return stats
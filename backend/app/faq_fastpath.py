@@ -0,0 +1,188 @@
+"""
+FAQ Fast Path - ตอบคำถามจาก FAQ โดยตรง (ไม่เรียก Gemini) เมื่อผลค้นหาอันดับหนึ่งมีคะแนนและระยะห่างจากอันดับสองถึงเกณฑ์
+"""
+import logging
+import os
+import time
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional
+
+try:
+    from .answer_cache import normalize_question
+    from .hr_corpus import CorpusSnapshot, HRCorpus, hr_corpus
+    from .search_index import STOPWORDS
+except ImportError:
+    from answer_cache import normalize_question
+    from hr_corpus import CorpusSnapshot, HRCorpus, hr_corpus
+    from search_index import STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FAQ_PATH = os.path.join("data", "json", "faq.json")
+MAX_TEXT_LENGTH = 5000  # LINE text message limit
+CONTACT_LABELS = {
+    "phone": "📞 โทร",
+    "hotline": "☎️ สายด่วน",
+    "email": "📧 อีเมล",
+    "website": "🌐 เว็บไซต์",
+    "facebook": "📘 Facebook",
+    "line": "💬 LINE",
+    "app": "📱 แอป",
+}
+
+# Special commands of HR_SYSTEM_PROMPT - always left to the agent
+SPECIAL_COMMANDS = ("ติดต่อ HR", "ดาวน์โหลดแบบฟอร์ม", "แชทกับเจ้าหน้าที่")
+
+# Words that appear all over an HR FAQ; a question made only of these ("hr", "ข้าราชการ", "เบอร์ติดต่อ HR")
+# does not say which FAQ it wants
+GENERIC_TERMS = frozenset((
+    "hr", "moj", "ลา", "ติดต่อ", "เบอร์", "โทร", "เบอร์โทร", "โทรศัพท์", "อีเมล", "ขอ", "ดู", "ทำ", "ยื่น", "ข้อมูล",
+    "ระบบ", "งาน", "กอง", "กลุ่มงาน", "สำนักงาน", "ปลัด", "กระทรวง", "ยุติธรรม", "บุคคล", "บุคลากร", "เอกสาร",
+    "แบบฟอร์ม", "ข้าราชการ", "พนักงานราชการ", "ลูกจ้าง", "ราชการ", "เงินเดือน", "ค่าตอบแทน", "สวัสดิการ",
+))
+
+# Rejections decided before the score thresholds (faq_calibration.py treats them as "not answered")
+GATE_REASONS = frozenset(("special_command", "too_generic", "ungrounded"))
+
+
+class FaqDecision(NamedTuple):
+    answered: bool
+    reason: str                 # "answered", "no_match", "low_score", "low_margin" or one of GATE_REASONS
+    score: float
+    margin: float               # top score minus runner-up score
+    result: Optional[Dict[str, Any]]
+
+
+def format_faq_answer(result: Dict[str, Any]) -> str:
+    """จัดรูปแบบคำตอบ FAQ เป็นข้อความ LINE (คำตอบ + ลิงก์ + ช่องทางติดต่อ)"""
+    answer = (result.get("answer") or "").strip()
+    lines = [answer]
+
+    # Links already written in the answer are not repeated
+    links = []
+    if result.get("link") and result["link"] not in answer:
+        links.append(f"🔗 {result['link']}")
+    for link in result.get("links") or []:
+        url = link.get("url", "")
+        if url and url not in answer:
+            links.append(f"🔗 {link.get('name', '')}: {url}" if link.get("name") else f"🔗 {url}")
+    if links:
+        lines.append("")
+        lines.extend(links)
+
+    contacts = result.get("contacts") or {}
+    if contacts:
+        lines.append("")
+        for key, value in contacts.items():
+            value = ", ".join(value) if isinstance(value, list) else str(value)
+            if value and value not in answer:
+                lines.append(f"{CONTACT_LABELS.get(key, key)}: {value}")
+
+    text = "\n".join(lines).strip()
+    return text if len(text) <= MAX_TEXT_LENGTH else text[:MAX_TEXT_LENGTH - 1] + "…"
+
+
+class FaqFastPath:
+    """ตัดสินใจว่าจะตอบจาก FAQ ทันทีหรือส่งต่อให้ agent
+
+    ตอบทันทีเมื่อ `score >= min_score` และ `score - อันดับสอง >= min_margin`
+    (ใช้ `scripts/benchmarks/faq_calibration.py` หาค่าที่เหมาะสม) ไฟล์ FAQ มาจาก hr_corpus ที่โหลดใหม่เมื่อไฟล์เปลี่ยน
+
+    คะแนนแบบเดิมนับคำที่เป็น substring (เช่น "hr" ใน "น้อง HR Moj") จึงต้องผ่านเงื่อนไขก่อนเสมอ:
+    ไม่ใช่ special command, มีคำที่เจาะจง (ไม่ใช่แค่ GENERIC_TERMS) และคำที่เจาะจงอย่างน้อย `min_coverage`
+    ต้องเป็นคำ (หลังตัดคำ) ใน keywords หรือคำถามของ FAQ อันดับหนึ่ง
+    """
+
+    def __init__(self, faq_path: str = DEFAULT_FAQ_PATH, min_score: float = 16.0, min_margin: float = 3.0,
+                 corpus: Optional[HRCorpus] = None, min_coverage: float = 0.5,
+                 special_commands=SPECIAL_COMMANDS, generic_terms: FrozenSet[str] = GENERIC_TERMS):
+        self.faq_path = faq_path
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.min_coverage = min_coverage
+        self.corpus = corpus or hr_corpus
+        self.special_commands = frozenset(normalize_question(c) for c in special_commands)
+        self.generic_terms = generic_terms
+        self._grounding = (None, {})    # (snapshot, {faq id: keyword/question terms})
+
+        # Metrics
+        self.lookups = 0
+        self.answered = 0
+        self.rejected = {"no_match": 0, "low_score": 0, "low_margin": 0,
+                         "special_command": 0, "too_generic": 0, "ungrounded": 0}
+        self.total_ms = 0.0
+
+    def _entry_terms(self, snapshot: CorpusSnapshot) -> Dict[str, FrozenSet[str]]:
+        """คำ (หลังตัดคำ) ใน keywords และคำถามของแต่ละ FAQ - สร้างใหม่เมื่อ snapshot เปลี่ยน"""
+        cached_snapshot, terms = self._grounding
+        if cached_snapshot is snapshot:
+            return terms
+        segmenter = snapshot.index.segmenter
+        terms = {}
+        for entry in snapshot.entries:
+            words = set()
+            for text in list(entry.keywords or ()) + list(entry.questions or ()):
+                words.update(segmenter.tokens(text))
+            terms[entry.result.get("id")] = frozenset(words)
+        self._grounding = (snapshot, terms)
+        return terms
+
+    def _gate(self, question: str, top: Dict[str, Any]) -> Optional[str]:
+        """เหตุผลที่ไม่ควรตอบ top จาก FAQ (None = ผ่าน)"""
+        snapshot = self.corpus.snapshot(self.faq_path)
+        if snapshot is None or snapshot.index is None:
+            return None
+        words = [w for w in snapshot.index.segmenter.segment(question)
+                 if w not in STOPWORDS and not (len(w) == 1 and "\u0e00" <= w <= "\u0e7f")]
+        specific = [w for w in words if w not in self.generic_terms]
+        if not specific:
+            return "too_generic"
+        grounded = self._entry_terms(snapshot).get(top.get("id"), frozenset())
+        if sum(1 for w in specific if w in grounded) / len(specific) < self.min_coverage:
+            return "ungrounded"
+        return None
+
+    def evaluate(self, question: str, results: Optional[List[Dict[str, Any]]] = None) -> FaqDecision:
+        """ให้คะแนนคำถามกับ FAQ แล้วตัดสินตามเกณฑ์ (ไม่นับสถิติ - ใช้ใน calibration ได้)"""
+        if normalize_question(question) in self.special_commands:
+            return FaqDecision(False, "special_command", 0.0, 0.0, None)
+        if results is None:
+            results = [r for r in self.corpus.search(self.faq_path, question) or [] if r.get("type") == "faq"]
+        if not results:
+            return FaqDecision(False, "no_match", 0.0, 0.0, None)
+        top = results[0]
+        margin = top["score"] - (results[1]["score"] if len(results) > 1 else 0.0)
+        gate = self._gate(question, top)
+        if gate is not None:
+            return FaqDecision(False, gate, top["score"], margin, top)
+        if top["score"] < self.min_score:
+            return FaqDecision(False, "low_score", top["score"], margin, top)
+        if margin < self.min_margin:
+            return FaqDecision(False, "low_margin", top["score"], margin, top)
+        return FaqDecision(True, "answered", top["score"], margin, top)
+
+    def answer(self, question: str) -> Optional[str]:
+        """คืนข้อความคำตอบถ้ามั่นใจพอ ไม่งั้นคืน None ให้ส่งต่อ agent"""
+        started = time.perf_counter()
+        decision = self.evaluate(question)
+        self.lookups += 1
+        self.total_ms += (time.perf_counter() - started) * 1000
+        if not decision.answered:
+            self.rejected[decision.reason] += 1
+            return None
+        self.answered += 1
+        logger.info(f"⚡ FAQ fast path answered {decision.result.get('id')} "
+                    f"(score={decision.score:g}, margin={decision.margin:g})")
+        rendered = self.corpus.rendered_answer(self.faq_path, decision.result.get("id", ""))
+        return rendered or format_faq_answer(decision.result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "min_score": self.min_score,
+            "min_margin": self.min_margin,
+            "min_coverage": self.min_coverage,
+            "lookups": self.lookups,
+            "answered": self.answered,
+            "answer_rate": round(self.answered / self.lookups, 4) if self.lookups else 0.0,
+            "rejected": dict(self.rejected),
+            "avg_lookup_ms": round(self.total_ms / self.lookups, 3) if self.lookups else 0.0,
+        }
@@ -0,0 +1,125 @@
+"""
+Fuzzy Index - ค้นคำที่สะกดผิดเล็กน้อย ("dips", "DIPS", วรรณยุกต์หาย) ด้วย character trigram index
+
+หาคำที่เป็นไปได้จาก posting list ของ trigram (นับ trigram ที่ตรงกันแล้วกรองด้วย q-gram lemma)
+แล้วยืนยันด้วย edit distance แบบ Damerau (optimal string alignment: สลับตัวอักษรติดกัน = 1 ครั้ง)
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+Q = 3
+_PAD = "\x00" * (Q - 1)
+
+
+class FuzzyHit(NamedTuple):
+    query: str          # the (misspelled) text from the query
+    term: str           # indexed term it matched
+    distance: int       # edit distance (OSA)
+    score: float        # 1.0 = identical, lower = more edits
+
+
+def trigrams(text: str) -> List[str]:
+    padded = _PAD + text + _PAD
+    return [padded[i:i + Q] for i in range(len(padded) - Q + 1)]
+
+
+def edit_distance(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """Damerau-Levenshtein (OSA) - หยุดเร็วเมื่อทุกค่าในแถวเกิน `max_distance` (คืน max_distance + 1)"""
+    if a == b:
+        return 0
+    if max_distance is not None and abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def max_edits(length: int) -> int:
+    """จำนวนการแก้ที่ยอมรับตามความยาวคำ - คำสั้นมากต้องตรงเป๊ะ"""
+    if length < 3:
+        return 0
+    if length <= 8:
+        return 1
+    return 2
+
+
+class TrigramIndex:
+    """trigram -> posting list ของ term id
+
+    `lookup(text)` คืน FuzzyHit ของ term ที่ห่างจาก text ไม่เกิน `max_edits(len(text))` เรียงจากใกล้ที่สุด
+    """
+
+    def __init__(self, terms: Iterable[str], min_length: int = 3):
+        self.terms: List[str] = sorted({t for t in terms if len(t) >= min_length})
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        for term_id, term in enumerate(self.terms):
+            for gram in set(trigrams(term)):
+                self.postings[gram].append(term_id)
+        self.postings = dict(self.postings)
+
+        # Metrics
+        self.lookups = 0
+        self.candidates = 0
+
+    def lookup(self, text: str, limit: int = 3, max_distance: Optional[int] = None) -> List[FuzzyHit]:
+        text = text.lower()
+        distance_limit = max_edits(len(text)) if max_distance is None else max_distance
+        self.lookups += 1
+        if distance_limit == 0:
+            return []
+
+        grams = set(trigrams(text))
+        counts: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for term_id in self.postings.get(gram, ()):
+                counts[term_id] += 1
+        # q-gram lemma: each edit (a transposition counts once) destroys at most Q + 1 trigrams
+        required = max(1, len(grams) - (Q + 1) * distance_limit)
+
+        hits = []
+        for term_id, shared in counts.items():
+            if shared < required:
+                continue
+            term = self.terms[term_id]
+            if term == text or abs(len(term) - len(text)) > distance_limit:
+                continue
+            self.candidates += 1
+            distance = edit_distance(text, term, distance_limit)
+            if distance <= distance_limit:
+                hits.append(FuzzyHit(text, term, distance, round(1 - distance / max(len(text), len(term)), 3)))
+        hits.sort(key=lambda hit: (hit.distance, -hit.score, hit.term))
+        return hits[:limit]
+
+    def scan(self, text: str, limit: int = 3, max_distance: Optional[int] = None) -> List[FuzzyHit]:
+        """เทียบกับทุก term แบบเส้นตรง (ใช้เป็น baseline ใน benchmark) - ผลเหมือน lookup()"""
+        text = text.lower()
+        distance_limit = max_edits(len(text)) if max_distance is None else max_distance
+        if distance_limit == 0:
+            return []
+        hits = []
+        for term in self.terms:
+            if term == text:
+                continue
+            distance = edit_distance(text, term, distance_limit)
+            if distance <= distance_limit:
+                hits.append(FuzzyHit(text, term, distance, round(1 - distance / max(len(text), len(term)), 3)))
+        hits.sort(key=lambda hit: (hit.distance, -hit.score, hit.term))
+        return hits[:limit]
+
+    def stats(self):
+        return {
+            "terms": len(self.terms),
+            "trigrams": len(self.postings),
+            "lookups": self.lookups,
+            "avg_candidates": round(self.candidates / self.lookups, 2) if self.lookups else 0.0,
+        }
@@ -0,0 +1,396 @@
+"""
+HR Corpus - โหลดไฟล์ความรู้ HR (faq.json, culture_org.json, text) ครั้งเดียว เก็บเป็น record ที่ย่อแล้วในหน่วยความจำ
+และโหลดใหม่แบบ atomic เมื่อไฟล์เปลี่ยน (ตรวจ mtime + ขนาดไฟล์)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    from .search_index import STOPWORDS, SearchIndex, ThaiSegmenter
+    from .fuzzy_index import FuzzyHit, TrigramIndex
+    from .vector_scoring import NUMPY_AVAILABLE, VectorScorer
+except ImportError:
+    from search_index import STOPWORDS, SearchIndex, ThaiSegmenter
+    from fuzzy_index import FuzzyHit, TrigramIndex
+    from vector_scoring import NUMPY_AVAILABLE, VectorScorer
+
+logger = logging.getLogger(__name__)
+
+# Fields scored like a title (+7 per query word)
+TITLE_FIELDS = ("name", "title", "meaning")
+
+# BM25F field weights for the inverted index (see search_index.py)
+INDEX_WEIGHTS = {"keywords": 3.0, "question": 2.0, "title": 2.0, "answer": 1.0, "body": 0.5}
+
+# Shortest query piece (in letters, see letter_count) that the fuzzy index may correct
+FUZZY_MIN_LETTERS = 4
+# Thai vowel and tone marks written above/below the preceding consonant
+THAI_COMBINING_MARKS = frozenset("\u0e31\u0e34\u0e35\u0e36\u0e37\u0e38\u0e39\u0e3a\u0e47\u0e48\u0e49\u0e4a\u0e4b\u0e4c\u0e4d\u0e4e")
+
+
+class CorpusEntry:
+    """หนึ่งรายการที่ค้นหาได้ (FAQ / ค่านิยม / วัฒนธรรมองค์กร) พร้อมข้อความตัวพิมพ์เล็กที่คำนวณไว้ล่วงหน้า
+
+    field ที่ไม่มีใน JSON เก็บเป็น None เพื่อให้คะแนนเหมือน `calculate_relevance_score` เดิมทุกประการ
+    """
+
+    __slots__ = ("kind", "result", "keywords", "questions", "answer", "fields")
+
+    def __init__(self, kind: str, item: Dict[str, Any], result: Dict[str, Any]):
+        self.kind = kind
+        self.result = result  # search result without 'score'
+        self.keywords = tuple(k.lower() for k in item.get("keywords", [])) if "keywords" in item else None
+        if "question" in item:
+            questions = item["question"] if isinstance(item["question"], list) else [item["question"]]
+            self.questions = tuple(q.lower() for q in questions)
+        else:
+            self.questions = None
+        self.answer = item["answer"].lower() if "answer" in item else None
+        self.fields = tuple(str(item[field]).lower() for field in TITLE_FIELDS if field in item)
+
+    def score(self, query_lower: str, query_words: List[str]) -> float:
+        score = 0.0
+        if self.keywords is not None:
+            for keyword in self.keywords:
+                for word in query_words:
+                    if word in keyword:
+                        score += 10
+                    elif keyword in query_lower:
+                        score += 8
+        if self.questions is not None:
+            for question in self.questions:
+                for word in query_words:
+                    if word in question:
+                        score += 5
+                    # Exact phrase match
+                    if query_lower in question:
+                        score += 15
+        if self.answer is not None:
+            for word in query_words:
+                if word in self.answer:
+                    score += 3
+        for field in self.fields:
+            for word in query_words:
+                if word in field:
+                    score += 7
+        return score
+
+
+def build_entries(data: Dict[Any, Any]) -> List[CorpusEntry]:
+    """แปลง JSON (FAQ categories / core_values / organizational_culture) เป็น CorpusEntry ตามลำดับเดิม"""
+    entries = []
+    for category in data.get("categories", []) if isinstance(data, dict) else []:
+        for faq in category.get("faqs", []):
+            entries.append(CorpusEntry("faq", faq, {
+                'type': 'faq',
+                'category': category.get('name', ''),
+                'id': faq.get('id', ''),
+                'question': faq.get('question', ''),
+                'answer': faq.get('answer', ''),
+                'keywords': faq.get('keywords', []),
+                'link': faq.get('link', ''),
+                'links': faq.get('links', []),
+                'contacts': faq.get('contacts', {}),
+            }))
+
+    if 'core_values' in data and 'values' in data['core_values']:
+        for value in data['core_values']['values']:
+            entries.append(CorpusEntry("core_value", value, {
+                'type': 'core_value',
+                'id': value.get('id', ''),
+                'name': value.get('name', ''),
+                'name_en': value.get('name_en', ''),
+                'definition': value.get('definition', ''),
+                'keywords': value.get('keywords', []),
+                'behaviors': value.get('behaviors', []),
+            }))
+
+    if 'organizational_culture' in data and 'elements' in data['organizational_culture']:
+        for element in data['organizational_culture']['elements']:
+            entries.append(CorpusEntry("culture_element", element, {
+                'type': 'culture_element',
+                'id': element.get('id', ''),
+                'letter': element.get('letter', ''),
+                'word': element.get('word', ''),
+                'meaning': element.get('meaning', ''),
+                'description': element.get('description', ''),
+                'keywords': element.get('keywords', []),
+                'behaviors': element.get('behaviors', []),
+            }))
+    return entries
+
+
+def search_entries(entries: List[CorpusEntry], query: str) -> List[Dict[str, Any]]:
+    """ให้คะแนนทุก entry แล้วคืนผลที่คะแนน > 0 เรียงจากมากไปน้อย (ผลลัพธ์เป็น dict ใหม่ทุกครั้ง)"""
+    query_lower = query.lower()
+    query_words = query_lower.split()
+    results = []
+    for entry in entries:
+        score = entry.score(query_lower, query_words)
+        if score > 0:
+            result = dict(entry.result)
+            result['score'] = score
+            results.append(result)
+    results.sort(key=lambda x: x['score'], reverse=True)
+    return results
+
+
+def index_fields(result: Dict[str, Any]) -> Dict[str, List[str]]:
+    """ข้อความของแต่ละ field ที่จะทำ index (รวม definition / description / behaviors ของค่านิยมและวัฒนธรรม)"""
+    question = result.get("question") or []
+    return {
+        "keywords": [str(k) for k in result.get("keywords") or []],
+        "question": question if isinstance(question, list) else [question],
+        "title": [str(result[f]) for f in ("name", "name_en", "letter", "word", "meaning") if result.get(f)],
+        "answer": [result["answer"]] if result.get("answer") else [],
+        "body": [str(result[f]) for f in ("definition", "description") if result.get(f)]
+                + [str(b) for b in result.get("behaviors") or []],
+    }
+
+
+def build_index(entries: List[CorpusEntry]) -> SearchIndex:
+    """สร้าง segmenter (seed จาก keywords ของไฟล์) และ BM25 index ของ entries"""
+    segmenter = ThaiSegmenter(
+        keyword for entry in entries for keyword in entry.result.get("keywords") or []
+    )
+    return SearchIndex([index_fields(entry.result) for entry in entries], INDEX_WEIGHTS, segmenter)
+
+
+def letter_count(word: str) -> int:
+    """จำนวนตัวอักษรที่กินที่ (ไม่นับสระบน/ล่างและวรรณยุกต์) - "ขั้น" มี 2 ตัว"""
+    return sum(1 for ch in word if ch not in THAI_COMBINING_MARKS)
+
+
+def fuzzy_corrections(index: SearchIndex, fuzzy: TrigramIndex, query: str) -> List[FuzzyHit]:
+    """หาคำใน vocabulary ที่ใกล้กับส่วนของ query ที่ index ไม่รู้จัก (คำที่สะกดผิด)
+
+    ลองทั้งคำเดี่ยวและคำที่ติดกันสองคำ เพราะคำที่สะกดผิดมักถูกตัดเป็นคำที่รู้จัก + ตัวอักษรที่ไม่รู้จัก
+    คำที่อยู่ในพจนานุกรมของตัวตัดคำ (รวม BASE_WORDS และ STOPWORDS) ไม่ถูกแก้ และส่วนที่สั้นกว่า
+    FUZZY_MIN_LETTERS ตัวอักษรไม่ถูกแก้ เพราะคำสั้นห่างจากคำอื่นเพียงตัวเดียว ("วัน" -> "กัน", "ขั้น" -> "ชั้น")
+    """
+    words = index.segmenter.segment(query)
+    known = [word in index.segmenter or word in index.postings or word in STOPWORDS for word in words]
+    pieces = [word for word, ok in zip(words, known) if not ok]
+    pieces += [words[i] + words[i + 1] for i in range(len(words) - 1) if not (known[i] and known[i + 1])]
+
+    hits: Dict[str, FuzzyHit] = {}
+    for piece in pieces:
+        if letter_count(piece) < FUZZY_MIN_LETTERS:
+            continue
+        for hit in fuzzy.lookup(piece, limit=1):
+            if hit.term not in hits or hit.distance < hits[hit.term].distance:
+                hits[hit.term] = hit
+    return sorted(hits.values(), key=lambda hit: (hit.distance, -hit.score))
+
+
+class CorpusSnapshot(NamedTuple):
+    path: str
+    signature: Tuple[int, int]      # (mtime_ns, size)
+    data: Any                       # parsed JSON, or str for text files
+    entries: List[CorpusEntry]
+    index: Optional[SearchIndex]
+    fuzzy: Optional[TrigramIndex]
+    scorer: Optional[VectorScorer]  # None without numpy or for small files (pure-Python scoring)
+    loaded_at: float
+    load_ms: float
+    rendered: Dict[str, str] = {}   # pre-rendered FAQ answers by id (only in index artifacts)
+
+
+class HRCorpus:
+    """แคชไฟล์ความรู้ HR ตาม path
+
+    - ตรวจ `os.stat` ไม่บ่อยกว่าทุก `check_interval` วินาทีต่อไฟล์
+    - เมื่อ mtime หรือขนาดเปลี่ยน จะ parse ไฟล์ใหม่ทั้งหมดก่อน แล้วจึงสลับ snapshot (ผู้อ่านเห็นของเก่าหรือใหม่ทั้งชุด)
+    - ถ้าไฟล์ใหม่ parse ไม่ได้ จะใช้ snapshot เดิมต่อไป
+    - ไฟล์ที่มีอย่างน้อย `vector_min_entries` รายการให้คะแนนด้วย VectorScorer (NumPy) ผลเหมือนกับ loop เดิมทุกประการ
+    """
+
+    def __init__(self, check_interval: float = 2.0, vector_min_entries: int = 200):
+        self.check_interval = check_interval
+        # Below this size the plain loops are faster than NumPy's per-call overhead
+        self.vector_min_entries = vector_min_entries
+        self._snapshots: Dict[str, CorpusSnapshot] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.reads = 0
+        self.loads = 0
+        self.reloads = 0
+        self.load_errors = 0
+        self.searches = 0
+        self.search_ms = 0.0
+        self.ranked_searches = 0
+        self.ranked_fallbacks = 0
+        self.ranked_ms = 0.0
+        self.fuzzy_corrected = 0
+        self.artifact: Optional[Dict[str, Any]] = None  # last preload report (see index_artifact.py)
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self, path: str, signature: Tuple[int, int]) -> CorpusSnapshot:
+        started = time.perf_counter()
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                data = json.load(f)
+                entries = build_entries(data)
+                index = build_index(entries)
+                fuzzy = TrigramIndex(index.postings)
+                vectorize = NUMPY_AVAILABLE and len(entries) >= self.vector_min_entries
+                scorer = VectorScorer(entries) if vectorize else None
+            else:
+                data = f.read()
+                entries = []
+                index = fuzzy = scorer = None
+        return CorpusSnapshot(path, signature, data, entries, index, fuzzy, scorer, time.time(),
+                              (time.perf_counter() - started) * 1000)
+
+    def snapshot(self, path: str) -> Optional[CorpusSnapshot]:
+        """คืน snapshot ปัจจุบันของไฟล์ (None ถ้าไฟล์ไม่มีและไม่เคยโหลด)"""
+        self.reads += 1
+        current = self._snapshots.get(path)
+        now = time.monotonic()
+        if current is not None and now - self._checked_at.get(path, 0.0) < self.check_interval:
+            return current
+
+        with self._lock:
+            current = self._snapshots.get(path)
+            if current is not None and now - self._checked_at.get(path, 0.0) < self.check_interval:
+                return current  # another thread just checked
+            self._checked_at[path] = now
+            signature = self._signature(path)
+            if signature is None:
+                if current is not None:
+                    logger.warning(f"⚠️ HR corpus file missing, keeping the loaded copy: {path}")
+                return current
+            if current is not None and current.signature == signature:
+                return current
+            try:
+                snapshot = self._load(path, signature)
+            except (OSError, ValueError) as e:
+                self.load_errors += 1
+                logger.error(f"❌ Failed to load HR corpus file {path}: {e}")
+                return current
+            self._snapshots[path] = snapshot  # atomic swap
+            if current is None:
+                self.loads += 1
+            else:
+                self.reloads += 1
+            logger.info(f"📚 HR corpus {'reloaded' if current else 'loaded'} {path} "
+                        f"({len(snapshot.entries)} entries, {snapshot.load_ms:.1f} ms)")
+            return snapshot
+
+    def install(self, snapshot: CorpusSnapshot) -> bool:
+        """ใช้ snapshot ที่สร้างไว้แล้ว (เช่น จาก index artifact) - ไม่แทนที่ไฟล์ที่โหลดอยู่แล้ว"""
+        with self._lock:
+            if snapshot.path in self._snapshots:
+                return False
+            self._snapshots[snapshot.path] = snapshot
+            self._checked_at[snapshot.path] = time.monotonic()
+            self.loads += 1
+            return True
+
+    def rendered_answer(self, path: str, entry_id: str) -> Optional[str]:
+        """คำตอบ FAQ ที่ format ไว้ล่วงหน้า (None ถ้า snapshot ไม่ได้มาจาก artifact หรือไฟล์ถูกโหลดใหม่)"""
+        snapshot = self.snapshot(path)
+        return snapshot.rendered.get(entry_id) if snapshot is not None else None
+
+    def data(self, path: str) -> Any:
+        snapshot = self.snapshot(path)
+        return snapshot.data if snapshot is not None else None
+
+    def text(self, path: str) -> Optional[str]:
+        snapshot = self.snapshot(path)
+        return snapshot.data if snapshot is not None else None
+
+    @staticmethod
+    def _score(snapshot: CorpusSnapshot, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        if snapshot.scorer is not None:
+            return snapshot.scorer.search(query, k)
+        results = search_entries(snapshot.entries, query)
+        return results[:k] if k is not None else results
+
+    def search(self, path: str, query: str, k: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """ค้นหาใน entries ของไฟล์ด้วยคะแนนแบบเดิม (vectorized ถ้ามี numpy) - คืน None ถ้าไม่มีไฟล์"""
+        snapshot = self.snapshot(path)
+        if snapshot is None:
+            return None
+        started = time.perf_counter()
+        results = self._score(snapshot, query, k)
+        self.searches += 1
+        self.search_ms += (time.perf_counter() - started) * 1000
+        return results
+
+    def ranked_search(self, path: str, query: str, k: int = 3) -> Optional[List[Dict[str, Any]]]:
+        """ค้นหาด้วย inverted index (ตัดคำไทย + BM25) คืน top-k - คืน None ถ้าไม่มีไฟล์
+
+        คำที่ index ไม่รู้จักจะถูกแก้เป็นคำใกล้เคียงด้วย fuzzy index (ผลลัพธ์ที่มีคำที่แก้แล้วมี 'fuzzy' = [(คำที่พิมพ์, คำที่ใช้, distance)])
+        ถ้า index ไม่พบคำใดเลย (เช่น ค้นด้วยคำบางส่วนของคำ) จะใช้การค้นแบบ substring เดิมแทน
+        """
+        snapshot = self.snapshot(path)
+        if snapshot is None:
+            return None
+        started = time.perf_counter()
+        hits = []
+        corrections: List[FuzzyHit] = []
+        if snapshot.index is not None:
+            corrections = fuzzy_corrections(snapshot.index, snapshot.fuzzy, query)
+            hits = snapshot.index.search(query, k, [hit.term for hit in corrections])
+        if hits:
+            if corrections:
+                self.fuzzy_corrected += 1
+            # Only results that contain a corrected term get the note - the rest matched on other words
+            corrected_docs = {hit.term: {doc_id for doc_id, _ in snapshot.index.postings.get(hit.term, ())}
+                              for hit in corrections}
+            results = []
+            for doc_id, score in hits:
+                result = dict(snapshot.entries[doc_id].result)
+                result['score'] = round(score, 3)
+                notes = [(hit.query, hit.term, hit.distance) for hit in corrections
+                         if doc_id in corrected_docs[hit.term]]
+                if notes:
+                    result['fuzzy'] = notes
+                results.append(result)
+        else:
+            self.ranked_fallbacks += 1
+            results = self._score(snapshot, query, k)
+        self.ranked_searches += 1
+        self.ranked_ms += (time.perf_counter() - started) * 1000
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "files": {
+                path: {"entries": len(s.entries), "load_ms": round(s.load_ms, 2),
+                       "vocabulary": s.index.vocabulary if s.index is not None else 0,
+                       "fuzzy": s.fuzzy.stats() if s.fuzzy is not None else None,
+                       "vectorized": s.scorer is not None,
+                       "loaded_at": s.loaded_at}
+                for path, s in self._snapshots.items()
+            },
+            "artifact": self.artifact,
+            "reads": self.reads,
+            "loads": self.loads,
+            "reloads": self.reloads,
+            "load_errors": self.load_errors,
+            "searches": self.searches,
+            "avg_search_ms": round(self.search_ms / self.searches, 3) if self.searches else 0.0,
+            "ranked_searches": self.ranked_searches,
+            "ranked_fallbacks": self.ranked_fallbacks,
+            "fuzzy_corrected": self.fuzzy_corrected,
+            "avg_ranked_ms": round(self.ranked_ms / self.ranked_searches, 3) if self.ranked_searches else 0.0,
+        }
+
+
+# Shared by hr_tools and the FAQ fast path
+hr_corpus = HRCorpus()
@@ -3,145 +3,50 @@ HR Bot Tools - เครื่องมือเพิ่มเติมสำ
 """
 from langchain.tools import tool
 import os
-import json
 import re
 from typing import List, Dict, Any
 
+try:
+    from .hr_corpus import hr_corpus, build_entries, search_entries
+except ImportError:
+    from hr_corpus import hr_corpus, build_entries, search_entries
+
+FAQ_FILE = os.path.join("data", "json", "faq.json")
+CULTURE_FILE = os.path.join("data", "json", "culture_org.json")
+POLICY_FILE = os.path.join("data", "text", "policies.txt")
+
+
 def search_json_by_keywords(data: Dict[Any, Any], query: str) -> List[Dict[str, Any]]:
-    """ค้นหาข้อมูลใน JSON โดยใช้ keywords และ fuzzy matching"""
-    results = []
-    query_lower = query.lower()
-    
-    def extract_text_recursive(obj, parent_key=""):
-        """ดึงข้อความจากโครงสร้าง JSON แบบ recursive"""
-        texts = []
-        if isinstance(obj, dict):
-            for key, value in obj.items():
-                texts.extend(extract_text_recursive(value, key))
-        elif isinstance(obj, list):
-            for item in obj:
-                texts.extend(extract_text_recursive(item, parent_key))
-        elif isinstance(obj, str):
-            texts.append((parent_key, obj))
-        return texts
-    
-    def calculate_relevance_score(item: Dict[str, Any], query: str) -> float:
-        """คำนวณคะแนนความเกี่ยวข้อง"""
-        score = 0.0
-        query_words = query.lower().split()
-        
-        # ตรวจสอบใน keywords (คะแนนสูงสุด)
-        if 'keywords' in item:
-            for keyword in item.get('keywords', []):
-                for word in query_words:
-                    if word in keyword.lower():
-                        score += 10
-                    elif keyword.lower() in query.lower():
-                        score += 8
-        
-        # ตรวจสอบใน question
-        if 'question' in item:
-            questions = item['question'] if isinstance(item['question'], list) else [item['question']]
-            for question in questions:
-                for word in query_words:
-                    if word in question.lower():
-                        score += 5
-                    # Exact phrase match
-                    if query.lower() in question.lower():
-                        score += 15
-        
-        # ตรวจสอบใน answer
-        if 'answer' in item:
-            for word in query_words:
-                if word in item['answer'].lower():
-                    score += 3
-        
-        # ตรวจสอบใน name, title
-        for field in ['name', 'title', 'meaning']:
-            if field in item:
-                for word in query_words:
-                    if word in str(item[field]).lower():
-                        score += 7
-        
-        return score    
-    # ค้นหาใน FAQ categories
-    if 'categories' in data:
-        for category in data['categories']:
-            if 'faqs' in category:
-                for faq in category['faqs']:
-                    score = calculate_relevance_score(faq, query)
-                    if score > 0:
-                        result = {
-                            'type': 'faq',
-                            'category': category.get('name', ''),
-                            'id': faq.get('id', ''),
-                            'question': faq.get('question', ''),
-                            'answer': faq.get('answer', ''),
-                            'keywords': faq.get('keywords', []),
-                            'link': faq.get('link', ''),
-                            'links': faq.get('links', []),
-                            'contacts': faq.get('contacts', {}),
-                            'score': score
-                        }
-                        results.append(result)
-    
-    # ค้นหาใน core values
-    if 'core_values' in data and 'values' in data['core_values']:
-        for value in data['core_values']['values']:
-            score = calculate_relevance_score(value, query)
-            if score > 0:
-                result = {
-                    'type': 'core_value',
-                    'id': value.get('id', ''),
-                    'name': value.get('name', ''),
-                    'name_en': value.get('name_en', ''),
-                    'definition': value.get('definition', ''),
-                    'keywords': value.get('keywords', []),
-                    'behaviors': value.get('behaviors', []),
-                    'score': score
-                }
-                results.append(result)
-    
-    # ค้นหาใน organizational culture
-    if 'organizational_culture' in data and 'elements' in data['organizational_culture']:
-        for element in data['organizational_culture']['elements']:
-            score = calculate_relevance_score(element, query)
-            if score > 0:
-                result = {
-                    'type': 'culture_element',
-                    'id': element.get('id', ''),
-                    'letter': element.get('letter', ''),
-                    'word': element.get('word', ''),
-                    'meaning': element.get('meaning', ''),
-                    'description': element.get('description', ''),
-                    'keywords': element.get('keywords', []),
-                    'behaviors': element.get('behaviors', []),
-                    'score': score
-                }
-                results.append(result)
-    
-    # เรียงลำดับตามคะแนน
-    results.sort(key=lambda x: x['score'], reverse=True)
-    return results
+    """ค้นหาข้อมูลใน JSON โดยใช้ keywords และ fuzzy matching
+
+    ไฟล์ที่โหลดผ่าน hr_corpus มี entries ที่สร้างไว้แล้ว ใช้ `hr_corpus.search(path, query)` แทนเพื่อไม่ต้อง parse ซ้ำ
+    """
+    return search_entries(build_entries(data), query)
+
+
+def format_fuzzy_note(corrections) -> str:
+    """แจ้งคำที่ถูกแก้จากการค้นหาแบบใกล้เคียง เช่น 🔤 ค้นหาด้วยคำใกล้เคียง: dips → dpis"""
+    pairs = ", ".join(f"{typed} → {term}" for typed, term, _ in corrections)
+    return f"🔤 ค้นหาด้วยคำใกล้เคียง: {pairs}\n"
+
+
 @tool
 def search_hr_faq_json(query: str) -> str:
     """ค้นหาคำตอบจากไฟล์ FAQ JSON"""
     try:
-        faq_file = os.path.join("data", "json", "faq.json")
-        if not os.path.exists(faq_file):
+        # Parsed and indexed once, reloaded only when the file changes
+        results = hr_corpus.ranked_search(FAQ_FILE, query, k=3)
+        if results is None:
             return "ไม่พบไฟล์ FAQ JSON"
         
-        with open(faq_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        results = search_json_by_keywords(data, query)
-        
         if not results:
             return "❌ ไม่พบข้อมูลที่เกี่ยวข้องใน FAQ"
         
         # จัดรูปแบบผลลัพธ์
         output = []
         output.append(f"🔍 ผลการค้นหา FAQ สำหรับ: '{query}'\n")
+        if results[0].get('fuzzy'):
+            output.append(format_fuzzy_note(results[0]['fuzzy']))
         
         # แสดงผลลัพธ์ที่ดีที่สุด (สูงสุด 3 รายการ)
         for i, result in enumerate(results[:3]):
@@ -173,20 +78,17 @@ def search_hr_faq_json(query: str) -> str:
 def search_culture_values_json(query: str) -> str:
     """ค้นหาข้อมูลวัฒนธรรมและค่านิยมองค์กรจากไฟล์ JSON"""
     try:
-        culture_file = os.path.join("data", "json", "culture_org.json")
-        if not os.path.exists(culture_file):
+        results = hr_corpus.ranked_search(CULTURE_FILE, query, k=3)
+        if results is None:
             return "ไม่พบไฟล์วัฒนธรรมองค์กร JSON"
         
-        with open(culture_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        results = search_json_by_keywords(data, query)
-        
         if not results:
             return "❌ ไม่พบข้อมูลวัฒนธรรมองค์กรที่เกี่ยวข้อง"
         
         output = []
         output.append(f"🏛️ ผลการค้นหาวัฒนธรรมองค์กรสำหรับ: '{query}'\n")
+        if results[0].get('fuzzy'):
+            output.append(format_fuzzy_note(results[0]['fuzzy']))
         
         # แสดงผลลัพธ์ที่ค้นพบ
         for i, result in enumerate(results[:3]):
@@ -250,13 +152,10 @@ def search_culture_org(query: str) -> str:
 def search_hr_policies(query: str) -> str:
     """ค้นหานโยบาย HR ที่เกี่ยวข้อง"""
     try:
-        policy_file = os.path.join("data", "text", "policies.txt")
-        if not os.path.exists(policy_file):
+        content = hr_corpus.text(POLICY_FILE)
+        if content is None:
             return "ไม่พบไฟล์นโยบาย"
         
-        with open(policy_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
         if query.lower() in content.lower():
             pos = content.lower().find(query.lower())
             start = max(0, pos - 200)
@@ -0,0 +1,150 @@
+"""
+Search Index Artifact - คอมไพล์ hr_corpus (entries, BM25 index, trigram index, vector scorer และคำตอบ FAQ ที่ format แล้ว)
+เป็นไฟล์ไบนารีไฟล์เดียว ให้ backend โหลดด้วยการอ่านครั้งเดียวตอน startup แทนการ parse JSON และสร้าง index ใหม่
+
+สร้างด้วย `python build_search_index.py` (จาก backend/) - ไฟล์ผูกกับ INDEX_FORMAT_VERSION, hash ของโค้ดที่สร้าง index
+และ sha256 ของไฟล์ต้นทางแต่ละไฟล์ ถ้าไม่ตรง (stale) ไฟล์นั้นจะถูกสร้างในหน่วยความจำแทน
+
+⚠️ ใช้ pickle - โหลดเฉพาะไฟล์ที่ build เองเท่านั้น
+"""
+import hashlib
+import logging
+import os
+import pickle
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+try:
+    from .hr_corpus import CorpusSnapshot, HRCorpus
+except ImportError:
+    from hr_corpus import CorpusSnapshot, HRCorpus
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+DEFAULT_ARTIFACT_PATH = os.path.join("data", "search_index.pkl")
+
+# Modules whose code shapes the pickled objects (faq_fastpath renders the stored answers, hr_tools
+# names the source files); editing any of them invalidates old artifacts
+CODE_MODULES = ("hr_corpus.py", "search_index.py", "fuzzy_index.py", "vector_scoring.py", "index_artifact.py",
+                "faq_fastpath.py", "hr_tools.py")
+
+
+def file_hash(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def code_hash() -> str:
+    digest = hashlib.sha256()
+    base = os.path.dirname(os.path.abspath(__file__))
+    for name in CODE_MODULES:
+        digest.update(name.encode())
+        digest.update((file_hash(os.path.join(base, name)) or "").encode())
+    return digest.hexdigest()
+
+
+def write_artifact(output: str, snapshots: Iterable[CorpusSnapshot]) -> Dict[str, Any]:
+    """เขียน artifact แบบ atomic (ไฟล์ชั่วคราว + rename) แล้วคืน manifest"""
+    files = {}
+    for snapshot in snapshots:
+        files[snapshot.path] = {"sha256": file_hash(snapshot.path), "snapshot": snapshot}
+    payload = {
+        "format": INDEX_FORMAT_VERSION,
+        "code": code_hash(),
+        "built_at": time.time(),
+        "files": files,
+    }
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    tmp = f"{output}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, output)
+    return {"format": payload["format"], "built_at": payload["built_at"], "bytes": os.path.getsize(output),
+            "files": {path: {"sha256": info["sha256"], "entries": len(info["snapshot"].entries)}
+                      for path, info in files.items()}}
+
+
+class ArtifactLoad(NamedTuple):
+    status: str                             # "loaded", "partial", "stale", "missing" or "error"
+    snapshots: List[CorpusSnapshot]         # still matching their source files
+    stale: List[str]                        # source files that changed since the build
+    load_ms: float
+    built_at: Optional[float]
+
+
+def load_artifact(path: str) -> ArtifactLoad:
+    started = time.perf_counter()
+
+    def result(status, snapshots=(), stale=(), built_at=None):
+        return ArtifactLoad(status, list(snapshots), list(stale), (time.perf_counter() - started) * 1000, built_at)
+
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return result("missing")
+    except OSError as e:
+        logger.error(f"❌ Cannot read search index artifact {path}: {e}")
+        return result("error")
+    try:
+        payload = pickle.loads(raw)
+    except Exception as e:  # truncated file, missing numpy, renamed classes...
+        logger.error(f"❌ Cannot unpickle search index artifact {path}: {e}")
+        return result("error")
+
+    if payload.get("format") != INDEX_FORMAT_VERSION or payload.get("code") != code_hash():
+        return result("stale", stale=list(payload.get("files", {})), built_at=payload.get("built_at"))
+
+    snapshots, stale = [], []
+    for source, info in payload["files"].items():
+        try:
+            st = os.stat(source)
+        except OSError:
+            stale.append(source)
+            continue
+        if file_hash(source) != info["sha256"]:
+            stale.append(source)
+            continue
+        snapshots.append(info["snapshot"]._replace(signature=(st.st_mtime_ns, st.st_size), loaded_at=time.time()))
+    status = "loaded" if not stale else ("partial" if snapshots else "stale")
+    return result(status, snapshots, stale, payload.get("built_at"))
+
+
+def preload_corpus(corpus: HRCorpus, paths: Iterable[str], artifact_path: Optional[str] = DEFAULT_ARTIFACT_PATH
+                   ) -> Dict[str, Any]:
+    """โหลด artifact เข้า corpus แล้วสร้างไฟล์ที่เหลือ (ไม่มีใน artifact หรือ stale) ในหน่วยความจำ
+
+    รายงาน (สถานะ, เวลาโหลด, ไฟล์ที่สร้างใหม่) ถูกเก็บใน `corpus.artifact` และแสดงใน /api/metrics
+    """
+    started = time.perf_counter()
+    loaded = load_artifact(artifact_path) if artifact_path else ArtifactLoad("disabled", [], [], 0.0, None)
+    from_artifact = [snapshot.path for snapshot in loaded.snapshots if corpus.install(snapshot)]
+
+    rebuilt = []
+    for path in paths:
+        if path not in from_artifact and corpus.snapshot(path) is not None:
+            rebuilt.append(path)
+
+    report = {
+        "path": artifact_path,
+        "status": loaded.status,
+        "built_at": loaded.built_at,
+        "artifact_load_ms": round(loaded.load_ms, 2),
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "from_artifact": from_artifact,
+        "rebuilt": rebuilt,
+        "stale": loaded.stale,
+    }
+    corpus.artifact = report
+    if loaded.status in ("loaded", "partial"):
+        logger.info(f"📦 Search index artifact {artifact_path}: {len(from_artifact)} file(s) in "
+                    f"{report['artifact_load_ms']:.1f} ms, {len(rebuilt)} rebuilt ({report['total_ms']:.1f} ms total)")
+    else:
+        logger.info(f"📚 Search index built in memory ({loaded.status} artifact {artifact_path}): "
+                    f"{len(rebuilt)} file(s) in {report['total_ms']:.1f} ms")
+    return report
@@ -0,0 +1,221 @@
+"""
+Intent Router - จำแนก intent ของข้อความแบบ local แล้วเลือก agent ที่มีเฉพาะ tools ที่จำเป็น
+"""
+import json
+import logging
+import re
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .answer_cache import estimate_tokens, normalize_question
+except ImportError:
+    from answer_cache import estimate_tokens, normalize_question
+
+logger = logging.getLogger(__name__)
+
+SMALLTALK = "smalltalk"
+HANDOFF = "handoff"
+HISTORY = "history"
+LEAVE_BALANCE = "leave_balance"
+CULTURE = "culture"
+HR_FAQ = "hr_faq"
+GENERAL = "general"
+
+# Keywords are matched against normalize_question() output (no spaces, lower case)
+INTENT_KEYWORDS: Dict[str, Sequence[str]] = {
+    HANDOFF: ("แชทกับเจ้าหน้าที่", "คุยกับเจ้าหน้าที่", "ขอคุยกับคน", "ติดต่อเจ้าหน้าที่", "ต่อเจ้าหน้าที่", "คุยกับแอดมิน",
+              "ขอเจ้าหน้าที่", "admin"),
+    HISTORY: ("สรุปการสนทนา", "สรุปแชท", "ประวัติการสนทนา", "ประวัติแชท", "คุยอะไรไปแล้ว", "เมื่อกี้ถามอะไร"),
+    LEAVE_BALANCE: ("วันลาคงเหลือ", "วันลาเหลือ", "ยอดวันลา", "เช็ควันลา", "ตรวจสอบวันลา", "เหลือวันลา", "moj0"),
+    CULTURE: ("ค่านิยม", "วัฒนธรรม", "justice", "สุจริต", "จิตบริการ", "ยึดมั่นความยุติธรรม", "พันธกิจ", "วิสัยทัศน์"),
+    # Leave forms are spelled out - a bare "ลา" also matches ลาก่อน, เวลา, ศาลา, บุคลากร, หลากหลาย...
+    HR_FAQ: ("การลา", "วันลา", "ใบลา", "ขอลา", "ลาป่วย", "ลากิจ", "ลาพักผ่อน", "ลาคลอด", "ลาบวช", "ลาอุปสมบท",
+             "ลาไปประกอบพิธีฮัจย์", "ลาศึกษา", "ลาฝึกอบรม", "ลาเลี้ยงดูบุตร", "ลาไปช่วยเหลือภริยา", "ลาตรวจเลือก",
+             "ลาติดตามคู่สมรส", "ลาออก", "บุคลากร", "สวัสดิการ", "เงินเดือน", "ค่าตอบแทน", "dpis", "seis", "บำเหน็จ",
+             "บำนาญ", "กบข", "เครื่องราช",
+             "ตำแหน่ง", "บรรจุ", "โอนย้าย", "ประกันสังคม", "ค่ารักษา", "ค่าเล่าเรียน", "แบบฟอร์ม", "หนังสือรับรอง",
+             "บัตรประจำตัว", "วินัย", "ร้องเรียน", "อุทธรณ์", "เกษียณ", "ติดต่อ", "เบอร์", "โทร", "ระเบียบ", "นโยบาย",
+             "ลงเวลา", "ทะเบียนประวัติ", "ข้าราชการ", "ลูกจ้าง", "พนักงานราชการ", "hr", "กอง", "ศท"),
+}
+
+# Greetings / thanks answered without any tools
+SMALLTALK_PHRASES = (
+    "สวัสดี", "หวัดดี", "ดีจ้า", "ดีครับ", "ดีค่ะ", "hello", "hi", "hey", "ขอบคุณ", "ขอบใจ", "thank", "thanks",
+    "โอเค", "ok", "okay", "ได้เลย", "รับทราบ", "เข้าใจแล้ว", "บาย", "bye", "ลาก่อน", "555", "ฮ่าๆ", "เยี่ยม",
+    "ดีมาก", "เก่งมาก", "น่ารัก", "อรุณสวัสดิ์", "ราตรีสวัสดิ์",
+)
+
+# Latin words and Thai runs of the raw text (Latin small talk must match a whole word: "hi" but not "history")
+_WORD_RE = re.compile(r"[a-z0-9]+|[\u0e00-\u0e7f]+")
+
+# Tool names per intent (None = every tool, with legacy aliases removed)
+INTENT_TOOLS: Dict[str, Optional[Sequence[str]]] = {
+    SMALLTALK: (),
+    HANDOFF: ("switch_to_manual_mode",),
+    HISTORY: ("query_conversation_history", "summarize_conversation"),
+    LEAVE_BALANCE: ("check_leave_balance",),
+    CULTURE: ("search_culture_values_json",),
+    HR_FAQ: ("search_all_hr_data", "search_hr_faq_json", "search_hr_policies"),
+    GENERAL: None,
+}
+
+# Legacy aliases that only redirect to another tool
+ALIAS_TOOLS = frozenset({"search_hr_faq", "search_culture_org"})
+
+
+class IntentClassifier:
+    """จำแนก intent ด้วยคำสำคัญ (ไม่ต้องเรียก LLM) - คืน GENERAL เมื่อไม่แน่ใจ"""
+
+    def __init__(self, keywords: Dict[str, Sequence[str]] = INTENT_KEYWORDS,
+                 smalltalk: Sequence[str] = SMALLTALK_PHRASES, smalltalk_max_length: int = 20):
+        self.keywords = {intent: [normalize_question(k) or k for k in words] for intent, words in keywords.items()}
+        self.smalltalk = [normalize_question(p) or p for p in smalltalk]
+        self._smalltalk_exact = frozenset(self.smalltalk)
+        self._smalltalk_words = frozenset(p for p in self.smalltalk if p.isascii())
+        self._smalltalk_thai = tuple(p for p in self.smalltalk if not p.isascii())
+        self.smalltalk_max_length = smalltalk_max_length
+
+    def classify(self, text: str) -> str:
+        key = normalize_question(text)
+        if not key or key in self._smalltalk_exact:
+            return SMALLTALK
+
+        # Intents listed first win ties (handoff before the broad HR keywords)
+        best, best_hits = None, 0
+        for intent, words in self.keywords.items():
+            hits = sum(1 for word in words if word in key)
+            if hits > best_hits:
+                best, best_hits = intent, hits
+        if best is not None:
+            return best
+
+        if len(key) <= self.smalltalk_max_length and self._starts_or_ends_with_smalltalk(text, key):
+            return SMALLTALK
+        return GENERAL
+
+    def _starts_or_ends_with_smalltalk(self, text: str, key: str) -> bool:
+        """Thai has no spaces, so Thai phrases match the start/end of the key; Latin phrases match whole words"""
+        words = _WORD_RE.findall(text.lower())
+        if words and (words[0] in self._smalltalk_words or words[-1] in self._smalltalk_words):
+            return True
+        return any(key.startswith(p) or key.endswith(p) for p in self._smalltalk_thai)
+
+
+class DirectAnswerAgent:
+    """ตอบด้วย LLM โดยตรงโดยไม่ส่ง tool schema (ใช้กับ small talk) - คืนผลรูปแบบเดียวกับ AgentExecutor"""
+
+    def __init__(self, chain):
+        self.chain = chain  # prompt | llm
+
+    async def ainvoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        message = await self.chain.ainvoke(inputs, config)
+        return {"input": inputs.get("input"), "output": getattr(message, "content", str(message)),
+                "intermediate_steps": []}
+
+    def invoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        message = self.chain.invoke(inputs, config)
+        return {"input": inputs.get("input"), "output": getattr(message, "content", str(message)),
+                "intermediate_steps": []}
+
+
+def scoped_system_prompt(prompt: str, all_tools: Sequence[Any], agent_tools: Sequence[Any]) -> str:
+    """system prompt สำหรับ agent ที่มีเฉพาะ `agent_tools`
+
+    ตัดบรรทัดที่สั่งให้เรียก tool ที่ไม่ได้ bind กับ agent นี้ (อ้างชื่อในรูป `name()`) แล้วต่อท้ายด้วยรายการ tool
+    ที่ใช้ได้จริง - agent ที่มี tools ครบคืน prompt เดิม
+    """
+    available = {t.name for t in agent_tools}
+    unbound = [t.name for t in all_tools if t.name not in available]
+    if not unbound:
+        return prompt
+    mention = re.compile(r"\b(?:" + "|".join(re.escape(name) for name in unbound) + r")\(")
+    lines = [line for line in prompt.splitlines() if not mention.search(line)]
+
+    if agent_tools:
+        lines += ["", "## เครื่องมือที่ใช้ได้ในคำถามนี้ (ใช้ได้เฉพาะรายการนี้):"]
+        for t in agent_tools:
+            summary = (t.description or "").strip().split("\n")[0]
+            # The prompt is used as a ChatPromptTemplate, so braces in descriptions must be escaped
+            lines.append(f"- {t.name}(): " + summary.replace("{", "{{").replace("}", "}}"))
+    else:
+        lines += ["", "## เครื่องมือ:",
+                  "คำถามนี้ไม่มีเครื่องมือค้นหาให้ใช้ ให้ตอบจากบริบทการสนทนาโดยตรง "
+                  "ถ้าผู้ใช้ถามข้อมูล HR ที่ต้องค้นหา ให้ชวนถามรายละเอียดของเรื่องนั้นเพิ่มเติม"]
+    return "\n".join(lines)
+
+
+def tool_schema_tokens(tools: Sequence[Any]) -> int:
+    """ประมาณจำนวน token ของ tool schema ที่ถูกส่งไปกับทุก request"""
+    try:
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+        return sum(estimate_tokens(json.dumps(convert_to_openai_tool(t), ensure_ascii=False)) for t in tools)
+    except Exception:
+        return sum(estimate_tokens(f"{t.name} {t.description}") for t in tools)
+
+
+class ToolRouter:
+    """สร้าง agent ล่วงหน้าหนึ่งตัวต่อชุด tools แล้วเลือกตาม intent ของข้อความ
+
+    `build_agent(tools)` ต้องคืน executor ที่มี `ainvoke()` และ `direct_agent` ใช้แทน agent ที่ไม่มี tools
+    """
+
+    def __init__(self, tools: Sequence[Any], build_agent: Callable[[List[Any]], Any], direct_agent: Any = None,
+                 classifier: Optional[IntentClassifier] = None,
+                 intent_tools: Dict[str, Optional[Sequence[str]]] = INTENT_TOOLS):
+        self.classifier = classifier or IntentClassifier()
+        by_name = {t.name: t for t in tools}
+        deduped = [t for t in tools if t.name not in ALIAS_TOOLS]
+        self.baseline_schema_tokens = tool_schema_tokens(tools)
+
+        self.variants: Dict[str, Tuple[Any, int, int]] = {}  # intent -> (executor, tool count, schema tokens)
+        cache: Dict[Tuple[str, ...], Tuple[Any, int, int]] = {}
+        for intent, names in intent_tools.items():
+            subset = deduped if names is None else [by_name[n] for n in names if n in by_name]
+            signature = tuple(t.name for t in subset)
+            if signature not in cache:
+                if not subset and direct_agent is not None:
+                    cache[signature] = (direct_agent, 0, 0)
+                else:
+                    cache[signature] = (build_agent(subset), len(subset), tool_schema_tokens(subset))
+            self.variants[intent] = cache[signature]
+        logger.info(f"✅ Tool router ready: {len(cache)} agent variants for {len(self.variants)} intents")
+
+        # Metrics per intent
+        self.requests = defaultdict(int)
+        self.tool_calls = defaultdict(int)
+        self.schema_tokens = defaultdict(int)
+
+    def route(self, text: str) -> Tuple[str, Any]:
+        intent = self.classifier.classify(text)
+        if intent not in self.variants:
+            intent = GENERAL
+        executor, _, tokens = self.variants[intent]
+        self.requests[intent] += 1
+        self.schema_tokens[intent] += tokens
+        return intent, executor
+
+    def record(self, intent: str, output: Dict[str, Any]):
+        """นับจำนวนครั้งที่ agent เรียก tool (ต้องเปิด return_intermediate_steps)"""
+        self.tool_calls[intent] += len(output.get("intermediate_steps", []))
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.requests.values())
+        sent = sum(self.schema_tokens.values())
+        baseline = total * self.baseline_schema_tokens
+        return {
+            "requests": total,
+            "baseline_schema_tokens_per_request": self.baseline_schema_tokens,
+            "avg_schema_tokens_per_request": round(sent / total, 1) if total else 0.0,
+            "schema_tokens_saved": baseline - sent,
+            "schema_token_reduction": round(1 - sent / baseline, 4) if baseline else 0.0,
+            "avg_tool_calls": round(sum(self.tool_calls.values()) / total, 3) if total else 0.0,
+            "intents": {
+                intent: {
+                    "requests": self.requests[intent],
+                    "tools": self.variants[intent][1],
+                    "avg_tool_calls": round(self.tool_calls[intent] / self.requests[intent], 3),
+                }
+                for intent in self.variants if self.requests[intent]
+            },
+        }
@@ -0,0 +1,162 @@
+"""
+LINE API Client - HTTP client แบบ async ตัวเดียวที่ใช้ร่วมกันสำหรับทุก LINE Messaging API endpoint
+"""
+import asyncio
+import logging
+import uuid
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+from linebot.models import Profile
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    from .rate_limit import LineRateLimiter, RetryPolicy
+except ImportError:
+    from rate_limit import LineRateLimiter, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+LINE_API_BASE_URL = "https://api.line.me"
+LINE_DATA_API_BASE_URL = "https://api-data.line.me"
+
+
+class LineApiError(Exception):
+    """LINE API ตอบกลับด้วย status ที่ไม่ใช่ 2xx"""
+
+    def __init__(self, status_code: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"LINE API error {status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.headers = headers or {}
+
+
+def serialize_messages(messages: Union[Any, List[Any]]) -> List[Dict[str, Any]]:
+    """แปลง SendMessage object (หรือ dict) ให้อยู่ในรูป JSON ที่ LINE API ต้องการ"""
+    if not isinstance(messages, (list, tuple)):
+        messages = [messages]
+    return [m.as_json_dict() if hasattr(m, "as_json_dict") else m for m in messages]
+
+
+class LineApiClient:
+    """httpx.AsyncClient ที่ใช้ connection pool แบบ keep-alive (และ HTTP/2 ถ้ามี h2)
+
+    ใช้ instance เดียวทั้ง process เพื่อไม่ต้องจ่าย TCP+TLS handshake ทุกครั้งที่เรียก LINE
+    และต้องเรียก `aclose()` ตอน shutdown
+
+    ทุก request ผ่าน token bucket ของ endpoint class นั้นๆ และถูก retry ตาม `RetryPolicy`
+    เมื่อเจอ 429 / 5xx / network error
+    """
+
+    def __init__(self, access_token: Optional[str], base_url: str = LINE_API_BASE_URL,
+                 data_base_url: str = LINE_DATA_API_BASE_URL, timeout: float = 10.0,
+                 connect_timeout: float = 5.0, max_connections: int = 100,
+                 max_keepalive_connections: int = 20, keepalive_expiry: float = 30.0,
+                 http2: bool = True, rate_limiter: Optional[LineRateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
+        self.base_url = base_url.rstrip("/")
+        self.data_base_url = data_base_url.rstrip("/")
+        self.rate_limiter = rate_limiter or LineRateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {access_token or ''}"},
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=self.http2,
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"http2": self.http2, "endpoints": self.rate_limiter.stats()}
+
+    async def _request(self, endpoint: str, method: str, url: str, json: Optional[Dict[str, Any]] = None,
+                       retry_key: Optional[str] = None) -> httpx.Response:
+        # X-Line-Retry-Key makes retried push/multicast requests idempotent on LINE's side
+        headers = {"X-Line-Retry-Key": retry_key} if retry_key else None
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(endpoint)
+            try:
+                response = await self._client.request(method, url, json=json, headers=headers)
+            except httpx.TransportError as e:
+                if not self.retry_policy.should_retry(None, attempt):
+                    self.rate_limiter.record_failure(endpoint)
+                    raise
+                self.rate_limiter.record_retry(endpoint, None)
+                delay = self.retry_policy.delay(attempt)
+                logger.warning(f"LINE {endpoint} request failed ({e}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code < 400:
+                    return response
+                # 409 means LINE already accepted a request with this retry key (here or in an earlier call)
+                if retry_key and response.status_code == 409:
+                    return response
+                if not self.retry_policy.should_retry(response.status_code, attempt):
+                    self.rate_limiter.record_failure(endpoint)
+                    try:
+                        message = response.json().get("message", response.text)
+                    except ValueError:
+                        message = response.text
+                    raise LineApiError(response.status_code, message, dict(response.headers))
+                self.rate_limiter.record_retry(endpoint, response.status_code)
+                delay = self.retry_policy.delay(attempt, response.headers.get("Retry-After"))
+                logger.warning(f"LINE {endpoint} returned {response.status_code}, retrying in {delay:.2f}s")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    # ---------------------------------------------------------------
+    # Messaging
+    # ---------------------------------------------------------------
+
+    async def reply_message(self, reply_token: str, messages):
+        await self._request("reply", "POST", f"{self.base_url}/v2/bot/message/reply",
+                            json={"replyToken": reply_token, "messages": serialize_messages(messages)})
+
+    async def push_message(self, to: str, messages, retry_key: Optional[str] = None):
+        """`retry_key` - ส่งค่าเดิมทุกครั้งที่ส่งข้อความชุดเดิมซ้ำ (เช่นจาก outbox) เพื่อไม่ให้ผู้ใช้ได้รับซ้ำ"""
+        await self._request("push", "POST", f"{self.base_url}/v2/bot/message/push",
+                            json={"to": to, "messages": serialize_messages(messages)},
+                            retry_key=retry_key or str(uuid.uuid4()))
+
+    async def multicast(self, to: List[str], messages, retry_key: Optional[str] = None):
+        await self._request("multicast", "POST", f"{self.base_url}/v2/bot/message/multicast",
+                            json={"to": list(to), "messages": serialize_messages(messages)},
+                            retry_key=retry_key or str(uuid.uuid4()))
+
+    async def get_message_content(self, message_id: str) -> bytes:
+        response = await self._request("content", "GET", f"{self.data_base_url}/v2/bot/message/{message_id}/content")
+        return response.content
+
+    # ---------------------------------------------------------------
+    # Profile
+    # ---------------------------------------------------------------
+
+    async def get_profile(self, user_id: str) -> Profile:
+        response = await self._request("profile", "GET", f"{self.base_url}/v2/bot/profile/{user_id}")
+        return Profile.new_from_json_dict(response.json())
+
+    # ---------------------------------------------------------------
+    # Loading animation
+    # ---------------------------------------------------------------
+
+    async def start_loading(self, chat_id: str, loading_seconds: int = 5) -> bool:
+        response = await self._request("loading", "POST", f"{self.base_url}/v2/bot/chat/loading/start",
+                                       json={"chatId": chat_id, "loadingSeconds": loading_seconds})
+        return response.status_code == 202
+
+    async def stop_loading(self, chat_id: str) -> bool:
+        response = await self._request("loading", "POST", f"{self.base_url}/v2/bot/chat/loading/stop",
+                                       json={"chatId": chat_id})
+        return response.status_code == 200
@@ -0,0 +1,111 @@
+"""
+Loading Indicator Manager - จัดการ loading animation ของ LINE ต่อผู้ใช้ เพื่อลดการเรียก API ซ้ำซ้อน
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, Optional
+
+try:
+    from .line_client import LineApiClient
+    from .ttl_cache import TTLCache
+except ImportError:
+    from line_client import LineApiClient
+    from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# LINE accepts loadingSeconds in steps of 5 between 5 and 60
+MIN_LOADING_SECONDS = 5
+MAX_LOADING_SECONDS = 60
+
+
+def clamp_loading_seconds(seconds: float) -> int:
+    """ปัดขึ้นเป็นพหุคูณของ 5 ในช่วง 5-60 วินาที"""
+    seconds = int(math.ceil(max(seconds, MIN_LOADING_SECONDS) / 5.0) * 5)
+    return min(seconds, MAX_LOADING_SECONDS)
+
+
+class LoadingIndicatorManager:
+    """จำว่าแต่ละผู้ใช้มี loading animation แสดงอยู่ถึงเมื่อไร
+
+    - `ensure()` จะเรียก LINE เฉพาะเมื่อ animation ที่มีอยู่จะหมดก่อนเวลาที่คาดว่า pipeline จะเสร็จ
+    - ระยะเวลาคำนวณจากค่าเฉลี่ยแบบ EWMA ของ latency ของ pipeline (`record_latency`)
+    - `ensure_background()` ยิง request แบบไม่รอผล จึงไม่อยู่บน hot path ของการตอบข้อความ
+    - เมื่อบอทส่งข้อความถึงผู้ใช้ LINE จะซ่อน animation เอง จึงเรียก `clear()`
+    """
+
+    def __init__(self, line_api: LineApiClient, initial_latency: float = 5.0, alpha: float = 0.2,
+                 headroom: float = 1.2, max_users: int = 10000):
+        self.line_api = line_api
+        self.alpha = alpha
+        self.headroom = headroom
+        self.expected_latency = initial_latency
+        self._active = TTLCache(max_size=max_users, ttl=MAX_LOADING_SECONDS)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Metrics
+        self.started = 0
+        self.skipped = 0
+        self.failures = 0
+
+    def record_latency(self, seconds: float):
+        self.expected_latency = self.alpha * seconds + (1 - self.alpha) * self.expected_latency
+
+    def expected_seconds(self) -> int:
+        return clamp_loading_seconds(self.expected_latency * self.headroom)
+
+    def is_active(self, user_id: str, min_remaining: float = 0.0) -> bool:
+        active_until = self._active.get(user_id)
+        return active_until is not None and active_until - time.monotonic() > min_remaining
+
+    async def start(self, user_id: str, seconds: int) -> bool:
+        """เริ่ม animation ทันที (ไม่ตรวจสถานะ) และบันทึกเวลาที่จะหมด"""
+        seconds = clamp_loading_seconds(seconds)
+        self._active.set(user_id, time.monotonic() + seconds, ttl=seconds)
+        try:
+            success = await self.line_api.start_loading(user_id, seconds)
+        except Exception as e:
+            logger.error(f"Error starting loading animation for user {user_id}: {e}")
+            success = False
+        if success:
+            self.started += 1
+        else:
+            self.failures += 1
+            self._active.pop(user_id)
+        return success
+
+    async def ensure(self, user_id: str, seconds: Optional[int] = None) -> bool:
+        """ให้ animation แสดงครอบคลุมเวลาที่ต้องการ - เรียก LINE เฉพาะเมื่อจำเป็น"""
+        seconds = clamp_loading_seconds(seconds or self.expected_seconds())
+        # An extension shorter than LINE's 5 second step is not worth a request
+        if self.is_active(user_id, min_remaining=seconds - MIN_LOADING_SECONDS):
+            self.skipped += 1
+            return True
+        return await self.start(user_id, seconds)
+
+    def ensure_background(self, user_id: str, seconds: Optional[int] = None):
+        """เรียก `ensure()` แบบไม่รอผล ได้ทั้งจาก event loop และจาก handler thread"""
+        try:
+            asyncio.get_running_loop()
+            asyncio.create_task(self.ensure(user_id, seconds))
+        except RuntimeError:
+            if self.loop is not None:
+                asyncio.run_coroutine_threadsafe(self.ensure(user_id, seconds), self.loop)
+
+    def clear(self, user_id: str):
+        """เรียกหลังส่งข้อความถึงผู้ใช้ (LINE ซ่อน animation ให้อัตโนมัติ)"""
+        self._active.pop(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.started + self.failures
+        return {
+            "expected_latency_seconds": round(self.expected_latency, 2),
+            "loading_seconds": self.expected_seconds(),
+            "active_users": len(self._active),
+            "started": self.started,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "skip_rate": round(self.skipped / (calls + self.skipped), 4) if calls + self.skipped else 0.0,
+        }
@@ -2,6 +2,7 @@ import json
 import os
 import logging
 import asyncio
+import time
 from datetime import datetime
 from typing import List, Optional
 
@@ -9,13 +10,12 @@ from fastapi import FastAPI, WebSocket, Depends, Request, HTTPException, Query,
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from linebot import LineBotApi, WebhookHandler
+from linebot import WebhookHandler
 from linebot.exceptions import InvalidSignatureError
 from linebot.models import MessageEvent, TextMessage, TextSendMessage, FollowEvent, UnfollowEvent
 from dotenv import load_dotenv
-import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from contextlib import asynccontextmanager
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import START, StateGraph
 from langgraph.graph.message import MessagesState
 from langchain_core.messages import HumanMessage, AIMessage
@@ -38,19 +38,41 @@ try:
     from .database import SessionLocal
     from .models import LineUser, MessageCategory, MessageTemplate, TemplateUsageLog
     from .crud import (get_all_users, get_chat_history, update_line_user_mode, create_line_user, 
-                       create_chat_message, create_event_log, renew_line_user, block_line_user, get_dashboard_stats)
+                       create_chat_message, create_event_log, renew_line_user, block_line_user, get_dashboard_stats,
+                       create_chat_messages_bulk, get_active_user_ids)
     from .schemas import (LineUserSchema, ChatMessageSchema, DashboardStats, MessageCategoryCreate, 
                           MessageCategoryUpdate, MessageCategorySchema, MessageTemplateCreate, 
                           MessageTemplateUpdate, MessageTemplateSchema, TemplateSelectionRequest)
     from .telegram import send_telegram_notify
-    from .tools import switch_to_manual_mode, query_conversation_history, summarize_conversation
+    from .tools import switch_to_manual_mode, memory_tools
     from .hr_tools import (search_hr_faq, search_hr_policies, check_leave_balance, search_culture_org,
-                           search_hr_faq_json, search_culture_values_json, search_all_hr_data)
+                           search_hr_faq_json, search_culture_values_json, search_all_hr_data,
+                           FAQ_FILE, CULTURE_FILE)
     from .template_crud import (create_message_category, get_message_categories, get_message_category, 
                                update_message_category, delete_message_category, create_message_template, 
                                get_message_templates, get_message_template, update_message_template, delete_message_template)
     from .template_selector import TemplateSelector
     from .message_builder import LineMessageBuilder
+    from .event_queue import KeyedEventDispatcher
+    from .webhook_dedup import WebhookDeduplicator
+    from .message_coalescer import MessageCoalescer
+    from .line_client import LineApiClient, LINE_API_BASE_URL, LINE_DATA_API_BASE_URL
+    from .rate_limit import LineRateLimiter, RetryPolicy, parse_rate_limits
+    from .reply_scheduler import ReplyDeadlineScheduler, ReplyContext, DEFAULT_ACK_TEXT
+    from .loading_state import LoadingIndicatorManager
+    from .profile_cache import ProfileCache
+    from .outbox import Outbox
+    from .broadcast import BroadcastEngine
+    from .answer_cache import AnswerCache, estimate_tokens
+    from .agent_scheduler import AgentScheduler, AgentTimeoutError, AgentQueueFullError
+    from .intent_router import ToolRouter, DirectAnswerAgent, scoped_system_prompt
+    from .faq_fastpath import FaqFastPath
+    from .hr_corpus import hr_corpus
+    from .index_artifact import preload_corpus
+    from .model_router import ModelRouter, ModelTier, TieredAgent, ModelUnavailableError, FAST, STRONG
+    from .memory_agent.conversation import ConversationMemory
+    from .memory_agent.summarizer import ExtractiveSummarizer, LLMSummarizer
+    from .memory_agent.memory import MemoryManager, SummaryWorker
     LOCAL_IMPORTS_AVAILABLE = True
 except ImportError as e:
     print(f"⚠️ Local imports not available: {e}")
@@ -103,13 +125,11 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"❌ Database health check failed: {e}")
     
-    # Test LINE Bot API
-    try:
-        line_bot_api = LineBotApi(os.getenv('LINE_ACCESS_TOKEN'))
-        # Note: This might fail if token is invalid, but we'll catch it
-        logger.info("✅ LINE Bot API initialized")
-    except Exception as e:
-        logger.error(f"❌ LINE Bot API initialization failed: {e}")
+    # LINE API client
+    if LINE_BOT_AVAILABLE:
+        logger.info(f"✅ LINE API client ready (HTTP/2: {line_api.http2})")
+    else:
+        logger.error("❌ LINE API client not available")
     
     # Test Gemini API
     try:
@@ -120,10 +140,42 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Gemini API check failed: {e}")
     
+    # Remember the loop so handler threads can schedule coroutines on it
+    global main_loop
+    main_loop = asyncio.get_running_loop()
+    if LINE_BOT_AVAILABLE:
+        loading_indicator.loop = main_loop
+        # Resend anything a previous process left undelivered
+        await outbox.start()
+    
+    # Start webhook worker pool
+    if event_queue is not None:
+        await event_queue.start()
+    if summary_worker is not None:
+        summary_worker.start()
+    
+    # Load the HR search index in the background; searches before it finishes build lazily
+    if LOCAL_IMPORTS_AVAILABLE and SEARCH_INDEX_PRELOAD:
+        app.state.search_index_preload = asyncio.create_task(
+            asyncio.to_thread(preload_corpus, hr_corpus, [FAQ_FILE, CULTURE_FILE], SEARCH_INDEX_PATH)
+        )
+    
     yield
     
     # Shutdown
     logger.info("🛑 LINE Bot Backend shutting down...")
+    if event_queue is not None:
+        await event_queue.stop()
+    if message_coalescer is not None:
+        await asyncio.to_thread(message_coalescer.flush_all)
+    handler_executor.shutdown(wait=False)
+    if LINE_BOT_AVAILABLE:
+        await outbox.stop(timeout=OUTBOX_DRAIN_TIMEOUT)
+        await line_api.aclose()
+    if conversation_memory is not None:
+        await asyncio.to_thread(conversation_memory.close)
+    if summary_worker is not None:
+        await asyncio.to_thread(summary_worker.stop)
 
 # FastAPI app with lifespan
 app = FastAPI(
@@ -257,6 +309,10 @@ async def get_users():
                 .order('last_activity', desc=True)\
                 .execute()
             
+            # Warm the profile cache for the listed users in the background
+            if LINE_BOT_AVAILABLE:
+                profile_cache.prefetch_background(row.get('line_id') for row in result.data)
+            
             return {
                 "data": result.data,
                 "count": len(result.data),
@@ -271,6 +327,8 @@ async def get_users():
             try:
                 db = SessionLocal()
                 users = get_all_users(db)
+                if LINE_BOT_AVAILABLE:
+                    profile_cache.prefetch_background(user.line_id for user in users)
                 return {
                     "data": [
                         {
@@ -361,48 +419,84 @@ async def send_message(request: dict):
         raise HTTPException(status_code=400, detail="Missing user_id or message")
     
     try:
-        # Send via LINE Bot API
-        line_bot_api = LineBotApi(os.getenv('LINE_ACCESS_TOKEN'))
-        line_bot_api.push_message(user_id, TextSendMessage(text=message))
-        
-        # Save message to database
-        if USING_SUPABASE:
-            supabase = get_supabase()
-            if supabase:
-                result = supabase.table('chat_messages').insert({
-                    'line_user_id': user_id,
-                    'message': message,
-                    'is_from_user': False,
-                    'timestamp': datetime.now().isoformat()
-                }).execute()
-                
-                return {
-                    "status": "sent",
-                    "message": "Message sent successfully via Supabase",
-                    "data": result.data
-                }
-        
-        # Fallback to old database
-        if LOCAL_IMPORTS_AVAILABLE:
-            db = SessionLocal()
-            try:
-                create_chat_message(db, user_id, message, is_from_user=False)
-                return {
-                    "status": "sent",
-                    "message": "Message sent successfully via SQLite"
-                }
-            finally:
-                db.close()
-        
+        # Queue in the outbox and wait for delivery; chat_messages is written once LINE accepts it
+        outbox_id = await outbox.push(user_id, TextSendMessage(text=message), record_text=message,
+                                      timeout=OUTBOX_SEND_TIMEOUT)
         return {
             "status": "sent",
-            "message": "Message sent successfully (no database save)"
+            "message": "Message sent successfully",
+            "outbox_id": outbox_id
         }
         
+    except asyncio.TimeoutError:
+        return {
+            "status": "queued",
+            "message": "Message queued, delivery will be retried in the background"
+        }
     except Exception as e:
         logger.error(f"Error sending message: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+BROADCAST_SEGMENTS = ("all", "bot", "manual")
+
+def get_segment_user_ids(segment: str) -> List[str]:
+    """Resolve a broadcast segment to the LINE ids of users who have not blocked the bot"""
+    mode = None if segment == "all" else segment
+    if USING_SUPABASE:
+        supabase = get_supabase()
+        if not supabase:
+            raise HTTPException(status_code=503, detail="Database not available")
+        query = supabase.table('line_users').select("line_id").is_('blocked_at', 'null')
+        if mode:
+            query = query.eq('mode', mode)
+        return [row['line_id'] for row in query.execute().data]
+    if LOCAL_IMPORTS_AVAILABLE:
+        db = SessionLocal()
+        try:
+            return get_active_user_ids(db, mode)
+        finally:
+            db.close()
+    return []
+
+@app.post("/api/broadcast")
+async def start_broadcast(request: dict):
+    """Send one message to a list of users or a segment ('all', 'bot', 'manual') using multicast"""
+    message = request.get("message")
+    user_ids = request.get("user_ids")
+    segment = request.get("segment")
+    
+    if not message or (not user_ids and not segment):
+        raise HTTPException(status_code=400, detail="Missing message and user_ids or segment")
+    if segment and segment not in BROADCAST_SEGMENTS:
+        raise HTTPException(status_code=400, detail=f"Unknown segment, expected one of {BROADCAST_SEGMENTS}")
+    if not LINE_BOT_AVAILABLE:
+        raise HTTPException(status_code=503, detail="LINE Bot not available")
+    
+    try:
+        if not user_ids:
+            user_ids = await asyncio.to_thread(get_segment_user_ids, segment)
+        job = broadcast_engine.start(user_ids, TextSendMessage(text=message), text=message)
+        return job.to_dict()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error starting broadcast: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/broadcast/{job_id}")
+async def get_broadcast(job_id: str):
+    """Progress of a broadcast job"""
+    job = broadcast_engine.get(job_id) if LINE_BOT_AVAILABLE else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Broadcast job not found")
+    return job.to_dict()
+
+@app.get("/api/broadcasts")
+async def list_broadcasts():
+    """Recent broadcast jobs, newest first"""
+    jobs = broadcast_engine.jobs() if LINE_BOT_AVAILABLE else []
+    return {"data": [job.to_dict() for job in jobs], "count": len(jobs)}
+
 @app.get("/api/templates")
 async def get_templates():
     """Get message templates"""
@@ -475,47 +569,231 @@ async def get_templates():
 # Initialize LINE Bot components (with error handling)
 # ===================================================================
 
-# Initialize checkpointer on first use
-checkpointer = None
+# Webhook processing mode:
+#   sync  - run the LINE event handlers inside the /webhook request (default)
+#   async - verify the signature, queue the events, return 200 and let the worker pool handle them.
+#           Events are sharded by LINE user onto WEBHOOK_LANES serial lanes, so one user's
+#           messages stay in order while different users are processed in parallel.
+WEBHOOK_PROCESSING_MODE = os.getenv("WEBHOOK_PROCESSING_MODE", "sync").lower()
+WEBHOOK_LANES = int(os.getenv("WEBHOOK_LANES", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+
+# Redelivered webhook events are dropped by webhookEventId for WEBHOOK_DEDUP_TTL seconds
+WEBHOOK_DEDUP_TTL = float(os.getenv("WEBHOOK_DEDUP_TTL", "600"))
+WEBHOOK_DEDUP_MAX_SIZE = int(os.getenv("WEBHOOK_DEDUP_MAX_SIZE", "10000"))
+
+# Opt-in burst coalescing: text messages from one user arriving within MESSAGE_COALESCE_MS
+# of each other are answered by a single agent run (0 disables)
+MESSAGE_COALESCE_MS = int(os.getenv("MESSAGE_COALESCE_MS", "0"))
+MESSAGE_COALESCE_MAX_MS = int(os.getenv("MESSAGE_COALESCE_MAX_MS", str(MESSAGE_COALESCE_MS * 4)))
+
+# Event loop captured at startup (used by handler threads)
+main_loop: Optional[asyncio.AbstractEventLoop] = None
+# Threads that run the blocking LINE event handlers (both webhook modes)
+handler_executor = ThreadPoolExecutor(max_workers=WEBHOOK_LANES, thread_name_prefix="line-handler")
+event_queue = None
+webhook_dedup = None
+message_coalescer = None
+
+# Agent answers to user-independent questions are cached by normalised question text (0 disables)
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_SIZE = int(os.getenv("ANSWER_CACHE_MAX_SIZE", "2000"))
+# Jaccard similarity of character trigrams for near-duplicate questions (0 = exact normalised match only)
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+answer_cache = None
+
+# Precompiled search index (build with `python build_search_index.py`); stale or missing -> built in memory
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", os.path.join("data", "search_index.pkl"))
+SEARCH_INDEX_PRELOAD = os.getenv("SEARCH_INDEX_PRELOAD", "true").lower() == "true"
+
+# Confident FAQ matches are answered directly without calling Gemini
+# (calibrate the thresholds with scripts/benchmarks/faq_calibration.py; off until the labelled set covers real traffic)
+FAQ_FASTPATH_ENABLED = os.getenv("FAQ_FASTPATH_ENABLED", "false").lower() == "true"
+FAQ_FASTPATH_MIN_SCORE = float(os.getenv("FAQ_FASTPATH_MIN_SCORE", "16"))
+FAQ_FASTPATH_MIN_MARGIN = float(os.getenv("FAQ_FASTPATH_MIN_MARGIN", "3"))
+faq_fastpath = None
+if FAQ_FASTPATH_ENABLED and LOCAL_IMPORTS_AVAILABLE:
+    faq_fastpath = FaqFastPath(
+        faq_path=os.path.join("data", "json", "faq.json"),
+        min_score=FAQ_FASTPATH_MIN_SCORE,
+        min_margin=FAQ_FASTPATH_MIN_MARGIN
+    )
 
-def get_checkpointer():
-    global checkpointer
-    if checkpointer is None:
-        checkpointer = MemorySaver()
-    return checkpointer
+# Per-user conversation memory: last MEMORY_MAX_TURNS turns for MEMORY_MAX_USERS hot users,
+# spilled to SQLite, fed to the agent as a chat_history of at most MEMORY_HISTORY_TOKENS tokens
+MEMORY_DB_PATH = os.getenv("MEMORY_DB_PATH", "./memory.db")
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "20"))
+MEMORY_MAX_USERS = int(os.getenv("MEMORY_MAX_USERS", "10000"))
+MEMORY_HISTORY_TOKENS = int(os.getenv("MEMORY_HISTORY_TOKENS", "1500"))
+MEMORY_SUMMARY_ENABLED = os.getenv("MEMORY_SUMMARY_ENABLED", "true").lower() == "true"
+MEMORY_RETENTION_DAYS = float(os.getenv("MEMORY_RETENTION_DAYS", "30"))
+conversation_memory = None
+if LOCAL_IMPORTS_AVAILABLE:
+    try:
+        conversation_memory = ConversationMemory(
+            path=MEMORY_DB_PATH,
+            max_turns=MEMORY_MAX_TURNS,
+            max_users=MEMORY_MAX_USERS,
+            history_tokens=MEMORY_HISTORY_TOKENS,
+            summarizer=ExtractiveSummarizer(max_chars=1000) if MEMORY_SUMMARY_ENABLED else None,
+            retention=MEMORY_RETENTION_DAYS * 86400
+        )
+    except Exception as e:
+        logger.error(f"❌ Conversation memory initialization failed: {e}")
+
+# Stored per-user conversation summaries are refreshed incrementally in the background
+# ("extractive" or "llm"; the LLM summarizer falls back to extractive on errors)
+MEMORY_SUMMARIZER = os.getenv("MEMORY_SUMMARIZER", "extractive").lower()
+SUMMARY_INTERVAL = float(os.getenv("SUMMARY_INTERVAL", "30"))
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "50"))
+summary_worker = None
+
+# Gemini agent runs: at most AGENT_MAX_CONCURRENCY at once, the rest queue fairly per user
+# and are cancelled AGENT_RUN_TIMEOUT seconds after being submitted
+AGENT_MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "4"))
+AGENT_RUN_TIMEOUT = float(os.getenv("AGENT_RUN_TIMEOUT", "60"))
+AGENT_MAX_QUEUE = int(os.getenv("AGENT_MAX_QUEUE", "200"))
+AGENT_BUSY_TEXT = "ขออภัยค่ะ ขณะนี้มีผู้ใช้งานจำนวนมาก กรุณาลองส่งคำถามอีกครั้งในภายหลังนะคะ 🙏"
+
+# Local intent classifier sends the agent only the tools a message needs (small talk gets none)
+AGENT_INTENT_ROUTING = os.getenv("AGENT_INTENT_ROUTING", "true").lower() == "true"
+tool_router = None
+
+# Outbound push/multicast messages are written to a local SQLite outbox before sending
+OUTBOX_DB_PATH = os.getenv("OUTBOX_DB_PATH", "./outbox.db")
+OUTBOX_SEND_TIMEOUT = float(os.getenv("OUTBOX_SEND_TIMEOUT", "15"))
+# Upper bound on one reply delivery (pipeline + reply/ack) seen from a worker lane; late answers go through the outbox
+REPLY_DELIVERY_TIMEOUT = float(os.getenv("REPLY_DELIVERY_TIMEOUT", str(AGENT_RUN_TIMEOUT + 30)))
+OUTBOX_DRAIN_TIMEOUT = float(os.getenv("OUTBOX_DRAIN_TIMEOUT", "10"))
+
+def record_bot_messages(user_ids: List[str], text: str):
+    """Save a delivered bot/admin message to chat_messages for each recipient"""
+    if USING_SUPABASE:
+        supabase = get_supabase()
+        if supabase:
+            supabase.table('chat_messages').insert([{
+                'line_user_id': user_id,
+                'message': text,
+                'is_from_user': False,
+                'timestamp': datetime.now().isoformat()
+            } for user_id in user_ids]).execute()
+    elif LOCAL_IMPORTS_AVAILABLE:
+        db = SessionLocal()
+        try:
+            if len(user_ids) == 1:
+                create_chat_message(db, user_ids[0], text, is_from_user=False)
+            else:
+                create_chat_messages_bulk(db, user_ids, text, is_from_user=False)
+        finally:
+            db.close()
 
-# Initialize LINE Bot API
+# Initialize LINE Bot API (one pooled keep-alive client for every LINE endpoint)
 try:
-    line_bot_api = LineBotApi(os.getenv('LINE_ACCESS_TOKEN'))
+    line_api = LineApiClient(
+        os.getenv('LINE_ACCESS_TOKEN'),
+        # Point these at scripts/benchmarks/fake_line_server.py for offline load tests
+        base_url=os.getenv("LINE_API_BASE_URL", LINE_API_BASE_URL),
+        data_base_url=os.getenv("LINE_DATA_API_BASE_URL", LINE_DATA_API_BASE_URL),
+        timeout=float(os.getenv("LINE_HTTP_TIMEOUT", "10")),
+        connect_timeout=float(os.getenv("LINE_HTTP_CONNECT_TIMEOUT", "5")),
+        max_connections=int(os.getenv("LINE_HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("LINE_HTTP_MAX_KEEPALIVE", "20")),
+        http2=os.getenv("LINE_HTTP2", "true").lower() == "true",
+        # Per-endpoint token buckets, e.g. LINE_RATE_LIMITS="push:1000,multicast:100"
+        rate_limiter=LineRateLimiter(parse_rate_limits(os.getenv("LINE_RATE_LIMITS"))),
+        retry_policy=RetryPolicy(
+            max_retries=int(os.getenv("LINE_MAX_RETRIES", "3")),
+            base_delay=float(os.getenv("LINE_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.getenv("LINE_RETRY_MAX_DELAY", "30"))
+        )
+    )
     handler = WebhookHandler(os.getenv('LINE_CHANNEL_SECRET'))
+    outbox = Outbox(
+        line_api,
+        path=OUTBOX_DB_PATH,
+        batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", "50")),
+        max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5")),
+        retry_delay=float(os.getenv("OUTBOX_RETRY_DELAY", "2")),
+        recorder=record_bot_messages
+    )
+    # Admin broadcasts: multicast chunks of up to 500 recipients sent through the outbox
+    broadcast_engine = BroadcastEngine(
+        outbox,
+        chunk_size=int(os.getenv("BROADCAST_CHUNK_SIZE", "500")),
+        concurrency=int(os.getenv("BROADCAST_CONCURRENCY", "4"))
+    )
+    # Reply tokens expire: answer within REPLY_DEADLINE_SECONDS of the event or acknowledge and push
+    reply_scheduler = ReplyDeadlineScheduler(
+        line_api,
+        deadline=float(os.getenv("REPLY_DEADLINE_SECONDS", "20")),
+        ack_text=os.getenv("REPLY_ACK_TEXT", DEFAULT_ACK_TEXT),
+        outbox=outbox
+    )
+    # Tracks active loading animations so each message costs at most one loading call
+    loading_indicator = LoadingIndicatorManager(
+        line_api,
+        initial_latency=float(os.getenv("LOADING_INITIAL_LATENCY", "5")),
+        alpha=float(os.getenv("LOADING_LATENCY_ALPHA", "0.2"))
+    )
+    # Profiles are cached with TTL and one in-flight fetch per user
+    profile_cache = ProfileCache(
+        line_api,
+        ttl=float(os.getenv("PROFILE_CACHE_TTL", "86400")),
+        refresh_after=float(os.getenv("PROFILE_CACHE_REFRESH", "3600")),
+        max_size=int(os.getenv("PROFILE_CACHE_MAX_SIZE", "10000"))
+    )
     LINE_BOT_AVAILABLE = True
     logger.info("✅ LINE Bot API and handler initialized")
 except Exception as e:
     logger.error(f"❌ LINE Bot initialization failed: {e}")
     LINE_BOT_AVAILABLE = False
 
+# Model tiers: easy questions go to GEMINI_FAST_MODEL (empty = single tier), the rest to GEMINI_MODEL,
+# with escalation on low-confidence answers and failover between tiers
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "")
+MODEL_FAST_TIMEOUT = float(os.getenv("MODEL_FAST_TIMEOUT", "15"))
+MODEL_STRONG_TIMEOUT = float(os.getenv("MODEL_STRONG_TIMEOUT", "40"))
+MODEL_FALLBACK_TEXT = "ขออภัยค่ะ ระบบ AI ขัดข้องชั่วคราว สอบถามเพิ่มเติมได้ที่ 📞 021415192 📧 hrdata@moj.go.th"
+model_router = None
+
 # Initialize Gemini LLM
 try:
-    llm = ChatGoogleGenerativeAI(
-        model=os.getenv("GEMINI_MODEL", "gemini-1.5-flash"), 
-        api_key=os.getenv("GEMINI_API_KEY"),
-        temperature=float(os.getenv("GEMINI_TEMPERATURE", "0.7")),
-        max_tokens=int(os.getenv("GEMINI_MAX_TOKENS", "1000"))
-    )
+    def create_gemini_llm(model: str):
+        return ChatGoogleGenerativeAI(
+            model=model, 
+            api_key=os.getenv("GEMINI_API_KEY"),
+            temperature=float(os.getenv("GEMINI_TEMPERATURE", "0.7")),
+            max_tokens=int(os.getenv("GEMINI_MAX_TOKENS", "1000"))
+        )
+    
+    llm = create_gemini_llm(GEMINI_MODEL)
+    tier_llms = {STRONG: llm}
+    model_tiers = [ModelTier(STRONG, GEMINI_MODEL, MODEL_STRONG_TIMEOUT)]
+    if GEMINI_FAST_MODEL and GEMINI_FAST_MODEL != GEMINI_MODEL:
+        tier_llms[FAST] = create_gemini_llm(GEMINI_FAST_MODEL)
+        model_tiers.insert(0, ModelTier(FAST, GEMINI_FAST_MODEL, MODEL_FAST_TIMEOUT))
     GEMINI_AVAILABLE = True
     logger.info("✅ Gemini LLM initialized")
 except Exception as e:
     logger.error(f"❌ Gemini LLM initialization failed: {e}")
     GEMINI_AVAILABLE = False
 
+# One MemoryManager for the summary tools and the background SummaryWorker
+memory_manager = None
+if LOCAL_IMPORTS_AVAILABLE:
+    # Summaries are an easy job: use the cheapest tier
+    memory_manager = MemoryManager(
+        LLMSummarizer(tier_llms.get(FAST, llm)) if MEMORY_SUMMARIZER == "llm" and GEMINI_AVAILABLE else None
+    )
+
 # Initialize tools and agent (with error handling)
 if GEMINI_AVAILABLE and LOCAL_IMPORTS_AVAILABLE:
     try:
         # Tools
         tools = [
             switch_to_manual_mode, 
-            query_conversation_history, 
-            summarize_conversation,
+            *memory_tools(memory_manager),
             search_all_hr_data,        # ฟังก์ชันหลักค้นหาจากทุกแหล่ง
             search_hr_faq_json,        # ค้นหาจาก FAQ JSON
             search_culture_values_json, # ค้นหาจากวัฒนธรรมองค์กร JSON
@@ -565,7 +843,7 @@ if GEMINI_AVAILABLE and LOCAL_IMPORTS_AVAILABLE:
    - search_all_hr_data(): ใช้เป็นหลักสำหรับคำถามเกี่ยวกับ HR (ครอบคลุม FAQ และวัฒนธรรมองค์กร)
    - search_hr_faq_json(): สำหรับคำถาม FAQ เฉพาะ
    - search_culture_values_json(): สำหรับคำถามเกี่ยวกับค่านิยม วัฒนธรรม JUSTICE
-   - Legacy functions: เฉพาะกรณีจำเป็น
+   - Legacy functions (search_hr_faq(), search_culture_org()): เฉพาะกรณีจำเป็น
    - ความรู้ทั่วไป: สำหรับข้อมูลที่ไม่มีในระบบ
 
 2. **รูปแบบการตอบ**:
@@ -644,16 +922,52 @@ https://facebook.com/MOJFinancialAdministrationDivision"
 - "ติดต่อ HR" - แสดงช่องทางติดต่อ
 - "แชทกับเจ้าหน้าที่" - ส่งแจ้งเตือน telegram ให้เจ้าหน้าที่"""
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", HR_SYSTEM_PROMPT),
-            ("placeholder", "{chat_history}"),
-            ("human", "{input}"),
-            ("placeholder", "{agent_scratchpad}"),
-        ])
-
-        # Agent
-        agent = create_tool_calling_agent(llm, tools, prompt)
-        agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+        # Agent (one per model tier); tool subsets only get instructions for the tools they can call
+        def build_agent_executor(agent_tools):
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", scoped_system_prompt(HR_SYSTEM_PROMPT, tools, agent_tools)),
+                ("placeholder", "{chat_history}"),
+                ("human", "{input}"),
+                ("placeholder", "{agent_scratchpad}"),
+            ])
+            return TieredAgent({
+                tier.name: AgentExecutor(
+                    agent=create_tool_calling_agent(tier_llms[tier.name], agent_tools, prompt),
+                    tools=agent_tools, verbose=True, return_intermediate_steps=True
+                ) for tier in model_tiers
+            })
+        
+        agent_executor = build_agent_executor(tools)
+        
+        if AGENT_INTENT_ROUTING:
+            # One precompiled agent per tool subset; small talk is answered without tool schemas
+            direct_prompt = ChatPromptTemplate.from_messages([
+                ("system", scoped_system_prompt(HR_SYSTEM_PROMPT, tools, [])),
+                ("placeholder", "{chat_history}"),
+                ("human", "{input}"),
+            ])
+            direct_agent = TieredAgent({
+                tier.name: DirectAnswerAgent(direct_prompt | tier_llms[tier.name]) for tier in model_tiers
+            })
+            tool_router = ToolRouter(tools, build_agent_executor, direct_agent=direct_agent)
+        
+        model_router = ModelRouter(model_tiers)
+        
+        agent_scheduler = AgentScheduler(
+            max_concurrency=AGENT_MAX_CONCURRENCY,
+            deadline=AGENT_RUN_TIMEOUT,
+            max_queue=AGENT_MAX_QUEUE
+        )
+        
+        if ANSWER_CACHE_TTL > 0:
+            # Cleared automatically whenever the JSON knowledge files change
+            answer_cache = AnswerCache(
+                ttl=ANSWER_CACHE_TTL,
+                max_size=ANSWER_CACHE_MAX_SIZE,
+                similarity=ANSWER_CACHE_SIMILARITY,
+                source_files=[os.path.join("data", "json", "faq.json"), os.path.join("data", "json", "culture_org.json")],
+                prompt_tokens=estimate_tokens(HR_SYSTEM_PROMPT)
+            )
         
         AGENT_AVAILABLE = True
         logger.info("✅ LangChain agent initialized")
@@ -664,6 +978,9 @@ else:
     AGENT_AVAILABLE = False
     logger.warning("⚠️ Agent not available due to missing dependencies")
 
+if LOCAL_IMPORTS_AVAILABLE:
+    summary_worker = SummaryWorker(memory_manager, interval=SUMMARY_INTERVAL, batch_size=SUMMARY_BATCH_SIZE)
+
 # ===================================================================
 # Helper Functions
 # ===================================================================
@@ -700,42 +1017,28 @@ def get_template_response(db: Session, user_id: str, user_message: str, context:
         logger.error(f"Error getting template response: {e}")
         return None, None
 
+def run_on_main_loop(coro, timeout: Optional[float] = None):
+    """Run a coroutine on the main event loop from a handler thread and wait for its result
+    (the coroutine is cancelled if it is still running after `timeout` seconds)"""
+    future = asyncio.run_coroutine_threadsafe(coro, main_loop)
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise
+
 # LINE Loading Animation Functions
-def start_loading_animation(user_id: str, loading_seconds: int = 5):
+async def start_loading_animation(user_id: str, loading_seconds: int = 5):
     """Start LINE loading animation (typing indicator)"""
     if not LINE_BOT_AVAILABLE:
         return False
         
-    try:
-        # Use LINE Messaging API show loading action
-        url = "https://api.line.me/v2/bot/chat/loading/start"
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {os.getenv("LINE_ACCESS_TOKEN")}'
-        }
-        data = {
-            "chatId": user_id,
-            "loadingSeconds": loading_seconds
-        }
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 202:
-            logger.info(f"Loading animation started for user {user_id} for {loading_seconds}s")
-            return True
-        else:
-            logger.warning(f"Failed to start loading animation: {response.status_code} - {response.text}")
-            return False
-    except Exception as e:
-        logger.error(f"Error starting loading animation: {e}")
-        return False
-
-def show_typing_indicator(user_id: str):
-    """Show typing indicator using LINE Chat Loading API"""
-    try:
-        # Use the loading animation API which also shows typing indicator
-        return start_loading_animation(user_id, 2)  # Very short duration for typing effect
-    except Exception as e:
-        logger.error(f"Error showing typing indicator: {e}")
-        return False
+    # LINE only accepts 5-60 seconds in steps of 5; the manager rounds and remembers the state
+    if await loading_indicator.start(user_id, loading_seconds):
+        logger.info(f"Loading animation started for user {user_id} for {loading_seconds}s")
+        return True
+    logger.warning("Failed to start loading animation")
+    return False
 
 # ===================================================================
 # WebSocket for Real-time Communication
@@ -764,6 +1067,15 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+def schedule_broadcast(message: dict):
+    """Broadcast to the admin panel from the event loop or from a handler thread"""
+    try:
+        asyncio.get_running_loop()
+        asyncio.create_task(manager.broadcast(message))
+    except RuntimeError:
+        if main_loop is not None:
+            asyncio.run_coroutine_threadsafe(manager.broadcast(message), main_loop)
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
@@ -775,30 +1087,18 @@ async def websocket_endpoint(websocket: WebSocket):
                 user_id = payload['user_id']
                 message = payload['message']
                 
-                # Show typing indicator before sending admin message
-                show_typing_indicator(user_id)
-                start_loading_animation(user_id, 3)  # Show loading for up to 3 seconds
+                # Show typing indicator before sending admin message (skipped if already showing)
+                if LINE_BOT_AVAILABLE:
+                    loading_indicator.ensure_background(user_id, 5)
                 
                 try:
                     if LINE_BOT_AVAILABLE:
-                        line_bot_api.push_message(user_id, TextSendMessage(text=message))
-                        
-                    # Save to database
-                    if USING_SUPABASE:
-                        supabase = get_supabase()
-                        if supabase:
-                            supabase.table('chat_messages').insert({
-                                'line_user_id': user_id,
-                                'message': message,
-                                'is_from_user': False,
-                                'timestamp': datetime.now().isoformat()
-                            }).execute()
-                    elif LOCAL_IMPORTS_AVAILABLE:
-                        db = SessionLocal()
-                        try:
-                            create_chat_message(db, user_id, message, is_from_user=False)
-                        finally:
-                            db.close()
+                        # Recorded in chat_messages by the outbox after delivery
+                        await outbox.push(user_id, TextSendMessage(text=message), record_text=message,
+                                          timeout=OUTBOX_SEND_TIMEOUT)
+                        loading_indicator.clear(user_id)
+                    else:
+                        await asyncio.to_thread(record_bot_messages, [user_id], message)
                     
                     await manager.broadcast({"type": "message", "user_id": user_id, "text": message, "from": "admin"})
                 except Exception as e:
@@ -827,8 +1127,32 @@ async def webhook(request: Request):
         return JSONResponse(content={"status": "OK", "message": "LINE Bot not available"}, status_code=200)
     
     try:
-        handler.handle(body_str, signature)
-        return JSONResponse(content={"status": "OK"}, status_code=200)
+        # Verify signature and parse, then drop events LINE has already delivered
+        events = handler.parser.parse(body_str, signature)
+        if webhook_dedup is not None:
+            events = [event for event in events if not webhook_dedup.is_duplicate(event)]
+        
+        handled = 0
+        try:
+            if event_queue is not None and event_queue.running:
+                # Hand the events to the worker pool and acknowledge immediately
+                for event in events:
+                    await event_queue.put(event)
+                    handled += 1
+                return JSONResponse(content={"status": "OK", "queued": len(events)}, status_code=200)
+            
+            # Handlers block on Supabase/LINE/Gemini, so run them off the event loop
+            loop = asyncio.get_running_loop()
+            for event in events:
+                await loop.run_in_executor(handler_executor, dispatch_line_event, event)
+                handled += 1
+            return JSONResponse(content={"status": "OK"}, status_code=200)
+        except Exception:
+            # LINE redelivers the body after an error response: unmark the events that were not handled
+            if webhook_dedup is not None:
+                for event in events[handled:]:
+                    webhook_dedup.release(event)
+            raise
     except InvalidSignatureError as e:
         logger.error(f"Invalid signature error: {e}")
         raise HTTPException(status_code=400, detail="Invalid signature")
@@ -843,7 +1167,7 @@ if LINE_BOT_AVAILABLE and LOCAL_IMPORTS_AVAILABLE:
     def handle_follow(event):
         try:
             user_id = event.source.user_id
-            profile = line_bot_api.get_profile(user_id)
+            profile = run_on_main_loop(profile_cache.get(user_id))
             
             if USING_SUPABASE:
                 supabase = get_supabase()
@@ -879,11 +1203,11 @@ if LINE_BOT_AVAILABLE and LOCAL_IMPORTS_AVAILABLE:
                     db.close()
             
             # Broadcast user update
-            asyncio.create_task(manager.broadcast({
+            schedule_broadcast({
                 "type": "user_update", 
                 "user_id": user_id, 
                 "action": "follow"
-            }))
+            })
             
         except Exception as e:
             logger.error(f"Error handling follow event: {e}")
@@ -909,142 +1233,286 @@ if LINE_BOT_AVAILABLE and LOCAL_IMPORTS_AVAILABLE:
                     db.close()
             
             # Broadcast user update
-            asyncio.create_task(manager.broadcast({
+            schedule_broadcast({
                 "type": "user_update", 
                 "user_id": user_id, 
                 "action": "unfollow"
-            }))
+            })
             
         except Exception as e:
             logger.error(f"Error handling unfollow event: {e}")
 
+    def save_user_message(user_id: str, text: str):
+        """Persist an incoming user message (creating the user if needed) and return the user's mode"""
+        user_mode = None
+        if USING_SUPABASE:
+            supabase = get_supabase()
+            if supabase:
+                # Ensure user exists
+                existing = supabase.table('line_users').select("*").eq('line_id', user_id).execute()
+                if not existing.data:
+                    try:
+                        profile = run_on_main_loop(profile_cache.get(user_id))
+                        supabase.table('line_users').insert({
+                            'line_id': user_id,
+                            'name': profile.display_name,
+                            'picture': profile.picture_url,
+                            'mode': 'bot'
+                        }).execute()
+                    except:
+                        supabase.table('line_users').insert({
+                            'line_id': user_id,
+                            'name': 'Unknown User',
+                            'picture': '',
+                            'mode': 'bot'
+                        }).execute()
+                
+                # Save message
+                supabase.table('chat_messages').insert({
+                    'line_user_id': user_id,
+                    'message': text,
+                    'is_from_user': True,
+                    'timestamp': datetime.now().isoformat()
+                }).execute()
+                
+                # Get user mode
+                user_data = supabase.table('line_users').select("mode").eq('line_id', user_id).execute()
+                user_mode = user_data.data[0]['mode'] if user_data.data else 'bot'
+        else:
+            # Fallback to old database
+            db = SessionLocal()
+            try:
+                create_chat_message(db, user_id, text, is_from_user=True)
+                user = db.query(LineUser).filter(LineUser.line_id == user_id).first()
+                if not user:
+                    try:
+                        profile = run_on_main_loop(profile_cache.get(user_id))
+                        user = create_line_user(db, user_id, profile.display_name, profile.picture_url)
+                    except:
+                        user = create_line_user(db, user_id, "Unknown User", "")
+                user_mode = user.mode if user else 'bot'
+            finally:
+                db.close()
+        return user_mode
+
+    def find_template_reply(user_id: str, text: str):
+        """Look up a template response (blocking DB access, run in a worker thread)"""
+        db = SessionLocal()
+        try:
+            return get_template_response(db, user_id, text, "conversation")
+        finally:
+            db.close()
+
+    async def build_reply(user_id: str, text: str):
+        """Run the template/agent pipeline on the main loop and return (LINE message, text to record)"""
+        try:
+            reply_text = "ขอบคุณสำหรับข้อความ กำลังปรับปรุงระบบ"
+            
+            # Try template response first
+            if LOCAL_IMPORTS_AVAILABLE:
+                template_message, template = await asyncio.to_thread(find_template_reply, user_id, text)
+                if template_message and template:
+                    reply_text = f"[Template: {template.name}] " + str(template.content.get('text', 'Template response'))
+                    return template_message, reply_text
+                
+                # Confident FAQ match: answer directly without the LLM
+                if faq_fastpath is not None:
+                    faq_answer = await asyncio.to_thread(faq_fastpath.answer, text)
+                    if faq_answer is not None:
+                        return TextSendMessage(text=faq_answer), faq_answer
+                
+                # Try AI response (answers to repeated questions come from the answer cache)
+                if AGENT_AVAILABLE:
+                    chat_history = (await asyncio.to_thread(conversation_memory.chat_history, user_id)
+                                    if conversation_memory is not None else [])
+                    # Same rule for get and put: answers that depended on earlier turns are not reusable,
+                    # and a follow-up question must not get another user's standalone answer
+                    use_cache = answer_cache is not None and not chat_history
+                    cached = answer_cache.get(text) if use_cache else None
+                    if cached is not None:
+                        reply_text = cached
+                    else:
+                        started = time.monotonic()
+                        intent, executor = tool_router.route(text) if tool_router is not None else (None, agent_executor)
+                        # Bounded Gemini concurrency, fair queueing across users, cancelled at the deadline;
+                        # the model router picks the tier and fails over between tiers
+                        output = await agent_scheduler.run(
+                            user_id,
+                            lambda: model_router.run(executor, {"input": text, "chat_history": chat_history}, intent)
+                        )
+                        if tool_router is not None:
+                            tool_router.record(intent, output)
+                        reply_text = output.get("output", "ขออภัย ไม่สามารถประมวลผลได้ในขณะนี้")
+                        if use_cache and output.get("output"):
+                            tools_used = [action.tool for action, _ in output.get("intermediate_steps", [])]
+                            answer_cache.put(text, reply_text, time.monotonic() - started, tools_used)
+            
+            return TextSendMessage(text=reply_text), reply_text
+        except (AgentTimeoutError, AgentQueueFullError) as e:
+            logger.warning(f"Agent unavailable for user {user_id}: {e}")
+            reply_text = AGENT_BUSY_TEXT
+            return TextSendMessage(text=reply_text), reply_text
+        except ModelUnavailableError as e:
+            logger.error(f"All model tiers failed for user {user_id}: {e}")
+            # A confident FAQ match was already answered by the fast path before the agent ran
+            reply_text = MODEL_FALLBACK_TEXT
+            return TextSendMessage(text=reply_text), reply_text
+        except Exception as e:
+            logger.error(f"Error processing message for user {user_id}: {e}")
+            reply_text = f"ขออภัย เกิดข้อผิดพลาด: {str(e)}"
+            return TextSendMessage(text=reply_text), reply_text
+
+    def reply_to_user(user_id: str, text: str, reply: ReplyContext):
+        """Run the pipeline for a bot-mode user, deliver the answer before the reply token expires and record it"""
+        # Show typing indicator sized to the expected pipeline latency (fire-and-forget)
+        loading_indicator.ensure_background(user_id)
+        
+        result = {}
+        
+        async def run_pipeline():
+            started = time.monotonic()
+            message, result["text"] = await build_reply(user_id, text)
+            loading_indicator.record_latency(time.monotonic() - started)
+            return message
+        
+        # Reply in time, or acknowledge with the token and push the answer later
+        try:
+            run_on_main_loop(reply_scheduler.deliver(user_id, reply, run_pipeline()), timeout=REPLY_DELIVERY_TIMEOUT)
+        except FutureTimeoutError:
+            # Don't hold the worker lane; the agent run has its own deadline so this means LINE itself is stuck
+            logger.warning(f"Reply delivery for user {user_id} timed out after {REPLY_DELIVERY_TIMEOUT:g}s")
+            return
+        finally:
+            # Sending a message hides the animation on LINE's side
+            loading_indicator.clear(user_id)
+        reply_text = result["text"]
+        
+        # Remember the exchange for the next agent prompt
+        if conversation_memory is not None:
+            conversation_memory.append_exchange(user_id, text, reply_text)
+        
+        # Save bot response
+        if USING_SUPABASE:
+            supabase = get_supabase()
+            if supabase:
+                supabase.table('chat_messages').insert({
+                    'line_user_id': user_id,
+                    'message': reply_text,
+                    'is_from_user': False,
+                    'timestamp': datetime.now().isoformat()
+                }).execute()
+        elif LOCAL_IMPORTS_AVAILABLE:
+            db = SessionLocal()
+            try:
+                create_chat_message(db, user_id, reply_text, is_from_user=False)
+            finally:
+                db.close()
+            # Fold the new exchange into the stored summary on the next background batch
+            if summary_worker is not None:
+                summary_worker.mark(user_id)
+        
+        # Broadcast to admin panel
+        schedule_broadcast({
+            "type": "message", 
+            "user_id": user_id, 
+            "text": reply_text, 
+            "from": "bot"
+        })
+
+    def flush_coalesced_messages(user_id: str, texts: List[str], reply: Optional[ReplyContext]):
+        """Answer a burst of fragments with a single pipeline run"""
+        try:
+            reply_to_user(user_id, "\n".join(texts), reply or ReplyContext(None))
+        except Exception as e:
+            logger.error(f"Error handling coalesced messages for user {user_id}: {e}")
+
     @handler.add(MessageEvent, message=TextMessage)
     def handle_message(event):
         try:
             user_id = event.source.user_id
             text = event.message.text
             
-            # Save user message to database
-            if USING_SUPABASE:
-                supabase = get_supabase()
-                if supabase:
-                    # Ensure user exists
-                    existing = supabase.table('line_users').select("*").eq('line_id', user_id).execute()
-                    if not existing.data:
-                        try:
-                            profile = line_bot_api.get_profile(user_id)
-                            supabase.table('line_users').insert({
-                                'line_id': user_id,
-                                'name': profile.display_name,
-                                'picture': profile.picture_url,
-                                'mode': 'bot'
-                            }).execute()
-                        except:
-                            supabase.table('line_users').insert({
-                                'line_id': user_id,
-                                'name': 'Unknown User',
-                                'picture': '',
-                                'mode': 'bot'
-                            }).execute()
-                    
-                    # Save message
-                    supabase.table('chat_messages').insert({
-                        'line_user_id': user_id,
-                        'message': text,
-                        'is_from_user': True,
-                        'timestamp': datetime.now().isoformat()
-                    }).execute()
-                    
-                    # Get user mode
-                    user_data = supabase.table('line_users').select("mode").eq('line_id', user_id).execute()
-                    user_mode = user_data.data[0]['mode'] if user_data.data else 'bot'
-            else:
-                # Fallback to old database
-                db = SessionLocal()
-                try:
-                    create_chat_message(db, user_id, text, is_from_user=True)
-                    user = db.query(LineUser).filter(LineUser.line_id == user_id).first()
-                    if not user:
-                        try:
-                            profile = line_bot_api.get_profile(user_id)
-                            user = create_line_user(db, user_id, profile.display_name, profile.picture_url)
-                        except:
-                            user = create_line_user(db, user_id, "Unknown User", "")
-                    user_mode = user.mode if user else 'bot'
-                finally:
-                    db.close()
+            # Save user message to database (every fragment is stored individually)
+            user_mode = save_user_message(user_id, text)
             
             # Process message based on mode
             if user_mode == 'bot':
-                # Show typing indicator
-                show_typing_indicator(user_id)
-                start_loading_animation(user_id, 5)
-                
-                try:
-                    reply_text = "ขอบคุณสำหรับข้อความ กำลังปรับปรุงระบบ"
-                    
-                    # Try template response first
-                    if LOCAL_IMPORTS_AVAILABLE:
-                        db = SessionLocal()
-                        try:
-                            template_message, template = get_template_response(db, user_id, text, "conversation")
-                            if template_message and template:
-                                line_bot_api.reply_message(event.reply_token, template_message)
-                                reply_text = f"[Template: {template.name}] " + str(template.content.get('text', 'Template response'))
-                            else:
-                                # Try AI response
-                                if AGENT_AVAILABLE:
-                                    output = agent_executor.invoke({"input": text, "chat_history": []})
-                                    reply_text = output.get("output", "ขออภัย ไม่สามารถประมวลผลได้ในขณะนี้")
-                                
-                                line_bot_api.reply_message(event.reply_token, TextSendMessage(text=reply_text))
-                        finally:
-                            db.close()
-                    else:
-                        # Simple fallback response
-                        line_bot_api.reply_message(event.reply_token, TextSendMessage(text=reply_text))
-                        
-                except Exception as e:
-                    logger.error(f"Error processing message for user {user_id}: {e}")
-                    reply_text = f"ขออภัย เกิดข้อผิดพลาด: {str(e)}"
-                    line_bot_api.reply_message(event.reply_token, TextSendMessage(text=reply_text))
-                
-                # Save bot response
-                if USING_SUPABASE:
-                    supabase = get_supabase()
-                    if supabase:
-                        supabase.table('chat_messages').insert({
-                            'line_user_id': user_id,
-                            'message': reply_text,
-                            'is_from_user': False,
-                            'timestamp': datetime.now().isoformat()
-                        }).execute()
-                elif LOCAL_IMPORTS_AVAILABLE:
-                    db = SessionLocal()
-                    try:
-                        create_chat_message(db, user_id, reply_text, is_from_user=False)
-                    finally:
-                        db.close()
-                
-                # Broadcast to admin panel
-                asyncio.create_task(manager.broadcast({
-                    "type": "message", 
-                    "user_id": user_id, 
-                    "text": reply_text, 
-                    "from": "bot"
-                }))
+                if message_coalescer is not None:
+                    # Wait for the rest of the burst before running the pipeline
+                    message_coalescer.add(user_id, text, ReplyContext.from_event(event))
+                else:
+                    reply_to_user(user_id, text, ReplyContext.from_event(event))
             
             # Broadcast user message to admin panel
-            asyncio.create_task(manager.broadcast({
+            schedule_broadcast({
                 "type": "message", 
                 "user_id": user_id, 
                 "text": text, 
                 "from": "user"
-            }))
+            })
             
         except Exception as e:
             logger.error(f"Error handling message: {e}")
 
+def dispatch_line_event(event):
+    """Run the handler registered with `handler.add` for a single parsed event"""
+    func = None
+    if isinstance(event, MessageEvent):
+        func = handler._handlers.get(f"{event.__class__.__name__}_{event.message.__class__.__name__}")
+    if func is None:
+        func = handler._handlers.get(event.__class__.__name__) or handler._default
+    if func is None:
+        logger.info(f"No handler for {event.__class__.__name__}")
+        return
+    func(event)
+
+def process_queued_event(event):
+    """dispatch_line_event for the worker pool - a failed event is unmarked so a redelivery is processed again"""
+    try:
+        dispatch_line_event(event)
+    except Exception:
+        if webhook_dedup is not None:
+            webhook_dedup.release(event)
+        raise
+
+if LINE_BOT_AVAILABLE and LOCAL_IMPORTS_AVAILABLE and WEBHOOK_PROCESSING_MODE == "async":
+    event_queue = KeyedEventDispatcher(process_queued_event, lanes=WEBHOOK_LANES, max_size=WEBHOOK_QUEUE_SIZE,
+                                       executor=handler_executor)
+    logger.info(f"✅ Async webhook mode enabled ({WEBHOOK_LANES} per-user lanes)")
+
+if LINE_BOT_AVAILABLE and LOCAL_IMPORTS_AVAILABLE and MESSAGE_COALESCE_MS > 0:
+    message_coalescer = MessageCoalescer(MESSAGE_COALESCE_MS, flush_coalesced_messages,
+                                         max_wait_ms=MESSAGE_COALESCE_MAX_MS)
+    logger.info(f"✅ Message coalescing enabled ({MESSAGE_COALESCE_MS}ms window)")
+
+if LOCAL_IMPORTS_AVAILABLE and WEBHOOK_DEDUP_TTL > 0:
+    webhook_dedup = WebhookDeduplicator(ttl=WEBHOOK_DEDUP_TTL, max_size=WEBHOOK_DEDUP_MAX_SIZE)
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Runtime metrics for sizing Cloud Run concurrency"""
+    return {
+        "webhook_mode": WEBHOOK_PROCESSING_MODE,
+        "line_api": line_api.stats() if LINE_BOT_AVAILABLE else None,
+        "reply_delivery": reply_scheduler.stats() if LINE_BOT_AVAILABLE else None,
+        "loading_indicator": loading_indicator.stats() if LINE_BOT_AVAILABLE else None,
+        "profile_cache": profile_cache.stats() if LINE_BOT_AVAILABLE else None,
+        "outbox": outbox.stats() if LINE_BOT_AVAILABLE else None,
+        "broadcast": broadcast_engine.stats() if LINE_BOT_AVAILABLE else None,
+        "hr_corpus": hr_corpus.stats() if LOCAL_IMPORTS_AVAILABLE else None,
+        "faq_fastpath": faq_fastpath.stats() if faq_fastpath is not None else None,
+        "answer_cache": answer_cache.stats() if answer_cache is not None else None,
+        "conversation_memory": conversation_memory.stats() if conversation_memory is not None else None,
+        "conversation_summaries": summary_worker.stats() if summary_worker is not None else None,
+        "agent_scheduler": agent_scheduler.stats() if AGENT_AVAILABLE else None,
+        "tool_router": tool_router.stats() if tool_router is not None else None,
+        "model_router": model_router.stats() if model_router is not None else None,
+        "webhook_queue": event_queue.stats() if event_queue is not None else None,
+        "webhook_dedup": webhook_dedup.stats() if webhook_dedup is not None else None,
+        "message_coalescer": message_coalescer.stats() if message_coalescer is not None else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
 # Database dependency
 def get_db():
     if LOCAL_IMPORTS_AVAILABLE:
@@ -1066,11 +1534,11 @@ def set_mode(user_id: str, mode: str = Query(..., description="Mode to set: 'bot
                 result = supabase.table('line_users').update({'mode': mode}).eq('line_id', user_id).execute()
                 if result.data:
                     # Broadcast mode change
-                    asyncio.create_task(manager.broadcast({
+                    schedule_broadcast({
                         "type": "mode_switch", 
                         "user_id": user_id, 
                         "mode": mode
-                    }))
+                    })
                     return {"status": "ok", "mode": mode, "user_id": user_id}
         elif LOCAL_IMPORTS_AVAILABLE:
             db = SessionLocal()
@@ -1078,11 +1546,11 @@ def set_mode(user_id: str, mode: str = Query(..., description="Mode to set: 'bot
                 user = update_line_user_mode(db, user_id, mode)
                 if user:
                     # Broadcast mode change
-                    asyncio.create_task(manager.broadcast({
+                    schedule_broadcast({
                         "type": "mode_switch", 
                         "user_id": user_id, 
                         "mode": mode
-                    }))
+                    })
                     return {"status": "ok", "mode": user.mode, "user_id": user_id}
             finally:
                 db.close()
@@ -1131,23 +1599,17 @@ def dashboard():
 
 # Loading Animation API Endpoints
 @app.post("/api/loading/start/{user_id}")
-def start_loading(user_id: str, loading_seconds: int = 20):
+async def start_loading(user_id: str, loading_seconds: int = 20):
     """Start loading animation for a specific user"""
-    success = start_loading_animation(user_id, loading_seconds)
+    success = await start_loading_animation(user_id, loading_seconds)
     return {"status": "success" if success else "error", "user_id": user_id, "loading_seconds": loading_seconds}
 
 @app.post("/api/loading/stop/{user_id}")
-def stop_loading(user_id: str):
+async def stop_loading(user_id: str):
     """Stop loading animation for a specific user"""
     try:
-        url = "https://api.line.me/v2/bot/chat/loading/stop"
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {os.getenv("LINE_ACCESS_TOKEN")}'
-        }
-        data = {"chatId": user_id}
-        response = requests.post(url, headers=headers, json=data)
-        success = response.status_code == 200
+        success = await line_api.stop_loading(user_id)
+        loading_indicator.clear(user_id)
         return {"status": "success" if success else "error", "user_id": user_id}
     except Exception as e:
         logger.error(f"Error stopping loading animation: {e}")
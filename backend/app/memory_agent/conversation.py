@@ -0,0 +1,249 @@
+"""
+Conversation Memory - เก็บบทสนทนาล่าสุด N turns ต่อผู้ใช้ใน LRU ที่จำกัดขนาด และ spill ลง SQLite
+ใช้สร้าง chat_history ที่จำกัดจำนวน token ให้ agent โดยไม่ต้อง scan ตาราง chat_messages ทุกข้อความ
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    from ..answer_cache import estimate_tokens
+except ImportError:
+    from answer_cache import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+USER = "user"
+ASSISTANT = "assistant"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversation_memory (
+    user_id TEXT PRIMARY KEY,
+    turns TEXT NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_conversation_memory_updated ON conversation_memory (updated_at);
+"""
+
+
+class Turn(NamedTuple):
+    role: str       # "user" or "assistant"
+    content: str
+    at: float
+
+
+class _UserMemory:
+    __slots__ = ("turns", "summary", "evicted")
+
+    def __init__(self, max_turns: int, turns=(), summary: str = ""):
+        self.turns: Deque[Turn] = deque(turns, maxlen=max_turns)
+        self.summary = summary
+        self.evicted: List[Turn] = []  # turns pushed out of the window, not yet folded into the summary
+
+
+class ConversationMemory:
+    """หน่วยความจำบทสนทนาแบบจำกัดขนาด
+
+    - ผู้ใช้ที่ active อยู่ใน LRU ไม่เกิน `max_users` คน แต่ละคนเก็บไม่เกิน `max_turns` turns
+    - ผู้ใช้ที่ถูกไล่ออกจาก LRU และข้อมูลที่เปลี่ยน (ทุก `flush_interval` วินาที) ถูกเขียนลง SQLite
+      แล้วโหลดกลับด้วย primary key เมื่อผู้ใช้กลับมา - แถวที่ไม่ได้ใช้เกิน `retention` วินาทีจะถูกลบ
+    - ถ้ามี `summarizer(summary, turns)` (ดู summarizer.py) turns ที่หลุดจากหน้าต่างจะถูกรวมเป็นสรุปต่อเนื่อง
+    """
+
+    def __init__(self, path: str = "memory.db", max_turns: int = 20, max_users: int = 10000,
+                 history_tokens: int = 1500, summarizer: Optional[Callable[[str, List[Turn]], str]] = None,
+                 flush_interval: float = 5.0, retention: float = 30 * 86400):
+        self.path = path
+        self.max_turns = max_turns
+        self.max_users = max_users
+        self.history_tokens = history_tokens
+        self.summarizer = summarizer
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self._users: "OrderedDict[str, _UserMemory]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._flushed_at = time.monotonic()
+        self._pruned_at = 0.0
+
+        # Metrics
+        self.hits = 0
+        self.loads = 0
+        self.misses = 0
+        self.spills = 0
+        self.rows_written = 0
+        self.summaries = 0
+        self.history_requests = 0
+        self.history_tokens_total = 0
+        self.history_truncated = 0
+
+    # ---------------------------------------------------------------
+    # LRU / SQLite
+    # ---------------------------------------------------------------
+
+    def _get(self, user_id: str) -> _UserMemory:
+        """คืนหน่วยความจำของผู้ใช้ (โหลดจาก SQLite ถ้าไม่อยู่ใน LRU) - ต้องถือ lock"""
+        memory = self._users.get(user_id)
+        if memory is not None:
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return memory
+
+        row = self._conn.execute(
+            "SELECT turns, summary FROM conversation_memory WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is not None:
+            memory = _UserMemory(self.max_turns, (Turn(*t) for t in json.loads(row[0])), row[1])
+            self.loads += 1
+        else:
+            memory = _UserMemory(self.max_turns)
+            self.misses += 1
+        self._users[user_id] = memory
+
+        while len(self._users) > self.max_users:
+            evicted_id, evicted = self._users.popitem(last=False)
+            if evicted_id in self._dirty:
+                self._write([(evicted_id, evicted)])
+                self._dirty.discard(evicted_id)
+                self.spills += 1
+        return memory
+
+    def _write(self, items: List[Tuple[str, _UserMemory]]):
+        now = time.time()
+        rows = [(user_id, json.dumps([list(t) for t in m.turns], ensure_ascii=False), m.summary, now)
+                for user_id, m in items]
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT INTO conversation_memory (user_id, turns, summary, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET turns = excluded.turns, summary = excluded.summary, "
+                "updated_at = excluded.updated_at",
+                rows
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self.rows_written += len(rows)
+
+    def flush(self):
+        """เขียนผู้ใช้ที่มีข้อมูลเปลี่ยนลง SQLite ใน transaction เดียว และลบแถวที่หมดอายุ"""
+        with self._lock:
+            if self._dirty:
+                self._write([(user_id, self._users[user_id]) for user_id in self._dirty if user_id in self._users])
+                self._dirty.clear()
+            self._flushed_at = time.monotonic()
+            if self.retention and time.time() - self._pruned_at > 3600:
+                self._pruned_at = time.time()
+                self._conn.execute("DELETE FROM conversation_memory WHERE updated_at < ?",
+                                   (time.time() - self.retention,))
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"❌ Conversation memory flush failed: {e}")
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    # ---------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------
+
+    def append(self, user_id: str, role: str, content: str):
+        if not content:
+            return
+        with self._lock:
+            memory = self._get(user_id)
+            if self.summarizer is not None and len(memory.turns) == memory.turns.maxlen:
+                memory.evicted.append(memory.turns[0])
+            memory.turns.append(Turn(role, content, time.time()))
+            self._dirty.add(user_id)
+            # Fold evicted turns into the summary once a full exchange has dropped out
+            if len(memory.evicted) >= 2:
+                evicted, memory.evicted = memory.evicted, []
+                try:
+                    memory.summary = self.summarizer(memory.summary, evicted)
+                    self.summaries += 1
+                except Exception as e:
+                    logger.error(f"❌ Conversation summary failed for {user_id}: {e}")
+        self._maybe_flush()
+
+    def append_exchange(self, user_id: str, question: str, answer: str):
+        self.append(user_id, USER, question)
+        self.append(user_id, ASSISTANT, answer)
+
+    def turns(self, user_id: str, limit: Optional[int] = None) -> List[Turn]:
+        with self._lock:
+            turns = list(self._get(user_id).turns)
+        return turns[-limit:] if limit else turns
+
+    def summary(self, user_id: str) -> str:
+        with self._lock:
+            return self._get(user_id).summary
+
+    def chat_history(self, user_id: str, budget_tokens: Optional[int] = None) -> List[Tuple[str, str]]:
+        """คืน chat_history สำหรับ prompt ของ agent: turn ล่าสุดที่ใส่ได้ภายใน budget (และสรุปถ้ายังมีที่)"""
+        budget = self.history_tokens if budget_tokens is None else budget_tokens
+        with self._lock:
+            memory = self._get(user_id)
+            turns = list(memory.turns)
+            summary = memory.summary
+
+        history: List[Tuple[str, str]] = []
+        used = 0
+        for turn in reversed(turns):
+            cost = estimate_tokens(turn.content)
+            if used + cost > budget:
+                self.history_truncated += 1
+                break
+            history.append(("human" if turn.role == USER else "ai", turn.content))
+            used += cost
+        history.reverse()
+
+        if summary:
+            text = f"สรุปบทสนทนาก่อนหน้า:\n{summary}"
+            cost = estimate_tokens(text)
+            if used + cost <= budget:
+                history.insert(0, ("system", text))
+                used += cost
+
+        self.history_requests += 1
+        self.history_tokens_total += used
+        return history
+
+    def clear(self, user_id: str):
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._dirty.discard(user_id)
+            self._conn.execute("DELETE FROM conversation_memory WHERE user_id = ?", (user_id,))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.loads + self.misses
+        return {
+            "hot_users": len(self._users),
+            "max_users": self.max_users,
+            "max_turns": self.max_turns,
+            "dirty_users": len(self._dirty),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "sqlite_loads": self.loads,
+            "new_users": self.misses,
+            "spills": self.spills,
+            "rows_written": self.rows_written,
+            "summaries": self.summaries,
+            "avg_history_tokens": round(self.history_tokens_total / self.history_requests, 1)
+            if self.history_requests else 0.0,
+            "history_truncated": self.history_truncated,
+        }
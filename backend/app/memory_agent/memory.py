@@ -1,12 +1,22 @@
 # Import from parent app directory
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
 try:
-    from ..database import SessionLocal
-    from ..models import ChatMessage
-    from ..crud import get_chat_history
+    from ..database import SessionLocal, engine
+    from ..models import ChatMessage, ConversationSummary
+    from ..crud import get_recent_messages, get_messages_since, get_conversation_summary, save_conversation_summary
+    from .summarizer import ExtractiveSummarizer
 except ImportError:
-    from database import SessionLocal
-    from models import ChatMessage
-    from crud import get_chat_history
+    from database import SessionLocal, engine
+    from models import ChatMessage, ConversationSummary
+    from crud import get_recent_messages, get_messages_since, get_conversation_summary, save_conversation_summary
+    from memory_agent.summarizer import ExtractiveSummarizer
+
+logger = logging.getLogger(__name__)
 
 def get_db():
     db = SessionLocal()
@@ -15,18 +25,167 @@ def get_db():
     finally:
         db.close()
 
+_summary_table_ready = False
+
+# refresh_summary is called from the summary tools and from SummaryWorker; a per-user (striped) lock keeps two
+# refreshes of one user from both inserting the summary row or counting the same messages twice
+_REFRESH_LOCKS = tuple(threading.Lock() for _ in range(64))
+
+
+def _refresh_lock(user_id: str) -> threading.Lock:
+    return _REFRESH_LOCKS[hash(user_id) % len(_REFRESH_LOCKS)]
+
+def _ensure_summary_table():
+    global _summary_table_ready
+    if not _summary_table_ready:
+        ConversationSummary.__table__.create(bind=engine, checkfirst=True)
+        _summary_table_ready = True
+
 class MemoryManager:
+    """อ่านบทสนทนาล่าสุดและสรุปบทสนทนาแบบ incremental
+
+    สรุปถูกเก็บในตาราง conversation_summaries พร้อม high-water mark (`last_message_id`)
+    การสรุปแต่ละครั้งอ่านเฉพาะข้อความที่ใหม่กว่า mark จึงใช้เวลา O(ข้อความใหม่)
+    (`summarizer` เริ่มต้นเป็น ExtractiveSummarizer - main.py ส่ง LLMSummarizer เข้ามาเมื่อ MEMORY_SUMMARIZER=llm)
+    """
+
+    def __init__(self, summarizer: Optional[Callable] = None, batch_size: int = 200):
+        self.summarizer = summarizer or ExtractiveSummarizer()
+        self.batch_size = batch_size
+
     def get_conversation_context(self, user_id: str, max_messages: int = 10) -> list:
         db = next(get_db())
-        messages = get_chat_history(db, user_id)[-max_messages:]
-        return [{"role": "user" if msg.is_from_user else "assistant", "content": msg.message} for msg in messages]
+        try:
+            messages = get_recent_messages(db, user_id, max_messages)
+            return [{"role": "user" if msg.is_from_user else "assistant", "content": msg.message} for msg in messages]
+        finally:
+            db.close()
+
+    def refresh_summary(self, user_id: str) -> Dict[str, Any]:
+        """รวมข้อความที่ใหม่กว่า high-water mark เข้าไปในสรุป แล้วคืน {summary, last_message_id, new_messages}"""
+        _ensure_summary_table()
+        with _refresh_lock(user_id):
+            return self._refresh_summary(user_id)
+
+    def _refresh_summary(self, user_id: str) -> Dict[str, Any]:
+        db = next(get_db())
+        try:
+            row = get_conversation_summary(db, user_id)
+            summary = row.summary if row is not None else ""
+            last_id = row.last_message_id if row is not None else 0
+            folded = 0
+            while True:
+                messages = get_messages_since(db, user_id, last_id, self.batch_size)
+                if not messages:
+                    break
+                summary = self.summarizer(summary, [
+                    ("user" if msg.is_from_user else "assistant", msg.message or "") for msg in messages
+                ])
+                last_id = messages[-1].id
+                folded += len(messages)
+                if len(messages) < self.batch_size:
+                    break
+            if folded:
+                save_conversation_summary(db, user_id, summary, last_id, folded)
+            return {"summary": summary, "last_message_id": last_id, "new_messages": folded}
+        finally:
+            db.close()
 
     def summarize_context(self, user_id: str) -> str:
-        context = self.get_conversation_context(user_id)
-        if not context:
+        summary = self.refresh_summary(user_id)["summary"]
+        if not summary:
             return "No conversation history available."
-        summary = "Conversation summary:\n"
-        for msg in context:
-            role = msg["role"].capitalize()
-            summary += f"{role}: {msg['content']}\n"
-        return summary
\ No newline at end of file
+        return "Conversation summary:\n" + summary
+
+
+class SummaryWorker:
+    """สรุปบทสนทนาแบบ batch ใน background thread
+
+    `mark(user_id)` เมื่อมีข้อความใหม่ แล้วทุก `interval` วินาที worker จะ refresh สรุปของผู้ใช้ที่ถูก mark
+    ครั้งละไม่เกิน `batch_size` คน (ผู้ใช้ที่ถูก mark ซ้ำระหว่างรอจะถูกสรุปครั้งเดียว)
+    """
+
+    def __init__(self, manager: MemoryManager, interval: float = 30.0, batch_size: int = 50,
+                 max_pending: int = 100000):
+        self.manager = manager
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Metrics
+        self.marked = 0
+        self.dropped = 0
+        self.refreshed = 0
+        self.messages_folded = 0
+        self.errors = 0
+        self.last_batch_ms = 0.0
+
+    def mark(self, user_id: str):
+        with self._lock:
+            if user_id in self._pending:
+                return
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending[user_id] = None
+            self.marked += 1
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="summary-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _take_batch(self):
+        with self._lock:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popitem(last=False)[0])
+            return batch
+
+    def run_once(self) -> int:
+        """สรุปผู้ใช้ที่รออยู่หนึ่ง batch - คืนจำนวนผู้ใช้ที่ประมวลผล"""
+        batch = self._take_batch()
+        started = time.perf_counter()
+        for user_id in batch:
+            try:
+                result = self.manager.refresh_summary(user_id)
+                self.refreshed += 1
+                self.messages_folded += result["new_messages"]
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Summary refresh failed for {user_id}: {e}")
+        if batch:
+            self.last_batch_ms = (time.perf_counter() - started) * 1000
+        return len(batch)
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            while not self._stopping and self.run_once() == self.batch_size:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "summarizer": getattr(self.manager.summarizer, "name", type(self.manager.summarizer).__name__),
+            "pending": len(self._pending),
+            "marked": self.marked,
+            "dropped": self.dropped,
+            "refreshed": self.refreshed,
+            "messages_folded": self.messages_folded,
+            "errors": self.errors,
+            "last_batch_ms": round(self.last_batch_ms, 1),
+        }
@@ -0,0 +1,82 @@
+"""
+Conversation summarizers - รวมข้อความใหม่เข้ากับสรุปเดิม (incremental) ใช้แทนกันได้ระหว่างแบบ extractive และ LLM
+
+summarizer ทุกตัวเป็น callable: `summarizer(previous_summary, messages) -> new_summary`
+โดย `messages` คือ sequence ของ (role, content) เรียงจากเก่าไปใหม่ (role = "user" / "assistant")
+"""
+import logging
+import re
+from typing import Any, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Message = Tuple[str, str]
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?。])\s+|\n+")
+
+
+def _first_sentence(text: str, max_length: int) -> str:
+    text = text.strip()
+    sentence = _SENTENCE_END_RE.split(text, 1)[0] if text else ""
+    return sentence if len(sentence) <= max_length else sentence[:max_length - 1] + "…"
+
+
+class ExtractiveSummarizer:
+    """สรุปโดยไม่เรียก LLM: เก็บคำถามของผู้ใช้ และประโยคแรกของคำตอบ (ถ้า include_answers)
+    ตัดบรรทัดเก่าที่สุดออกเมื่อยาวเกิน max_chars"""
+
+    name = "extractive"
+
+    def __init__(self, max_chars: int = 1500, max_line: int = 160, include_answers: bool = True):
+        self.max_chars = max_chars
+        self.max_line = max_line
+        self.include_answers = include_answers
+
+    def __call__(self, previous: str, messages: Sequence[Message]) -> str:
+        lines = [line for line in (previous or "").splitlines() if line]
+        for message in messages:
+            role, content = message[0], message[1]
+            if not content or not content.strip():
+                continue
+            if role == "user":
+                lines.append(f"ผู้ใช้: {_first_sentence(content, self.max_line)}")
+            elif self.include_answers:
+                lines.append(f"บอท: {_first_sentence(content, self.max_line)}")
+        while lines and sum(len(line) + 1 for line in lines) > self.max_chars:
+            lines.pop(0)
+        return "\n".join(lines)
+
+
+class LLMSummarizer:
+    """สรุปด้วย LLM (เช่น Gemini) โดยส่งแค่สรุปเดิม + ข้อความใหม่ - ถ้า LLM ล้มเหลวจะใช้ fallback"""
+
+    name = "llm"
+
+    PROMPT = (
+        "สรุปบทสนทนาระหว่างผู้ใช้กับผู้ช่วย HR ให้กระชับเป็นภาษาไทย ไม่เกิน {max_chars} ตัวอักษร "
+        "เก็บเรื่องที่ผู้ใช้ถาม ข้อมูลสำคัญที่ให้ไป และสิ่งที่ยังค้างอยู่\n\n"
+        "สรุปเดิม:\n{previous}\n\nข้อความใหม่:\n{messages}\n\nสรุปใหม่:"
+    )
+
+    def __init__(self, llm: Any, max_chars: int = 1500, fallback: Optional[Any] = None):
+        self.llm = llm
+        self.max_chars = max_chars
+        self.fallback = fallback or ExtractiveSummarizer(max_chars=max_chars)
+        self.failures = 0
+
+    def __call__(self, previous: str, messages: Sequence[Message]) -> str:
+        transcript = "\n".join(
+            f"{'ผู้ใช้' if m[0] == 'user' else 'บอท'}: {m[1].strip()}" for m in messages if m[1] and m[1].strip()
+        )
+        if not transcript:
+            return previous or ""
+        prompt = self.PROMPT.format(max_chars=self.max_chars, previous=previous or "-", messages=transcript)
+        try:
+            response = self.llm.invoke(prompt)
+            summary = getattr(response, "content", str(response)).strip()
+            if summary:
+                return summary[:self.max_chars]
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"⚠️ LLM summary failed, using {getattr(self.fallback, 'name', 'fallback')}: {e}")
+        return self.fallback(previous, messages)
@@ -0,0 +1,106 @@
+"""
+Message Coalescer - รวมข้อความที่ผู้ใช้พิมพ์ติดๆ กันให้เป็นคำถามเดียวก่อนส่งให้ agent
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingBurst:
+    __slots__ = ("texts", "reply_context", "first_at", "timer")
+
+    def __init__(self, now: float):
+        self.texts: List[str] = []
+        self.reply_context: Any = None
+        self.first_at = now
+        self.timer: Optional[threading.Timer] = None
+
+
+class MessageCoalescer:
+    """Debounce ข้อความของผู้ใช้แต่ละคน
+
+    ข้อความที่เข้ามาห่างกันไม่เกิน `window_ms` จะถูกต่อกันแล้วเรียก
+    `flush(user_id, texts, reply_context)` ครั้งเดียว โดยใช้ reply context (reply token) ของข้อความล่าสุด
+    (token ใหม่สุดมีอายุเหลือมากที่สุด) และจะไม่รอนานเกิน `max_wait_ms` นับจากข้อความแรก
+    """
+
+    def __init__(self, window_ms: int, flush: Callable[[str, List[str], Any], None],
+                 max_wait_ms: Optional[int] = None, max_fragments: int = 10):
+        self.window = window_ms / 1000
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else window_ms * 4) / 1000
+        self.max_fragments = max_fragments
+        self._flush = flush
+        self._pending: Dict[str, _PendingBurst] = {}
+        self._lock = threading.Lock()
+        # One flush at a time per user keeps replies in order
+        self._user_locks: Dict[str, threading.Lock] = {}
+
+        # Metrics
+        self.fragments = 0
+        self.batches = 0
+
+    def add(self, user_id: str, text: str, reply_context: Any):
+        """เพิ่มข้อความเข้า burst ของผู้ใช้ และเลื่อนเวลา flush ออกไป"""
+        flush_now = False
+        with self._lock:
+            now = time.monotonic()
+            burst = self._pending.get(user_id)
+            if burst is None:
+                burst = self._pending[user_id] = _PendingBurst(now)
+            burst.texts.append(text)
+            if reply_context is not None:
+                burst.reply_context = reply_context
+            self.fragments += 1
+
+            if burst.timer is not None:
+                burst.timer.cancel()
+            delay = min(self.window, burst.first_at + self.max_wait - now)
+            if delay <= 0 or len(burst.texts) >= self.max_fragments:
+                flush_now = True
+            else:
+                burst.timer = threading.Timer(delay, self._fire, args=(user_id, burst))
+                burst.timer.daemon = True
+                burst.timer.start()
+
+        if flush_now:
+            self._fire(user_id, burst)
+
+    def _fire(self, user_id: str, burst: _PendingBurst):
+        with self._lock:
+            if self._pending.get(user_id) is not burst:
+                return  # already flushed
+            del self._pending[user_id]
+            user_lock = self._user_locks.setdefault(user_id, threading.Lock())
+            self.batches += 1
+
+        with user_lock:
+            try:
+                self._flush(user_id, burst.texts, burst.reply_context)
+            except Exception as e:
+                logger.error(f"Error flushing coalesced messages for user {user_id}: {e}")
+        with self._lock:
+            if user_id not in self._pending and not user_lock.locked():
+                self._user_locks.pop(user_id, None)
+
+    def flush_all(self):
+        """Flush ทุก burst ที่ค้างอยู่ทันที (ใช้ตอน shutdown)"""
+        with self._lock:
+            pending = list(self._pending.items())
+            for _, burst in pending:
+                if burst.timer is not None:
+                    burst.timer.cancel()
+        for user_id, burst in pending:
+            self._fire(user_id, burst)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": int(self.window * 1000),
+            "max_wait_ms": int(self.max_wait * 1000),
+            "pending_users": len(self._pending),
+            "fragments": self.fragments,
+            "batches": self.batches,
+            "agent_runs_saved": self.fragments - self.batches - sum(len(b.texts) for b in list(self._pending.values())),
+        }
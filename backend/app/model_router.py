@@ -0,0 +1,242 @@
+"""
+Model Router - เลือกรุ่น Gemini ตามความยากของคำถาม (fast / strong) ยกระดับเมื่อคำตอบไม่มั่นใจ และ failover เมื่อรุ่นใดล่ม
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Sequence
+
+try:
+    from .answer_cache import normalize_question
+except ImportError:
+    from answer_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+STRONG = "strong"
+
+# Intents (see intent_router.py) that a cheaper model answers well
+EASY_INTENTS = frozenset({"smalltalk", "hr_faq", "culture", "leave_balance", "handoff"})
+
+# Phrases that mark an answer the fast tier was unsure about
+LOW_CONFIDENCE_MARKERS = (
+    "ไม่พบข้อมูล", "ไม่แน่ใจ", "ไม่สามารถตอบ", "ไม่สามารถประมวลผล", "ไม่มีข้อมูล", "ไม่ทราบ",
+    "agent stopped due to", "i don't know", "i'm not sure",
+)
+
+# Tools that change state (see tools.py); a run that called one is never re-run on another tier
+SIDE_EFFECT_TOOLS = frozenset({"switch_to_manual_mode"})
+
+
+class ModelUnavailableError(Exception):
+    """ทุก tier ล้มเหลว (error หรือ timeout) - ผู้เรียกควรตอบด้วย template แทน"""
+
+
+class ModelTier(NamedTuple):
+    name: str
+    model: str
+    timeout: float      # seconds for one agent run on this tier
+
+
+class TieredAgent:
+    """agent เดียวกัน (prompt + tools) ที่สร้างไว้หนึ่งตัวต่อ tier"""
+
+    def __init__(self, agents: Dict[str, Any]):
+        self.agents = agents
+
+    def for_tier(self, name: str) -> Any:
+        return self.agents[name]
+
+    async def ainvoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Without a router the first (default) tier answers
+        return await next(iter(self.agents.values())).ainvoke(inputs, config)
+
+
+def _percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class _TierStats:
+    def __init__(self, history_size: int):
+        self.calls = 0
+        self.successes = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.latencies: Deque[float] = deque(maxlen=history_size)
+
+
+class ModelRouter:
+    """ส่งคำถามง่ายไป tier แรก (ถูกและเร็ว) คำถามซับซ้อนไป tier สุดท้าย (แรงที่สุด)
+
+    - `tiers` เรียงจากถูกไปแพง ถ้ามี tier เดียวจะใช้ tier นั้นเสมอ (ยังมี failover ไป template)
+    - คำตอบจาก tier ที่ไม่ใช่ตัวสุดท้ายที่ดูไม่มั่นใจจะถูกถามซ้ำกับ tier ที่แรงกว่า (escalation)
+      ยกเว้น run ที่เรียก tool ใน `side_effect_tools` ไปแล้ว (ถามซ้ำจะทำให้ tool ทำงานสองครั้ง)
+    - tier ที่ error หรือเกิน timeout จะ failover ไป tier อื่น ถ้าล้มหมดจะ raise ModelUnavailableError
+    """
+
+    def __init__(self, tiers: Sequence[ModelTier], easy_max_length: int = 60, complex_min_length: int = 150,
+                 confidence_check: Optional[Callable[[Dict[str, Any]], bool]] = None, history_size: int = 500,
+                 side_effect_tools: Sequence[str] = SIDE_EFFECT_TOOLS):
+        if not tiers:
+            raise ValueError("ModelRouter needs at least one tier")
+        self.tiers = list(tiers)
+        self.easy_max_length = easy_max_length
+        self.complex_min_length = complex_min_length
+        self.confidence_check = confidence_check or self.is_confident
+        self.side_effect_tools = frozenset(side_effect_tools)
+        self._stats = {tier.name: _TierStats(history_size) for tier in self.tiers}
+
+        # Metrics
+        self.decisions = defaultdict(int)   # initial tier chosen
+        self.reasons = defaultdict(int)     # why it was chosen
+        self.answered_by = defaultdict(int)
+        self.requests = 0
+        self.escalations = 0
+        self.escalations_skipped = 0
+        self.failovers = 0
+        self.exhausted = 0
+
+    # ---------------------------------------------------------------
+    # Routing
+    # ---------------------------------------------------------------
+
+    def choose(self, text: str, intent: Optional[str] = None) -> int:
+        """คืน index ของ tier ที่จะใช้ก่อน"""
+        if len(self.tiers) == 1:
+            return self._decide(0, "single_tier")
+        key = normalize_question(text)
+        questions = text.count("?") + text.count("？")
+        if len(key) >= self.complex_min_length or questions > 1 or "\n" in text.strip():
+            return self._decide(len(self.tiers) - 1, "complex_message")
+        if intent in EASY_INTENTS and len(key) <= self.easy_max_length:
+            return self._decide(0, f"easy_intent:{intent}")
+        if intent is None and len(key) <= self.easy_max_length // 2:
+            return self._decide(0, "short_message")
+        return self._decide(len(self.tiers) - 1, f"default:{intent or 'unknown'}")
+
+    def _decide(self, index: int, reason: str) -> int:
+        self.decisions[self.tiers[index].name] += 1
+        self.reasons[reason.split(":")[0]] += 1
+        return index
+
+    @staticmethod
+    def is_confident(output: Dict[str, Any]) -> bool:
+        text = (output.get("output") or "").strip().lower()
+        if not text:
+            return False
+        return not any(marker in text for marker in LOW_CONFIDENCE_MARKERS)
+
+    def called_side_effect_tool(self, output: Dict[str, Any]) -> bool:
+        """run นี้เรียก tool ที่เปลี่ยนสถานะไปแล้วหรือไม่ (ต้องเปิด return_intermediate_steps)"""
+        for step in output.get("intermediate_steps") or ():
+            action = step[0] if isinstance(step, (tuple, list)) else step
+            if getattr(action, "tool", None) in self.side_effect_tools:
+                return True
+        return False
+
+    # ---------------------------------------------------------------
+    # Execution
+    # ---------------------------------------------------------------
+
+    async def _invoke(self, tier: ModelTier, agent: TieredAgent, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        stats = self._stats[tier.name]
+        stats.calls += 1
+        started = time.monotonic()
+        try:
+            output = await asyncio.wait_for(agent.for_tier(tier.name).ainvoke(inputs), tier.timeout)
+            stats.successes += 1
+            return output
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.latencies.append(time.monotonic() - started)
+
+    async def run(self, agent: TieredAgent, inputs: Dict[str, Any], intent: Optional[str] = None) -> Dict[str, Any]:
+        """รัน agent บน tier ที่เลือก พร้อม escalation / failover - ผลลัพธ์มี key `model_tier`"""
+        self.requests += 1
+        start = self.choose(inputs.get("input", ""), intent)
+        # Escalate upwards first, then fall back to the cheaper tiers
+        order = list(range(start, len(self.tiers))) + list(range(start - 1, -1, -1))
+        unsure: Optional[Dict[str, Any]] = None
+        failed = False
+
+        for position, index in enumerate(order):
+            tier = self.tiers[index]
+            if position and not failed and index < start:
+                break  # cheaper tiers are only used as failover
+            try:
+                output = await self._invoke(tier, agent, inputs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                reason = "timed out" if isinstance(e, asyncio.TimeoutError) else f"failed: {e}"
+                logger.warning(f"⚠️ Model tier '{tier.name}' ({tier.model}) {reason}")
+                self.failovers += 1
+                failed = True
+                continue
+
+            last_tier = index == len(self.tiers) - 1
+            if not last_tier and index >= start and not self.confidence_check(output):
+                if self.called_side_effect_tool(output):
+                    # Re-running the whole agent would repeat the side effect; keep this answer
+                    self.escalations_skipped += 1
+                    output["model_tier"] = tier.name
+                    self.answered_by[tier.name] += 1
+                    return output
+                # Low-confidence answer from a cheaper tier: ask the stronger one
+                self.escalations += 1
+                unsure = output
+                failed = False
+                continue
+
+            output["model_tier"] = tier.name
+            self.answered_by[tier.name] += 1
+            return output
+
+        if unsure is not None:
+            # The stronger tiers failed; the unsure answer is still better than nothing
+            unsure["model_tier"] = self.tiers[start].name
+            self.answered_by[self.tiers[start].name] += 1
+            return unsure
+        self.exhausted += 1
+        raise ModelUnavailableError("All model tiers failed")
+
+    def stats(self) -> Dict[str, Any]:
+        tiers = {}
+        for tier in self.tiers:
+            stats = self._stats[tier.name]
+            latencies = list(stats.latencies)
+            tiers[tier.name] = {
+                "model": tier.model,
+                "timeout_seconds": tier.timeout,
+                "routed": self.decisions[tier.name],
+                "answered": self.answered_by[tier.name],
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "timeouts": stats.timeouts,
+                "latency_ms": {
+                    "avg": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+                    "p95": round(_percentile(latencies, 0.95) * 1000, 1),
+                },
+            }
+        return {
+            "requests": self.requests,
+            "escalations": self.escalations,
+            "escalation_rate": round(self.escalations / self.requests, 4) if self.requests else 0.0,
+            "escalations_skipped": self.escalations_skipped,
+            "failovers": self.failovers,
+            "template_fallbacks": self.exhausted,
+            "reasons": dict(self.reasons),
+            "tiers": tiers,
+        }
@@ -20,6 +20,16 @@ class ChatMessage(Base):
     is_from_user = Column(Boolean)
     timestamp = Column(DateTime, default=func.now())
 
+class ConversationSummary(Base):
+    """Rolling per-user summary; last_message_id is the high-water mark of chat_messages already folded in"""
+    __tablename__ = "conversation_summaries"
+    id = Column(Integer, primary_key=True, index=True)
+    line_user_id = Column(String, unique=True, index=True)
+    summary = Column(Text, default="")
+    last_message_id = Column(Integer, default=0)
+    message_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 class EventLog(Base):
     __tablename__ = "event_logs"
     id = Column(Integer, primary_key=True, index=True)
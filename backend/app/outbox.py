@@ -0,0 +1,423 @@
+"""
+Outbox - บันทึกข้อความขาออกลง SQLite ก่อนส่งไป LINE แล้วส่งแบบ async พร้อม batching และ retry
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+try:
+    from .line_client import LineApiClient, LineApiError, serialize_messages
+except ImportError:
+    from line_client import LineApiClient, LineApiError, serialize_messages
+
+logger = logging.getLogger(__name__)
+
+# Statuses
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+# LINE accepts up to 5 message objects per push request
+MAX_MESSAGES_PER_REQUEST = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    messages TEXT NOT NULL,
+    record_text TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    last_error TEXT,
+    retry_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_status_due ON outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_outbox_target ON outbox (target, status);
+"""
+
+# A row may only be claimed when no earlier row for the same target is still undelivered
+# (in flight, or waiting for its retry backoff) - otherwise message N+1 could overtake message N
+_NO_EARLIER_UNDELIVERED = (
+    "NOT EXISTS (SELECT 1 FROM outbox AS earlier WHERE earlier.target = outbox.target AND earlier.id < outbox.id"
+    " AND (earlier.status = ? OR (earlier.status = ? AND earlier.next_attempt_at > ?)))"
+)
+
+
+class OutboxDeliveryError(Exception):
+    """ข้อความใน outbox ส่งไม่สำเร็จ (เกินจำนวนครั้งที่ retry ได้ หรือ LINE ปฏิเสธ)"""
+
+
+class OutboxItem(NamedTuple):
+    id: int
+    kind: str               # "push" or "multicast"
+    target: Any             # user id, or list of user ids for multicast
+    messages: List[Dict[str, Any]]
+    record_text: Optional[str]
+    attempts: int
+    created_at: float
+    retry_key: Optional[str] = None     # X-Line-Retry-Key ของ request ที่แถวนี้เคยถูกส่งไปแล้ว
+
+
+class Outbox:
+    """Transactional outbox สำหรับ push / multicast
+
+    - `enqueue()` เขียนข้อความลง SQLite (status = pending) ก่อนส่งเสมอ
+    - worker จะ claim แถวที่ถึงเวลาแบบ atomic (pending -> sending) ทีละ `batch_size` แถว
+      และรวม push ที่ส่งถึงผู้ใช้คนเดียวกันเป็น request เดียว (ไม่เกิน 5 ข้อความ)
+    - แถวของผู้รับคนเดียวกันส่งตามลำดับ id เสมอ - ถ้าแถวก่อนหน้ายังรอ retry แถวที่ตามมาจะรอด้วย
+    - แต่ละ request ได้ retry key ที่บันทึกไว้กับแถว และใช้ key เดิมกับข้อความชุดเดิมทุกครั้งที่ส่งซ้ำ
+    - ส่งสำเร็จ -> sent แล้วเรียก `recorder(user_ids, text)` เพื่อบันทึก chat_messages
+    - ส่งไม่สำเร็จ -> กลับเป็น pending พร้อม backoff จนครบ `max_attempts` แล้วจึงเป็น failed
+    - แถวที่ค้างเป็น sending ตอน process ตายจะถูกส่งใหม่เมื่อ `start()`
+    """
+
+    def __init__(self, line_api: LineApiClient, path: str = "outbox.db", batch_size: int = 50,
+                 max_attempts: int = 5, retry_delay: float = 2.0, poll_interval: float = 1.0,
+                 retention: float = 7 * 86400, recorder: Optional[Callable[[List[str], str], None]] = None):
+        self.line_api = line_api
+        self.path = path
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.recorder = recorder
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "retry_key" not in columns:  # outbox.db created before retry keys were stored
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN retry_key TEXT")
+        self._db_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._waiters: Dict[int, asyncio.Future] = {}
+        self._stopping = False
+
+        # Metrics
+        self.counters = defaultdict(int)
+        self.delivery_ms_total = 0.0
+        self.delivery_ms_max = 0.0
+
+    # ---------------------------------------------------------------
+    # Lifecycle
+    # ---------------------------------------------------------------
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        recovered = await asyncio.to_thread(self._recover)
+        if recovered:
+            logger.info(f"📤 Outbox recovered {recovered} message(s) left in 'sending'")
+        self._task = asyncio.create_task(self._run())
+        logger.info("✅ Outbox worker started")
+
+    async def stop(self, timeout: float = 10.0):
+        """ส่งข้อความที่ถึงกำหนดให้หมดก่อนปิด (ไม่เกิน `timeout` วินาที) - ที่เหลือจะส่งต่อหลัง restart"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Outbox drain timed out, remaining messages will be sent after restart")
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await asyncio.to_thread(self._recover)
+        with self._db_lock:
+            self._conn.close()
+
+    # ---------------------------------------------------------------
+    # Enqueue
+    # ---------------------------------------------------------------
+
+    def enqueue(self, kind: str, target: Any, messages, record_text: Optional[str] = None,
+                wake: bool = True) -> int:
+        """บันทึกข้อความลง outbox (เรียกได้จากทุก thread) - คืนค่า outbox id"""
+        now = time.time()
+        with self._db_lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (kind, target, messages, record_text, status, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(target), json.dumps(serialize_messages(messages), ensure_ascii=False),
+                 record_text, PENDING, now, now))
+        self.counters["enqueued"] += 1
+        if wake and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return cursor.lastrowid
+
+    async def send(self, kind: str, target: Any, messages, record_text: Optional[str] = None,
+                   timeout: Optional[float] = None) -> int:
+        """enqueue แล้วรอจนส่งสำเร็จ - raise OutboxDeliveryError ถ้าล้มเหลวถาวร และ asyncio.TimeoutError ถ้าเกิน `timeout`
+        (กรณี timeout ข้อความยังอยู่ใน outbox และจะถูกส่งต่อ)"""
+        if self._task is None:
+            raise RuntimeError("Outbox worker is not running - call start() first, or use enqueue() to send later")
+        outbox_id = await asyncio.to_thread(self.enqueue, kind, target, messages, record_text, False)
+        future = self._waiters[outbox_id] = self._loop.create_future()
+        self._wakeup.set()
+        try:
+            # The poll loop may have delivered it before the waiter was registered
+            status, error = await asyncio.to_thread(self._status, outbox_id)
+            if status == SENT:
+                return outbox_id
+            if status == FAILED:
+                raise OutboxDeliveryError(error)
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        finally:
+            self._waiters.pop(outbox_id, None)
+        return outbox_id
+
+    async def push(self, user_id: str, messages, record_text: Optional[str] = None,
+                   timeout: Optional[float] = None) -> int:
+        return await self.send("push", user_id, messages, record_text, timeout)
+
+    async def multicast(self, user_ids: List[str], messages, record_text: Optional[str] = None,
+                        timeout: Optional[float] = None) -> int:
+        return await self.send("multicast", list(user_ids), messages, record_text, timeout)
+
+    # ---------------------------------------------------------------
+    # Storage
+    # ---------------------------------------------------------------
+
+    def _recover(self) -> int:
+        with self._db_lock:
+            return self._conn.execute("UPDATE outbox SET status = ? WHERE status = ?", (PENDING, SENDING)).rowcount
+
+    def _claim(self) -> List[OutboxItem]:
+        """เปลี่ยนแถวที่ถึงกำหนดจาก pending เป็น sending ใน transaction เดียว"""
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, kind, target, messages, record_text, attempts, created_at, retry_key FROM outbox"
+                    f" WHERE status = ? AND next_attempt_at <= ? AND {_NO_EARLIER_UNDELIVERED} ORDER BY id LIMIT ?",
+                    (PENDING, now, SENDING, PENDING, now, self.batch_size)).fetchall()
+                keys = {row[7] for row in rows if row[7]}
+                if keys:
+                    # Rows sent together under one retry key must be retried together, even past the batch limit
+                    rows += self._conn.execute(
+                        "SELECT id, kind, target, messages, record_text, attempts, created_at, retry_key FROM outbox"
+                        f" WHERE status = ? AND id > ? AND retry_key IN ({', '.join('?' * len(keys))}) ORDER BY id",
+                        (PENDING, rows[-1][0], *keys)).fetchall()
+                self._conn.executemany("UPDATE outbox SET status = ?, attempts = attempts + 1 WHERE id = ?",
+                                       [(SENDING, row[0]) for row in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [OutboxItem(row[0], row[1], json.loads(row[2]), json.loads(row[3]), row[4], row[5] + 1, row[6], row[7])
+                for row in rows]
+
+    def _status(self, outbox_id: int):
+        with self._db_lock:
+            return self._conn.execute("SELECT status, last_error FROM outbox WHERE id = ?", (outbox_id,)).fetchone()
+
+    def _release(self, items: List[OutboxItem]):
+        """คืนแถวที่ claim แล้วแต่ยังไม่ได้ส่งกลับเป็น pending (ไม่นับเป็นการพยายามส่ง)"""
+        with self._db_lock:
+            self._conn.executemany("UPDATE outbox SET status = ?, attempts = attempts - 1 WHERE id = ?",
+                                   [(PENDING, item.id) for item in items])
+
+    def _assign_retry_keys(self, per_target: List[List[List[OutboxItem]]]) -> List[List[List[OutboxItem]]]:
+        """ให้ retry key กับ request ที่ยังไม่เคยส่ง และบันทึกลงแถวก่อนส่งจริง"""
+        assigned, updates = [], []
+        for groups in per_target:
+            keyed = []
+            for group in groups:
+                if group[0].retry_key is None:
+                    key = str(uuid.uuid4())
+                    group = [item._replace(retry_key=key) for item in group]
+                    updates.extend((key, item.id) for item in group)
+                keyed.append(group)
+            assigned.append(keyed)
+        if updates:
+            with self._db_lock:
+                self._conn.executemany("UPDATE outbox SET retry_key = ? WHERE id = ?", updates)
+        return assigned
+
+    def _next_due_in(self) -> Optional[float]:
+        # Only the oldest undelivered row per target can become due; later rows wait for it
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = ? AND NOT EXISTS (SELECT 1 FROM outbox AS earlier"
+                " WHERE earlier.target = outbox.target AND earlier.id < outbox.id AND earlier.status IN (?, ?))",
+                (PENDING, PENDING, SENDING)).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def _mark_sent(self, items: List[OutboxItem]):
+        with self._db_lock:
+            self._conn.executemany("UPDATE outbox SET status = ?, sent_at = ?, last_error = NULL WHERE id = ?",
+                                   [(SENT, time.time(), item.id) for item in items])
+
+    def _mark_failed(self, items: List[OutboxItem], error: str, permanent: bool):
+        now = time.time()
+        updates = []
+        for item in items:
+            if permanent or item.attempts >= self.max_attempts:
+                updates.append((FAILED, now, error, item.id))
+            else:
+                updates.append((PENDING, now + self.retry_delay * (2 ** (item.attempts - 1)), error, item.id))
+        with self._db_lock:
+            self._conn.executemany("UPDATE outbox SET status = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                                   updates)
+        return [u[0] for u in updates]
+
+    def _prune(self):
+        with self._db_lock:
+            self._conn.execute("DELETE FROM outbox WHERE status = ? AND sent_at < ?", (SENT, time.time() - self.retention))
+
+    def status_counts(self) -> Dict[str, int]:
+        with self._db_lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return dict(rows)
+
+    # ---------------------------------------------------------------
+    # Worker
+    # ---------------------------------------------------------------
+
+    async def _run(self):
+        last_prune = 0.0
+        while True:
+            try:
+                items = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                logger.error(f"Outbox claim failed: {e}")
+                items = []
+            if items:
+                try:
+                    per_target = await asyncio.to_thread(self._assign_retry_keys, self._group(items))
+                except Exception as e:
+                    logger.error(f"Outbox retry key assignment failed: {e}")
+                    await asyncio.to_thread(self._release, items)
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                await asyncio.gather(*(self._deliver_in_order(groups) for groups in per_target))
+                continue
+
+            due_in = await asyncio.to_thread(self._next_due_in)
+            if self._stopping and (due_in is None or due_in > 0):
+                return
+            if time.time() - last_prune > 3600:
+                await asyncio.to_thread(self._prune)
+                last_prune = time.time()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), min(due_in if due_in is not None else self.poll_interval,
+                                                                 self.poll_interval))
+            except asyncio.TimeoutError:
+                pass
+
+    @staticmethod
+    def _group(items: List[OutboxItem]) -> List[List[List[OutboxItem]]]:
+        """แบ่ง push ตามผู้รับ (คงลำดับเดิม) แล้วรวมเป็น request ละไม่เกิน 5 ข้อความ
+        - multicast แต่ละแถวเป็น request แยกกัน
+        - แถวที่มี retry key แล้วจะถูกรวมเฉพาะกับแถวที่มี key เดียวกัน (ข้อความชุดเดิมของ request ที่เคยส่ง)"""
+        per_target: Dict[Any, List[List[OutboxItem]]] = {}
+        for item in items:
+            if item.kind != "push":
+                per_target[("multicast", item.id)] = [[item]]
+                continue
+            groups = per_target.setdefault(item.target, [])
+            if groups and item.retry_key is not None and groups[-1][0].retry_key == item.retry_key:
+                groups[-1].append(item)
+            elif groups and item.retry_key is None and groups[-1][0].retry_key is None and \
+                    sum(len(i.messages) for i in groups[-1]) + len(item.messages) <= MAX_MESSAGES_PER_REQUEST:
+                groups[-1].append(item)
+            else:
+                groups.append([item])
+        return list(per_target.values())
+
+    async def _deliver_in_order(self, groups: List[List[OutboxItem]]):
+        """ส่ง request ของผู้รับคนเดียวกันทีละรายการ ถ้ารายการใดล้มเหลว รายการที่ตามมาจะรอรอบหน้า"""
+        for index, group in enumerate(groups):
+            if not await self._deliver(group):
+                rest = [item for later in groups[index + 1:] for item in later]
+                if rest:
+                    await asyncio.to_thread(self._release, rest)
+                return
+
+    async def _deliver(self, group: List[OutboxItem]) -> bool:
+        head = group[0]
+        messages = [m for item in group for m in item.messages]
+        self.counters["requests"] += 1
+        try:
+            if head.kind == "multicast":
+                await self.line_api.multicast(head.target, messages, retry_key=head.retry_key)
+            else:
+                await self.line_api.push_message(head.target, messages, retry_key=head.retry_key)
+        except Exception as e:
+            # 4xx other than 429 will not succeed on retry (bad token, blocked user, invalid message)
+            permanent = isinstance(e, LineApiError) and 400 <= e.status_code < 500 and e.status_code != 429
+            statuses = await asyncio.to_thread(self._mark_failed, group, str(e), permanent)
+            for item, status in zip(group, statuses):
+                if status == FAILED:
+                    self.counters["failed"] += 1
+                    logger.error(f"Outbox message {item.id} to {item.target} failed permanently: {e}")
+                    self._resolve(item.id, OutboxDeliveryError(str(e)))
+                else:
+                    self.counters["retries"] += 1
+            return False
+
+        await asyncio.to_thread(self._mark_sent, group)
+        now = time.time()
+        for item in group:
+            self.counters["sent"] += 1
+            delivery_ms = (now - item.created_at) * 1000
+            self.delivery_ms_total += delivery_ms
+            self.delivery_ms_max = max(self.delivery_ms_max, delivery_ms)
+        if self.recorder is not None:
+            for item in group:
+                if item.record_text is not None:
+                    recipients = item.target if item.kind == "multicast" else [item.target]
+                    try:
+                        await asyncio.to_thread(self.recorder, recipients, item.record_text)
+                    except Exception as e:
+                        logger.error(f"Outbox recorder failed for message {item.id}: {e}")
+        for item in group:
+            self._resolve(item.id, None)
+        return True
+
+    def _resolve(self, outbox_id: int, error: Optional[Exception]):
+        future = self._waiters.pop(outbox_id, None)
+        if future is None or future.done():
+            return
+        if error is None:
+            future.set_result(outbox_id)
+        else:
+            future.set_exception(error)
+
+    def stats(self) -> Dict[str, Any]:
+        sent = self.counters["sent"]
+        return {
+            "running": self._task is not None,
+            "statuses": self.status_counts(),
+            "enqueued": self.counters["enqueued"],
+            "sent": sent,
+            "failed": self.counters["failed"],
+            "retries": self.counters["retries"],
+            "requests": self.counters["requests"],
+            "messages_per_request": round(sent / self.counters["requests"], 2) if self.counters["requests"] else 0.0,
+            "avg_delivery_ms": round(self.delivery_ms_total / sent, 1) if sent else 0.0,
+            "max_delivery_ms": round(self.delivery_ms_max, 1),
+            "waiting": len(self._waiters),
+        }
@@ -0,0 +1,124 @@
+"""
+Profile Cache - แคชโปรไฟล์ผู้ใช้ LINE พร้อม TTL และรวม request ที่ซ้ำกัน (singleflight)
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+
+from linebot.models import Profile
+
+try:
+    from .line_client import LineApiClient
+    from .ttl_cache import TTLCache
+except ImportError:
+    from line_client import LineApiClient
+    from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileCache:
+    """แคช `get_profile` ของ LINE (ใช้บน event loop หลักเท่านั้น)
+
+    - โปรไฟล์ที่อายุเกิน `refresh_after` ยังตอบจากแคชได้ แต่จะ refresh เบื้องหลัง
+    - โปรไฟล์ที่อายุเกิน `ttl` ถือว่าหมดอายุและต้องรอดึงใหม่
+    - ผู้ใช้คนเดียวกันจะมี request ไปยัง LINE ได้ครั้งละหนึ่งรายการ ผู้เรียกที่เหลือรอผลเดียวกัน
+    """
+
+    def __init__(self, line_api: LineApiClient, ttl: float = 86400.0, refresh_after: float = 3600.0,
+                 max_size: int = 10000, prefetch_concurrency: int = 10):
+        self.line_api = line_api
+        self.refresh_after = refresh_after
+        self.prefetch_concurrency = prefetch_concurrency
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetches = 0
+        self.errors = 0
+        self.prefetched = 0
+
+    async def get(self, user_id: str) -> Profile:
+        """คืนโปรไฟล์จากแคช หรือดึงจาก LINE (error จาก LINE จะถูกส่งต่อให้ผู้เรียก)"""
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            profile, fetched_at = entry
+            if time.monotonic() - fetched_at > self.refresh_after:
+                self.stale_hits += 1
+                self._fetch(user_id)
+            else:
+                self.hits += 1
+            return profile
+        self.misses += 1
+        return await asyncio.shield(self._fetch(user_id))
+
+    def _fetch(self, user_id: str) -> asyncio.Future:
+        future = self._inflight.get(user_id)
+        if future is not None:
+            self.coalesced += 1
+            return future
+        future = asyncio.ensure_future(self._load(user_id))
+        self._inflight[user_id] = future
+        # Background refreshes nobody awaits must not log "exception never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return future
+
+    async def _load(self, user_id: str) -> Profile:
+        self.fetches += 1
+        try:
+            profile = await self.line_api.get_profile(user_id)
+            self._cache.set(user_id, (profile, time.monotonic()))
+            return profile
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Failed to fetch LINE profile for {user_id}: {e}")
+            raise
+        finally:
+            self._inflight.pop(user_id, None)
+
+    def invalidate(self, user_id: str):
+        self._cache.pop(user_id)
+
+    async def prefetch(self, user_ids: Iterable[str]) -> int:
+        """ดึงโปรไฟล์ที่ยังไม่มีในแคช (จำกัด concurrency) - คืนจำนวนที่ดึงสำเร็จ"""
+        missing = [uid for uid in dict.fromkeys(user_ids) if uid and uid not in self._cache]
+        semaphore = asyncio.Semaphore(self.prefetch_concurrency)
+
+        async def load(user_id: str) -> bool:
+            async with semaphore:
+                try:
+                    await self._fetch(user_id)
+                    return True
+                except Exception:
+                    return False
+
+        loaded = sum(await asyncio.gather(*(load(uid) for uid in missing)))
+        self.prefetched += loaded
+        return loaded
+
+    def prefetch_background(self, user_ids: Iterable[str]):
+        """เริ่ม `prefetch()` เป็น task เบื้องหลัง (เรียกจาก event loop)"""
+        task = asyncio.create_task(self.prefetch(list(user_ids)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+            "errors": self.errors,
+            "prefetched": self.prefetched,
+            "inflight": len(self._inflight),
+            "cache": self._cache.stats(),
+        }
@@ -0,0 +1,142 @@
+"""
+Rate Limiting - token bucket ต่อประเภท endpoint ของ LINE และ retry policy แบบ jittered backoff
+"""
+import asyncio
+import random
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+# LINE Messaging API rate limits (requests per second) per endpoint class
+DEFAULT_LINE_RATE_LIMITS = {
+    "reply": 2000,
+    "push": 2000,
+    "multicast": 200,
+    "profile": 2000,
+    "loading": 100,
+    "content": 2000,
+}
+
+
+class TokenBucket:
+    """Token bucket แบบ async - `acquire()` จะรอจนมี token แล้วคืนเวลาที่รอ (วินาที)"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+class RetryPolicy:
+    """Exponential backoff พร้อม full jitter และเคารพ header `Retry-After`"""
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, status_code: Optional[int], attempt: int) -> bool:
+        """status_code เป็น None เมื่อเกิด network error"""
+        if attempt >= self.max_retries:
+            return False
+        return status_code is None or status_code in self.RETRY_STATUSES
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        parsed = parse_retry_after(retry_after)
+        if parsed is not None:
+            return min(parsed, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """รองรับทั้งรูปแบบวินาที และ HTTP-date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rate_limits(value: Optional[str]) -> Dict[str, float]:
+    """แปลงค่า env เช่น "push:1000,multicast:100" เป็น dict"""
+    limits: Dict[str, float] = {}
+    for item in (value or "").split(","):
+        if ":" in item:
+            name, rate = item.split(":", 1)
+            limits[name.strip()] = float(rate)
+    return limits
+
+
+class LineRateLimiter:
+    """รวม token bucket ของแต่ละ endpoint class และเก็บสถิติการรอ/การ retry"""
+
+    def __init__(self, limits: Optional[Mapping[str, float]] = None):
+        self.limits = {**DEFAULT_LINE_RATE_LIMITS, **(limits or {})}
+        self._buckets = {name: TokenBucket(rate) for name, rate in self.limits.items()}
+
+        # Metrics per endpoint class
+        self.requests = defaultdict(int)
+        self.throttled = defaultdict(int)
+        self.throttle_seconds = defaultdict(float)
+        self.retries = defaultdict(int)
+        self.rate_limited = defaultdict(int)
+        self.failures = defaultdict(int)
+
+    async def acquire(self, endpoint: str):
+        self.requests[endpoint] += 1
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            return
+        waited = await bucket.acquire()
+        if waited:
+            self.throttled[endpoint] += 1
+            self.throttle_seconds[endpoint] += waited
+
+    def record_retry(self, endpoint: str, status_code: Optional[int]):
+        self.retries[endpoint] += 1
+        if status_code == 429:
+            self.rate_limited[endpoint] += 1
+
+    def record_failure(self, endpoint: str):
+        self.failures[endpoint] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            endpoint: {
+                "limit_per_second": self.limits.get(endpoint),
+                "requests": self.requests[endpoint],
+                "throttled": self.throttled[endpoint],
+                "throttle_wait_seconds": round(self.throttle_seconds[endpoint], 3),
+                "retries": self.retries[endpoint],
+                "rate_limited_429": self.rate_limited[endpoint],
+                "failures": self.failures[endpoint],
+            }
+            for endpoint in sorted(set(self.limits) | set(self.requests))
+        }
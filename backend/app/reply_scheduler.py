@@ -0,0 +1,133 @@
+"""
+Reply Deadline Scheduler - เลือกระหว่าง reply กับ push ตามอายุของ reply token
+"""
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Dict, NamedTuple, Optional
+
+from linebot.models import TextSendMessage
+
+try:
+    from .line_client import LineApiClient, LineApiError
+    from .outbox import Outbox
+except ImportError:
+    from line_client import LineApiClient, LineApiError
+    from outbox import Outbox
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACK_TEXT = "ได้รับคำถามแล้วค่ะ ⏳ กำลังค้นหาข้อมูลให้นะคะ"
+
+# Outcomes
+REPLY = "reply"                      # final answer sent with the reply token in time
+ACK_THEN_PUSH = "ack_then_push"      # token used for an acknowledgement, answer pushed later
+PUSH = "push"                        # no usable reply token, answer pushed
+PUSH_AFTER_REPLY_FAILED = "push_after_reply_failed"
+FAILED = "failed"
+
+
+class ReplyContext(NamedTuple):
+    """ข้อมูลของ event ที่ใช้ตอบกลับ (received_at เป็น epoch seconds จาก event.timestamp)"""
+    reply_token: Optional[str]
+    received_at: Optional[float] = None
+    event_id: Optional[str] = None
+
+    @classmethod
+    def from_event(cls, event: Any) -> "ReplyContext":
+        timestamp = getattr(event, "timestamp", None)
+        return cls(getattr(event, "reply_token", None), timestamp / 1000 if timestamp else None,
+                   getattr(event, "webhook_event_id", None))
+
+
+class ReplyDeadlineScheduler:
+    """ส่งคำตอบให้ทันอายุ reply token
+
+    ถ้า pipeline (template / agent) เสร็จก่อน `deadline` นับจากเวลาที่ LINE สร้าง event
+    จะตอบด้วย reply token ตามปกติ ถ้าไม่ทัน จะใช้ token ส่งข้อความรับทราบทันที
+    แล้วค่อยส่งคำตอบจริงด้วย push_message เมื่อ pipeline เสร็จ
+    (ถ้ามี `outbox` การ push จะบันทึกลง outbox แล้วกลับทันที outbox จะ retry เองแม้ process restart)
+    """
+
+    def __init__(self, line_api: LineApiClient, deadline: float = 20.0, ack_text: str = DEFAULT_ACK_TEXT,
+                 history_size: int = 200, outbox: Optional[Outbox] = None):
+        self.line_api = line_api
+        self.outbox = outbox
+        self.deadline = deadline
+        self.ack_text = ack_text
+        self.outcomes = Counter()
+        self.recent = deque(maxlen=history_size)
+
+    async def deliver(self, user_id: str, reply: ReplyContext, compute: Awaitable[Any]) -> str:
+        """รอผลจาก `compute` (ข้อความที่จะส่ง) แล้วส่งด้วยวิธีที่เหมาะกับเวลาที่เหลือ - คืนค่า outcome"""
+        started = time.time()
+        reply_token, event_id = reply.reply_token, reply.event_id
+        received_at = reply.received_at or started
+        task = asyncio.ensure_future(compute)
+        outcome = FAILED
+        try:
+            if not reply_token:
+                await self._push(user_id, await task)
+                outcome = PUSH
+                return outcome
+
+            remaining = received_at + self.deadline - time.time()
+            try:
+                messages = await asyncio.wait_for(asyncio.shield(task), timeout=max(0.0, remaining))
+            except asyncio.TimeoutError:
+                # Too slow: spend the token on an acknowledgement, then push the answer
+                await self._reply_or_skip(reply_token, TextSendMessage(text=self.ack_text))
+                await self._push(user_id, await task)
+                outcome = ACK_THEN_PUSH
+                return outcome
+
+            try:
+                await self.line_api.reply_message(reply_token, messages)
+                outcome = REPLY
+            except LineApiError as e:
+                if e.status_code != 400:
+                    raise
+                # Token expired or already used
+                logger.warning(f"Reply token rejected for user {user_id}, pushing instead: {e.message}")
+                await self._push(user_id, messages)
+                outcome = PUSH_AFTER_REPLY_FAILED
+            return outcome
+        except Exception as e:
+            logger.error(f"Error delivering reply to user {user_id}: {e}")
+            raise
+        finally:
+            self._record(event_id, user_id, outcome, received_at, started)
+
+    async def _reply_or_skip(self, reply_token: str, messages):
+        try:
+            await self.line_api.reply_message(reply_token, messages)
+        except LineApiError as e:
+            logger.warning(f"Acknowledgement reply failed: {e.message}")
+
+    async def _push(self, user_id: str, messages):
+        if self.outbox is not None:
+            # Hand off without waiting: the outbox retries on its own schedule, the caller's lane moves on
+            await asyncio.to_thread(self.outbox.enqueue, "push", user_id, messages)
+        else:
+            await self.line_api.push_message(user_id, messages)
+
+    def _record(self, event_id: Optional[str], user_id: str, outcome: str, received_at: float, started: float):
+        now = time.time()
+        self.outcomes[outcome] += 1
+        self.recent.append({
+            "event_id": event_id,
+            "user_id": user_id,
+            "outcome": outcome,
+            "token_age_ms": int((now - received_at) * 1000),
+            "pipeline_ms": int((now - started) * 1000),
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.outcomes.values())
+        return {
+            "deadline_seconds": self.deadline,
+            "outcomes": dict(self.outcomes),
+            "reply_rate": round(self.outcomes[REPLY] / total, 4) if total else 0.0,
+            "recent": list(self.recent)[-20:],
+        }
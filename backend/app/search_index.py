@@ -0,0 +1,203 @@
+"""
+Search Index - ตัดคำภาษาไทยด้วย dictionary trie (maximal matching) และ inverted index จัดอันดับแบบ BM25
+
+ภาษาไทยไม่มีช่องว่างระหว่างคำ การ `split()` คำถามจึงได้ "คำ" เดียวยาวทั้งประโยค
+ตัวตัดคำนี้ใช้พจนานุกรม (seed จาก keywords ใน FAQ + คำพื้นฐาน) เลือกการตัดที่มีตัวอักษรที่ไม่รู้จักน้อยที่สุด
+แล้วจำนวนคำน้อยที่สุด ส่วนภาษาอังกฤษ/ตัวเลขตัดตามตัวอักษรปกติ
+"""
+import heapq
+import math
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Thai runs, or Latin/digit runs (keeps "ก.พ.7"-style dotted codes together with their digits)
+_TOKEN_RE = re.compile(r"[\u0e00-\u0e7f]+|[a-z0-9]+(?:\.[a-z0-9]+)*")
+
+# Common words in HR questions - seeds the segmenter so they split off cleanly
+BASE_WORDS = (
+    "ลา", "ป่วย", "กิจ", "พักผ่อน", "วันลา", "ติดต่อ", "เบอร์", "โทร", "เบอร์โทร", "โทรศัพท์", "อีเมล",
+    "ขอ", "ดู", "ทำ", "ยื่น", "แก้ไข", "ยกเลิก", "ตรวจสอบ", "บัตร", "ระบบ", "รหัส", "รหัสผ่าน", "ลืม",
+    "สิทธิ", "เงินเดือน", "ตำแหน่ง", "เลื่อน", "ระดับ", "สำเนา", "ประวัติ", "ข้อมูล", "บุคคล", "บุคลากร",
+    "กอง", "กลุ่มงาน", "งาน", "สำนักงาน", "ปลัด", "กระทรวง", "ยุติธรรม", "รับรอง", "หนังสือ", "ใบ",
+    "ข้าราชการ", "พนักงานราชการ", "ลูกจ้าง", "ลูกจ้างประจำ", "ชั่วคราว", "เกษียณ", "อายุ", "วุฒิ",
+    "ค่านิยม", "วัฒนธรรม", "องค์กร", "ความหมาย", "พฤติกรรม", "เอกสาร", "แบบฟอร์ม", "ออนไลน์",
+)
+
+# Dropped from both documents and queries
+STOPWORDS = frozenset((
+    "ครับ", "ค่ะ", "คะ", "จ้ะ", "จ้า", "นะ", "หน่อย", "อย่างไร", "ยังไง", "ไหม", "มั้ย", "อะไร", "ที่ไหน",
+    "ได้", "ที่", "คือ", "เป็น", "มี", "การ", "ของ", "และ", "หรือ", "ให้", "ใน", "จะ", "ต้อง", "เรื่อง",
+    "ทำไม", "เมื่อไร", "เมื่อไหร่", "กี่", "ใคร", "บ้าง", "แล้ว", "กับ", "แบบ", "ด้วย", "ไป", "มา", "อยู่",
+    "the", "a", "an", "of", "to", "and", "or", "is", "how", "what", "where",
+))
+
+_END = ""  # trie terminal marker
+
+
+def _is_thai(token: str) -> bool:
+    return "\u0e00" <= token[0] <= "\u0e7f"
+
+
+class ThaiSegmenter:
+    """ตัดคำแบบ maximal matching บน dictionary trie
+
+    `segment()` คืนคำตามการตัดที่ดีที่สุด ส่วน `tokens()` (ใช้ทั้งตอนทำ index และตอนค้น)
+    เพิ่มคำในพจนานุกรมที่ซ้อนอยู่ในคำประสม เช่น "เบอร์โทรสรรหา" ได้ "เบอร์โทร" และ "สรรหา" ด้วย
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._trie: Dict[str, Any] = {}
+        self.size = 0
+        self.add_words(BASE_WORDS)
+        self.add_words(STOPWORDS)
+        self.add_words(words)
+
+    def add_words(self, words: Iterable[str]):
+        for phrase in words:
+            for word in _TOKEN_RE.findall(str(phrase).lower()):
+                if _is_thai(word) and len(word) > 1:
+                    self._add(word)
+
+    def _add(self, word: str):
+        node = self._trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        if _END not in node:
+            node[_END] = True
+            self.size += 1
+
+    def __contains__(self, word: str) -> bool:
+        node = self._trie
+        for ch in word:
+            node = node.get(ch)
+            if node is None:
+                return False
+        return _END in node
+
+    def _prefixes(self, text: str, start: int) -> List[int]:
+        """ตำแหน่งสิ้นสุดของทุกคำในพจนานุกรมที่เริ่มที่ `start`"""
+        ends = []
+        node = self._trie
+        for i in range(start, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if _END in node:
+                ends.append(i + 1)
+        return ends
+
+    def _segment_thai(self, text: str) -> List[str]:
+        n = len(text)
+        # best[i] = (unknown chars, word count, previous index, known word) for text[:i]
+        best: List[Optional[Tuple[int, int, int, bool]]] = [None] * (n + 1)
+        best[0] = (0, 0, 0, True)
+        for i in range(n):
+            if best[i] is None:
+                continue
+            unknown, count = best[i][0], best[i][1]
+            for end in self._prefixes(text, i):
+                candidate = (unknown, count + 1, i, True)
+                if best[end] is None or candidate[:2] < best[end][:2]:
+                    best[end] = candidate
+            candidate = (unknown + 1, count + 1, i, False)
+            if best[i + 1] is None or candidate[:2] < best[i + 1][:2]:
+                best[i + 1] = candidate
+
+        pieces: List[Tuple[str, bool]] = []
+        i = n
+        while i > 0:
+            _, _, prev, known = best[i]
+            pieces.append((text[prev:i], known))
+            i = prev
+        pieces.reverse()
+
+        # Merge runs of unknown characters into one token
+        words: List[str] = []
+        unknown_run = ""
+        for piece, known in pieces:
+            if known:
+                if unknown_run:
+                    words.append(unknown_run)
+                    unknown_run = ""
+                words.append(piece)
+            else:
+                unknown_run += piece
+        if unknown_run:
+            words.append(unknown_run)
+        return words
+
+    def segment(self, text: str) -> List[str]:
+        words = []
+        for run in _TOKEN_RE.findall(text.lower()):
+            words.extend(self._segment_thai(run) if _is_thai(run) else [run])
+        return words
+
+    def tokens(self, text: str) -> List[str]:
+        """คำสำหรับ index/ค้นหา: คำจาก segment() + คำย่อยในพจนานุกรม (ไม่รวม stopwords และอักษรไทยตัวเดียว)"""
+        tokens = []
+        for word in self.segment(text):
+            if word in STOPWORDS or (len(word) == 1 and _is_thai(word)):
+                continue
+            tokens.append(word)
+            if _is_thai(word) and len(word) > 3:
+                for start in range(len(word)):
+                    for end in self._prefixes(word, start):
+                        sub = word[start:end]
+                        if sub != word and sub not in STOPWORDS:
+                            tokens.append(sub)
+        return tokens
+
+
+class SearchIndex:
+    """inverted index แบบหลาย field จัดอันดับด้วย BM25F (น้ำหนักต่อ field คูณกับความถี่คำ)
+
+    `documents[i]` คือ {field: [ข้อความ, ...]} - ผลการค้นหาเป็น (doc_id, score) เรียงจากคะแนนมากไปน้อย
+    """
+
+    def __init__(self, documents: Sequence[Mapping[str, Sequence[str]]], weights: Mapping[str, float],
+                 segmenter: ThaiSegmenter, k1: float = 1.2, b: float = 0.75):
+        self.segmenter = segmenter
+        self.weights = dict(weights)
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        self.lengths: List[float] = []
+
+        postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for doc_id, fields in enumerate(documents):
+            length = 0.0
+            for field, texts in fields.items():
+                weight = self.weights.get(field, 0.0)
+                if not weight:
+                    continue
+                for text in texts:
+                    for token in segmenter.tokens(text):
+                        postings[token][doc_id] = postings[token].get(doc_id, 0.0) + weight
+                        length += weight
+            self.lengths.append(length)
+        self.avg_length = (sum(self.lengths) / self.size) if self.size else 0.0
+        self.idf: Dict[str, float] = {}
+        for token, docs in postings.items():
+            self.postings[token] = sorted(docs.items())
+            self.idf[token] = math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+
+    @property
+    def vocabulary(self) -> int:
+        return len(self.postings)
+
+    def search(self, query: str, k: int = 10, extra_tokens: Iterable[str] = ()) -> List[Tuple[int, float]]:
+        """BM25 top-k ของ query - `extra_tokens` คือคำใน vocabulary ที่เพิ่มเข้าไปตรง ๆ (เช่น คำที่แก้คำผิดแล้ว)"""
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(self.segmenter.tokens(query)) | set(extra_tokens):
+            docs = self.postings.get(token)
+            if not docs:
+                continue
+            idf = self.idf[token]
+            for doc_id, tf in docs:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / self.avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        # Ties keep document order, like the legacy stable sort
+        return heapq.nsmallest(k, ((doc_id, score) for doc_id, score in scores.items()),
+                               key=lambda item: (-item[1], item[0]))
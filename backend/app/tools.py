@@ -36,4 +36,21 @@ def summarize_conversation(user_id: str):
     """Summarizes the conversation for the user."""
     memory_manager = MemoryManager()
     summary = memory_manager.summarize_context(user_id)
-    return {"summary": summary}
\ No newline at end of file
+    return {"summary": summary}
+
+def memory_tools(memory_manager: MemoryManager) -> list:
+    """query_conversation_history / summarize_conversation that use the given MemoryManager (and its summarizer)"""
+
+    @tool
+    def query_conversation_history(user_id: str):
+        """Queries the conversation history for the user."""
+        history = memory_manager.get_conversation_context(user_id)
+        return {"history": history}
+
+    @tool
+    def summarize_conversation(user_id: str):
+        """Summarizes the conversation for the user."""
+        summary = memory_manager.summarize_context(user_id)
+        return {"summary": summary}
+
+    return [query_conversation_history, summarize_conversation]
\ No newline at end of file
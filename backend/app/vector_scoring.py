@@ -0,0 +1,172 @@
+"""
+Vector Scoring - ให้คะแนน relevance แบบเดียวกับ `calculate_relevance_score` เดิมทุกประการ แต่คำนวณทุก entry พร้อมกันด้วย NumPy
+
+ข้อความแต่ละประเภท (keywords / questions / answer / name-title-meaning) ที่ไม่ซ้ำกันถูกต่อกันเป็น string เดียว
+ต่อ column พร้อม array ของ entry เจ้าของแต่ละช่อง การหาว่าคำอยู่ในช่องไหนใช้ `str.find` (C) บน string ที่ต่อกันแล้ว
+คะแนนต่อช่องคำนวณจากน้ำหนักของ column แล้วรวมเป็นคะแนนต่อ entry ด้วย `np.bincount` และเลือก top-k ด้วย `np.argpartition`
+"""
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Legacy weights (see CorpusEntry.score)
+KEYWORD_HIT = 10        # query word inside a keyword
+KEYWORD_IN_QUERY = 8    # keyword inside the query (only when the word is not inside the keyword)
+QUESTION_HIT = 5
+QUESTION_PHRASE = 15    # whole query inside a question, once per query word
+ANSWER_HIT = 3
+TITLE_HIT = 7
+
+_SEPARATOR = "\x00"
+
+
+class _Column:
+    """ข้อความทุกช่องของ field หนึ่ง - เก็บข้อความที่ไม่ซ้ำต่อกันด้วย separator และ map ช่อง -> ข้อความ
+
+    `contains(needle)` คืน mask ของช่องที่มี needle (ค้นครั้งเดียวต่อข้อความที่ไม่ซ้ำ)
+    """
+
+    def __init__(self, texts: Sequence[str], owners: Sequence[int]):
+        self.texts = list(texts)
+        self.size = len(self.texts)
+        self.owners = np.asarray(owners, dtype=np.int64)
+        unique_ids: Dict[str, int] = {}
+        self.text_ids = np.asarray([unique_ids.setdefault(text, len(unique_ids)) for text in self.texts],
+                                   dtype=np.int64)
+        self.unique = list(unique_ids)
+        self.starts: List[int] = []
+        position = 0
+        for text in self.unique:
+            self.starts.append(position)
+            position += len(text) + 1
+        self.packed = _SEPARATOR.join(self.unique) + _SEPARATOR
+
+    def contains(self, needle: str) -> "np.ndarray":
+        if not needle:
+            return np.ones(self.size, dtype=bool)
+        if _SEPARATOR in needle:
+            found = np.fromiter((needle in text for text in self.unique), dtype=bool, count=len(self.unique))
+            return found[self.text_ids]
+        ids = []
+        find, starts, last = self.packed.find, self.starts, len(self.unique) - 1
+        position = find(needle)
+        while position != -1:
+            text_id = bisect_right(starts, position) - 1
+            ids.append(text_id)
+            if text_id >= last:
+                break
+            # The rest of this text cannot add anything; continue from the next one
+            position = find(needle, starts[text_id + 1])
+        found = np.zeros(len(self.unique), dtype=bool)
+        if ids:
+            found[ids] = True
+        return found[self.text_ids]
+
+
+class VectorScorer:
+    """คะแนนแบบ vectorized ของ CorpusEntry ทั้งชุด - `search()` คืนผลเหมือน `search_entries()` (คะแนนและลำดับเดียวกัน)"""
+
+    def __init__(self, entries: Sequence[Any]):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is not installed")
+        self.entries = list(entries)
+        self.size = len(self.entries)
+
+        columns: Dict[str, List[List[Any]]] = {name: [[], []] for name in ("keywords", "questions", "answer", "title")}
+        for doc_id, entry in enumerate(self.entries):
+            for name, texts in (("keywords", entry.keywords or ()), ("questions", entry.questions or ()),
+                                ("answer", (entry.answer,) if entry.answer is not None else ()),
+                                ("title", entry.fields)):
+                for text in texts:
+                    columns[name][0].append(text)
+                    columns[name][1].append(doc_id)
+        self.keywords = _Column(*columns["keywords"])
+        self.questions = _Column(*columns["questions"])
+        self.answer = _Column(*columns["answer"])
+        self.title = _Column(*columns["title"])
+
+        # Keyword slots by text, for the reverse check (keyword inside the query)
+        self._keyword_slots: Dict[str, List[int]] = {}
+        for slot, keyword in enumerate(self.keywords.texts):
+            self._keyword_slots.setdefault(keyword, []).append(slot)
+        self._keyword_lengths = sorted({len(keyword) for keyword in self._keyword_slots})
+
+    def _keywords_in_query(self, query_lower: str) -> "np.ndarray":
+        mask = np.zeros(self.keywords.size, dtype=bool)
+        slots = []
+        for length in self._keyword_lengths:
+            if length > len(query_lower):
+                break
+            for start in range(len(query_lower) - length + 1):
+                found = self._keyword_slots.get(query_lower[start:start + length])
+                if found:
+                    slots.extend(found)
+        if slots:
+            mask[slots] = True
+        return mask
+
+    def scores(self, query: str) -> "np.ndarray":
+        """คะแนนของทุก entry (float64 ตามลำดับ entries)"""
+        query_lower = query.lower()
+        query_words = query_lower.split()
+        total = np.zeros(self.size, dtype=np.float64)
+        if not query_words or not self.size:
+            return total
+        n_words = len(query_words)
+        counts = Counter(query_words)
+
+        hits = {}
+        for name, column in (("keywords", self.keywords), ("questions", self.questions),
+                             ("answer", self.answer), ("title", self.title)):
+            hit = np.zeros(column.size, dtype=np.int64)
+            for word, repeat in counts.items():
+                hit += column.contains(word) * repeat
+            hits[name] = hit
+
+        keyword_in_query = self._keywords_in_query(query_lower)
+        keyword_score = KEYWORD_HIT * hits["keywords"] + \
+            KEYWORD_IN_QUERY * keyword_in_query * (n_words - hits["keywords"])
+        question_score = QUESTION_HIT * hits["questions"] + \
+            QUESTION_PHRASE * n_words * self.questions.contains(query_lower)
+
+        for column, slot_scores in ((self.keywords, keyword_score), (self.questions, question_score),
+                                    (self.answer, ANSWER_HIT * hits["answer"]),
+                                    (self.title, TITLE_HIT * hits["title"])):
+            if column.size:
+                total += np.bincount(column.owners, weights=slot_scores, minlength=self.size)
+        return total
+
+    @staticmethod
+    def rank(scores: "np.ndarray", k: Optional[int] = None) -> List[int]:
+        """index ที่คะแนน > 0 เรียงจากมากไปน้อย (คะแนนเท่ากันเรียงตามลำดับเดิม) ไม่เกิน k รายการ"""
+        positive = np.flatnonzero(scores > 0)
+        if k is not None and len(positive) > k:
+            if k <= 0:
+                return []
+            candidates = scores[positive]
+            # k-th best score via argpartition, then every better entry plus the earliest ties
+            kth = candidates[np.argpartition(-candidates, k - 1)[k - 1]]
+            better = positive[candidates > kth]
+            ties = positive[candidates == kth][:k - len(better)]
+            positive = np.concatenate([better, ties])
+        order = np.lexsort((positive, -scores[positive]))
+        return positive[order].tolist()
+
+    def top(self, query: str, k: Optional[int] = None) -> List[int]:
+        return self.rank(self.scores(query), k)
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        scores = self.scores(query)
+        results = []
+        for doc_id in self.rank(scores, k):
+            result = dict(self.entries[doc_id].result)
+            result['score'] = float(scores[doc_id])
+            results.append(result)
+        return results
@@ -0,0 +1,118 @@
+"""
+Webhook Deduplication - ตัด event ที่ LINE ส่งซ้ำ (redelivery) โดยใช้ webhookEventId
+"""
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+try:
+    from .ttl_cache import TTLCache
+except ImportError:
+    from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class DedupStore(ABC):
+    """Interface ของ shared store (เช่น Redis / ตารางในฐานข้อมูล) สำหรับหลาย instance
+
+    `add_if_absent` ต้องเป็น atomic และคืนค่า True เมื่อ key ยังไม่เคยถูกบันทึก
+    `discard` ลบ key ของ event ที่ประมวลผลไม่สำเร็จ (ไม่มี key ก็ไม่ error)
+    """
+
+    @abstractmethod
+    def add_if_absent(self, key: str, ttl: float) -> bool:
+        ...
+
+    @abstractmethod
+    def discard(self, key: str):
+        ...
+
+
+class WebhookDeduplicator:
+    """ตรวจว่า event เคยประมวลผลแล้วหรือไม่ ด้วย TTL cache ในหน่วยความจำ + shared store (ถ้ามี)
+
+    - ทุก event ถูกบันทึก webhookEventId ไว้ใน cache ภายใน process (O(1))
+    - shared store จะถูกถามเฉพาะ event ที่ `deliveryContext.isRedelivery` เป็น true
+      ส่วน event ปกติจะถูกบันทึกลง store เพื่อให้ instance อื่นเห็น
+    - event ที่ประมวลผลไม่สำเร็จต้องเรียก `release()` เพื่อให้ redelivery จาก LINE ผ่านเข้ามาได้
+    """
+
+    def __init__(self, ttl: float = 600.0, max_size: int = 10000, shared_store: Optional[DedupStore] = None):
+        self.ttl = ttl
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.shared_store = shared_store
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.redeliveries = 0
+        self.missing_ids = 0
+        self.store_errors = 0
+        self.released = 0
+
+    def is_duplicate(self, event: Any) -> bool:
+        """คืนค่า True เมื่อ event นี้เคยถูกรับไปแล้ว (ควรทิ้ง)"""
+        event_id = getattr(event, "webhook_event_id", None)
+        if not event_id:
+            with self._lock:
+                self.missing_ids += 1
+            return False
+
+        delivery_context = getattr(event, "delivery_context", None)
+        is_redelivery = bool(getattr(delivery_context, "is_redelivery", False))
+
+        duplicate = not self.cache.add(event_id, ttl=self.ttl)
+        if not duplicate and self.shared_store is not None:
+            try:
+                # Ordinary deliveries only register the id; redeliveries rely on the answer
+                is_new = self.shared_store.add_if_absent(event_id, self.ttl)
+                duplicate = is_redelivery and not is_new
+            except Exception as e:
+                with self._lock:
+                    self.store_errors += 1
+                logger.warning(f"Dedup store unavailable, falling back to local cache: {e}")
+
+        with self._lock:
+            if is_redelivery:
+                self.redeliveries += 1
+            if duplicate:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if duplicate:
+            logger.info(f"Dropping duplicate webhook event {event_id} (redelivery={is_redelivery})")
+        return duplicate
+
+    def release(self, event: Any):
+        """ลบ mark ของ event ที่ประมวลผลไม่สำเร็จ (is_duplicate จะคืน False เมื่อ LINE ส่งซ้ำ)"""
+        event_id = getattr(event, "webhook_event_id", None)
+        if not event_id:
+            return
+        self.cache.pop(event_id)
+        if self.shared_store is not None:
+            try:
+                self.shared_store.discard(event_id)
+            except Exception as e:
+                with self._lock:
+                    self.store_errors += 1
+                logger.warning(f"Dedup store unavailable, could not release {event_id}: {e}")
+        with self._lock:
+            self.released += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "redeliveries": self.redeliveries,
+            "missing_ids": self.missing_ids,
+            "store_errors": self.store_errors,
+            "released": self.released,
+            "shared_store": self.shared_store.__class__.__name__ if self.shared_store else None,
+            "cache": self.cache.stats(),
+        }
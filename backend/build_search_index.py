@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Build the precompiled HR search index artifact (data/search_index.pkl)
+
+รันหลังแก้ไฟล์ใน data/json หรือแก้โค้ด search (เช่นใน build step ของ Docker image):
+    python build_search_index.py            # build
+    python build_search_index.py --check    # ตรวจว่า artifact ยังตรงกับไฟล์ต้นทาง (exit 1 ถ้า stale)
+"""
+import argparse
+import os
+import sys
+import time
+
+# Artifact keys are paths relative to backend/, like the server's working directory
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from app.hr_corpus import HRCorpus
+from app.hr_tools import FAQ_FILE, CULTURE_FILE
+from app.faq_fastpath import format_faq_answer
+from app.index_artifact import DEFAULT_ARTIFACT_PATH, load_artifact, write_artifact
+
+
+def build(output: str, paths):
+    started = time.perf_counter()
+    corpus = HRCorpus()
+    snapshots = []
+    for path in paths:
+        snapshot = corpus.snapshot(path)
+        if snapshot is None:
+            print(f"⚠️ Skipping missing file: {path}")
+            continue
+        rendered = {entry.result["id"]: format_faq_answer(entry.result)
+                    for entry in snapshot.entries if entry.kind == "faq" and entry.result.get("id")}
+        snapshots.append(snapshot._replace(rendered=rendered))
+        print(f"📚 {path}: {len(snapshot.entries)} entries, vocabulary {snapshot.index.vocabulary}, "
+              f"{len(rendered)} rendered answers ({snapshot.load_ms:.1f} ms)")
+
+    manifest = write_artifact(output, snapshots)
+    print(f"✅ Wrote {output} ({manifest['bytes'] / 1024:.1f} KB, format v{manifest['format']}) "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+def check(output: str) -> int:
+    loaded = load_artifact(output)
+    print(f"📦 {output}: {loaded.status} ({len(loaded.snapshots)} file(s), {loaded.load_ms:.1f} ms)")
+    for path in loaded.stale:
+        print(f"   ⚠️ stale: {path}")
+    return 0 if loaded.status == "loaded" else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the HR search index artifact")
+    parser.add_argument("--output", default=os.getenv("SEARCH_INDEX_PATH", DEFAULT_ARTIFACT_PATH))
+    parser.add_argument("--check", action="store_true", help="only verify that the artifact is up to date")
+    parser.add_argument("files", nargs="*", default=[FAQ_FILE, CULTURE_FILE], help="JSON files to index")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(check(args.output))
+    build(args.output, args.files)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 
 from app.database import engine, Base
-from app.models import LineUser, ChatMessage, EventLog
+from app.models import LineUser, ChatMessage, EventLog, ConversationSummary
 
 def init_database():
     """Initialize database with all tables"""
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark KeyedEventDispatcher - วัด throughput เมื่อเพิ่มจำนวน lanes
+
+จำลอง handler ที่ใช้เวลาเหมือนการเรียก Gemini (sleep) และผู้ใช้ 1 คนที่ช้ามาก
+เพื่อแสดงว่าผู้ใช้ที่ช้าไม่ทำให้ผู้ใช้อื่นต้องรอ และลำดับข้อความของแต่ละคนยังถูกต้อง
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+# Add the backend to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(current_dir, '..', '..', 'backend')
+sys.path.insert(0, os.path.abspath(backend_dir))
+
+from app.event_queue import KeyedEventDispatcher
+
+
+def make_events(users: int, messages_per_user: int):
+    events = []
+    for seq in range(messages_per_user):
+        for u in range(users):
+            events.append(SimpleNamespace(source=SimpleNamespace(user_id=f"U{u:04d}"), seq=seq))
+    return events
+
+
+async def run_once(lanes: int, events, handler_ms: float, slow_user_ms: float):
+    seen = defaultdict(list)
+    latencies = []
+
+    def handle(event):
+        delay = slow_user_ms if event.source.user_id == "U0000" else handler_ms
+        time.sleep(delay / 1000)
+        seen[event.source.user_id].append(event.seq)
+        latencies.append(time.monotonic() - event.enqueued_at)
+
+    dispatcher = KeyedEventDispatcher(handle, lanes=lanes, max_size=len(events))
+    await dispatcher.start()
+    started = time.monotonic()
+    for event in events:
+        event.enqueued_at = time.monotonic()
+        await dispatcher.put(event)
+    await dispatcher.stop(timeout=600)
+    elapsed = time.monotonic() - started
+
+    in_order = all(seqs == sorted(seqs) for seqs in seen.values())
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    return elapsed, in_order, p95
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-user webhook lanes")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=4, help="messages per user")
+    parser.add_argument("--handler-ms", type=float, default=20.0)
+    parser.add_argument("--slow-user-ms", type=float, default=500.0)
+    parser.add_argument("--lanes", default="1,2,4,8,16,32")
+    args = parser.parse_args()
+
+    print(f"{args.users} users x {args.messages} messages, handler {args.handler_ms}ms, "
+          f"slow user {args.slow_user_ms}ms")
+    print(f"{'lanes':>6} {'seconds':>9} {'events/s':>10} {'p95 ms':>9} {'ordered':>8}")
+    for lanes in [int(x) for x in args.lanes.split(",")]:
+        events = make_events(args.users, args.messages)
+        elapsed, in_order, p95 = await run_once(lanes, events, args.handler_ms, args.slow_user_ms)
+        print(f"{lanes:>6} {elapsed:>9.2f} {len(events) / elapsed:>10.1f} {p95 * 1000:>9.1f} "
+              f"{'yes' if in_order else 'NO':>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fake LINE Platform - จำลอง LINE Messaging API สำหรับทดสอบโหลดแบบ offline
+
+มี endpoint reply / push / multicast / profile / loading / content พร้อมตั้งค่า latency,
+อัตรา error (5xx), อัตรา 429 และ rate limit ต่อวินาทีได้ และมีตัวสร้าง webhook ที่ลงลายเซ็น
+ด้วย LINE_CHANNEL_SECRET ให้ยิงเข้า backend ได้เหมือน LINE จริง
+
+ชี้ backend มาที่ server นี้ด้วย:
+    LINE_API_BASE_URL=http://localhost:8081
+    LINE_DATA_API_BASE_URL=http://localhost:8081
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+class FakeLineConfig:
+    """พฤติกรรมของ fake server (แก้ไขระหว่างรันได้ผ่าน POST /_fake/config)"""
+
+    def __init__(self, latency_ms: float = 30.0, jitter_ms: float = 10.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, rps: float = 0.0, retry_after: float = 1.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate            # fraction of requests answered with 500
+        self.rate_limit_rate = rate_limit_rate  # fraction of requests answered with 429
+        self.rps = rps                          # per-endpoint requests/second before 429 (0 = unlimited)
+        self.retry_after = retry_after
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class FakeLinePlatform:
+    """สถานะภายในของ fake server: reply token ที่ใช้แล้ว, สถิติ และข้อความที่ได้รับ"""
+
+    def __init__(self, config: FakeLineConfig, history_size: int = 10000):
+        self.config = config
+        self.requests = defaultdict(int)
+        self.statuses = defaultdict(int)
+        self.deliveries = deque(maxlen=history_size)
+        self._used_reply_tokens = set()
+        self._windows: Dict[str, Tuple[int, int]] = {}
+
+    def reset(self):
+        self.requests.clear()
+        self.statuses.clear()
+        self.deliveries.clear()
+        self._used_reply_tokens.clear()
+        self._windows.clear()
+
+    async def simulate(self, endpoint: str) -> Optional[JSONResponse]:
+        """หน่วงเวลาแล้วสุ่ม error ตามการตั้งค่า - คืน response ของ error หรือ None ถ้าให้ผ่าน"""
+        config = self.config
+        self.requests[endpoint] += 1
+        delay = max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+
+        if config.rps > 0:
+            second = int(time.time())
+            window, count = self._windows.get(endpoint, (second, 0))
+            count = count + 1 if window == second else 1
+            self._windows[endpoint] = (second, count)
+            if count > config.rps:
+                return self._rate_limited()
+        if random.random() < config.rate_limit_rate:
+            return self._rate_limited()
+        if random.random() < config.error_rate:
+            return self._status(JSONResponse({"message": "Internal server error"}, status_code=500))
+        return None
+
+    def _rate_limited(self) -> JSONResponse:
+        return self._status(JSONResponse({"message": "The API rate limit has been exceeded. Try again later."},
+                                         status_code=429, headers={"Retry-After": str(self.config.retry_after)}))
+
+    def _status(self, response: Response) -> Response:
+        self.statuses[response.status_code] += 1
+        return response
+
+    def ok(self, body: Optional[Dict[str, Any]] = None, status_code: int = 200) -> JSONResponse:
+        return self._status(JSONResponse(body if body is not None else {}, status_code=status_code))
+
+    def record(self, kind: str, to: Any, messages: List[Dict[str, Any]], reply_token: Optional[str] = None):
+        self.deliveries.append({
+            "kind": kind,
+            "to": to,
+            "reply_token": reply_token,
+            "texts": [m.get("text") for m in messages],
+            "at": time.time(),
+        })
+
+    def use_reply_token(self, reply_token: str) -> bool:
+        if not reply_token or reply_token in self._used_reply_tokens:
+            return False
+        self._used_reply_tokens.add(reply_token)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "config": self.config.as_dict(),
+            "requests": dict(self.requests),
+            "statuses": dict(self.statuses),
+            "deliveries": len(self.deliveries),
+        }
+
+
+def create_app(config: Optional[FakeLineConfig] = None) -> FastAPI:
+    platform = FakeLinePlatform(config or FakeLineConfig())
+    app = FastAPI(title="Fake LINE Platform")
+    app.state.platform = platform
+
+    def invalid(message: str) -> JSONResponse:
+        return platform._status(JSONResponse({"message": message}, status_code=400))
+
+    @app.post("/v2/bot/message/reply")
+    async def reply(request: Request):
+        body = await request.json()
+        error = await platform.simulate("reply")
+        if error is not None:
+            return error
+        if not platform.use_reply_token(body.get("replyToken")):
+            return invalid("Invalid reply token")
+        platform.record("reply", None, body.get("messages", []), body.get("replyToken"))
+        return platform.ok()
+
+    @app.post("/v2/bot/message/push")
+    async def push(request: Request):
+        body = await request.json()
+        error = await platform.simulate("push")
+        if error is not None:
+            return error
+        if len(body.get("messages", [])) > 5:
+            return invalid("Size must be between 1 and 5")
+        platform.record("push", body.get("to"), body.get("messages", []))
+        return platform.ok()
+
+    @app.post("/v2/bot/message/multicast")
+    async def multicast(request: Request):
+        body = await request.json()
+        error = await platform.simulate("multicast")
+        if error is not None:
+            return error
+        if len(body.get("to", [])) > 500:
+            return invalid("Size must be between 1 and 500")
+        platform.record("multicast", body.get("to"), body.get("messages", []))
+        return platform.ok()
+
+    @app.get("/v2/bot/profile/{user_id}")
+    async def profile(user_id: str):
+        error = await platform.simulate("profile")
+        if error is not None:
+            return error
+        return platform.ok({
+            "userId": user_id,
+            "displayName": f"Load Test {user_id[-4:]}",
+            "pictureUrl": f"https://example.com/{user_id}.png",
+            "statusMessage": "fake",
+        })
+
+    @app.post("/v2/bot/chat/loading/start")
+    async def loading_start(request: Request):
+        body = await request.json()
+        error = await platform.simulate("loading")
+        if error is not None:
+            return error
+        seconds = body.get("loadingSeconds", 20)
+        if seconds not in range(5, 61, 5):
+            return invalid("loadingSeconds must be a multiple of 5 between 5 and 60")
+        return platform.ok(status_code=202)
+
+    @app.post("/v2/bot/chat/loading/stop")
+    async def loading_stop():
+        error = await platform.simulate("loading")
+        return error if error is not None else platform.ok()
+
+    @app.get("/v2/bot/message/{message_id}/content")
+    async def content(message_id: str):
+        error = await platform.simulate("content")
+        if error is not None:
+            return error
+        return platform._status(Response(content=b"\x89PNG fake content " + message_id.encode(),
+                                         media_type="image/png"))
+
+    # Control endpoints for load tests
+    @app.get("/_fake/stats")
+    async def fake_stats():
+        return platform.stats()
+
+    @app.get("/_fake/deliveries")
+    async def fake_deliveries(since: float = 0.0):
+        return [d for d in platform.deliveries if d["at"] >= since]
+
+    @app.post("/_fake/config")
+    async def fake_config(request: Request):
+        for key, value in (await request.json()).items():
+            if hasattr(platform.config, key):
+                setattr(platform.config, key, float(value))
+        return platform.config.as_dict()
+
+    @app.post("/_fake/reset")
+    async def fake_reset():
+        platform.reset()
+        return {"status": "reset"}
+
+    return app
+
+
+# ===================================================================
+# Signed webhook generator
+# ===================================================================
+
+def text_message_event(user_id: str, text: str, reply_token: Optional[str] = None,
+                       redelivery: bool = False) -> Dict[str, Any]:
+    """สร้าง message event แบบเดียวกับที่ LINE ส่งมา"""
+    return {
+        "type": "message",
+        "mode": "active",
+        "timestamp": int(time.time() * 1000),
+        "source": {"type": "user", "userId": user_id},
+        "webhookEventId": uuid.uuid4().hex.upper()[:26],
+        "deliveryContext": {"isRedelivery": redelivery},
+        "replyToken": reply_token or uuid.uuid4().hex,
+        "message": {"type": "text", "id": str(random.randint(10 ** 13, 10 ** 14 - 1)), "quoteToken": uuid.uuid4().hex,
+                    "text": text},
+    }
+
+
+def sign_body(body: str, channel_secret: str) -> str:
+    digest = hmac.new(channel_secret.encode("utf-8"), body.encode("utf-8"), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("utf-8")
+
+
+def make_webhook(events: List[Dict[str, Any]], channel_secret: str,
+                 destination: str = "Ufakebot") -> Tuple[str, Dict[str, str]]:
+    """คืน (body, headers) ที่ลงลายเซ็นแล้ว พร้อมส่งเข้า /webhook"""
+    body = json.dumps({"destination": destination, "events": events}, ensure_ascii=False)
+    return body, {"Content-Type": "application/json", "X-Line-Signature": sign_body(body, channel_secret)}
+
+
+def send_webhook(target: str, user_id: str, text: str, channel_secret: str):
+    import httpx
+
+    body, headers = make_webhook([text_message_event(user_id, text)], channel_secret)
+    response = httpx.post(target, content=body.encode("utf-8"), headers=headers, timeout=30)
+    print(f"{response.status_code} {response.text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake LINE Messaging API for offline load testing")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="run the fake LINE API server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8081)
+    serve.add_argument("--latency-ms", type=float, default=30.0)
+    serve.add_argument("--jitter-ms", type=float, default=10.0)
+    serve.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    serve.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    serve.add_argument("--rps", type=float, default=0.0, help="per-endpoint requests/second before 429 (0 = unlimited)")
+    serve.add_argument("--retry-after", type=float, default=1.0)
+
+    webhook = sub.add_parser("webhook", help="send one signed text message webhook to the backend")
+    webhook.add_argument("--target", default="http://localhost:8000/webhook")
+    webhook.add_argument("--user", default="Uloadtest0001")
+    webhook.add_argument("--text", default="สวัสดีครับ")
+    webhook.add_argument("--secret", default=os.getenv("LINE_CHANNEL_SECRET", ""))
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        import uvicorn
+
+        config = FakeLineConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate,
+                                args.rps, args.retry_after)
+        print(f"🧪 Fake LINE API on http://{args.host}:{args.port} {config.as_dict()}")
+        uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+    else:
+        if not args.secret:
+            parser.error("LINE_CHANNEL_SECRET is not set (use --secret)")
+        send_webhook(args.target, args.user, args.text, args.secret)
+
+
+if __name__ == "__main__":
+    main()
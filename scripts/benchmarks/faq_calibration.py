@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FAQ Fast Path Calibration - หาเกณฑ์ FAQ_FASTPATH_MIN_SCORE / FAQ_FASTPATH_MIN_MARGIN จากชุดคำถามที่มี label
+
+แต่ละคำถามใน faq_labelled_questions.json มี `expected` เป็น id ของ FAQ ที่ถูกต้อง หรือ null ถ้าควรส่งต่อให้ agent
+สคริปต์จะ sweep ค่าเกณฑ์ทั้งหมดแล้วรายงาน precision (ตอบถูก / ตอบทันที) และ coverage (ตอบถูก / คำถามที่มีคำตอบใน FAQ)
+ค่าที่แนะนำคือค่าที่ coverage สูงสุดโดย precision ไม่ต่ำกว่า --target-precision
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List
+
+backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend")
+sys.path.insert(0, os.path.abspath(backend_dir))
+
+from app.faq_fastpath import GATE_REASONS, FaqFastPath
+
+DEFAULT_LABELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq_labelled_questions.json")
+DEFAULT_FAQ = os.path.join(os.path.abspath(backend_dir), "data", "json", "faq.json")
+DEFAULT_MARGINS = "0,3,5,8,10,15,20,30"
+
+
+def evaluate(scored: List[Dict[str, Any]], min_score: float, min_margin: float) -> Dict[str, Any]:
+    answered = correct = 0
+    wrong = []
+    for item in scored:
+        if item["top_id"] is None or item["score"] < min_score or item["margin"] < min_margin:
+            continue
+        answered += 1
+        if item["top_id"] == item["expected"]:
+            correct += 1
+        else:
+            wrong.append(item["question"])
+    answerable = sum(1 for item in scored if item["expected"] is not None)
+    return {
+        "min_score": min_score,
+        "min_margin": min_margin,
+        "answered": answered,
+        "correct": correct,
+        "wrong": len(wrong),
+        "precision": round(correct / answered, 4) if answered else 1.0,
+        "coverage": round(correct / answerable, 4) if answerable else 0.0,
+        "wrong_questions": wrong,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the FAQ fast path thresholds")
+    parser.add_argument("--labels", default=DEFAULT_LABELS, help="labelled question set (JSON list)")
+    parser.add_argument("--faq", default=DEFAULT_FAQ)
+    parser.add_argument("--margins", default=DEFAULT_MARGINS, help="comma-separated margins to sweep")
+    parser.add_argument("--target-precision", type=float, default=0.97)
+    parser.add_argument("--top", type=int, default=10, help="rows shown in the report")
+    parser.add_argument("--output", default="", help="write the full report as JSON")
+    args = parser.parse_args()
+
+    with open(args.labels, "r", encoding="utf-8") as f:
+        labels = json.load(f)
+
+    # Score once with no thresholds, then sweep offline (gated questions never answer, whatever the thresholds)
+    fastpath = FaqFastPath(args.faq, min_score=0, min_margin=0)
+    scored = []
+    for item in labels:
+        decision = fastpath.evaluate(item["question"])
+        scored.append({
+            "question": item["question"],
+            "expected": item.get("expected"),
+            "top_id": decision.result.get("id") if decision.result and decision.reason not in GATE_REASONS else None,
+            "score": decision.score,
+            "margin": decision.margin,
+            "reason": decision.reason,
+        })
+
+    scores = sorted({item["score"] for item in scored if item["score"] > 0})
+    margins = [float(m) for m in args.margins.split(",")]
+    sweep = [evaluate(scored, s, m) for s in scores for m in margins]
+
+    # Highest coverage at the target precision; ties go to the stricter thresholds
+    eligible = [r for r in sweep if r["precision"] >= args.target_precision and r["answered"]]
+    best = max(eligible, key=lambda r: (r["coverage"], r["min_score"], r["min_margin"])) if eligible else None
+
+    ranking = sorted(sweep, key=lambda r: (r["precision"] >= args.target_precision, r["coverage"], r["precision"]),
+                     reverse=True)
+    print(f"📊 {len(labels)} labelled questions "
+          f"({sum(1 for i in scored if i['expected'] is not None)} answerable from FAQ)\n")
+    print(f"{'min_score':>10}{'min_margin':>11}{'answered':>10}{'wrong':>7}{'precision':>11}{'coverage':>10}")
+    for r in ranking[:args.top]:
+        print(f"{r['min_score']:>10g}{r['min_margin']:>11g}{r['answered']:>10}{r['wrong']:>7}"
+              f"{r['precision']:>11.2%}{r['coverage']:>10.2%}")
+
+    top1 = sum(1 for i in scored if i["expected"] is not None and i["top_id"] == i["expected"])
+    print(f"\nTop-1 accuracy on answerable questions (no thresholds): "
+          f"{top1}/{sum(1 for i in scored if i['expected'] is not None)}")
+    if best:
+        print(f"\n✅ Recommended (precision >= {args.target_precision:.0%}):")
+        print(f"FAQ_FASTPATH_MIN_SCORE={best['min_score']:g}")
+        print(f"FAQ_FASTPATH_MIN_MARGIN={best['min_margin']:g}")
+        if best["wrong_questions"]:
+            print(f"⚠️ Wrong direct answers: {best['wrong_questions']}")
+    else:
+        print(f"\n❌ No threshold reaches precision {args.target_precision:.0%}")
+
+    if args.output:
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.now().isoformat(),
+                "labels": args.labels,
+                "target_precision": args.target_precision,
+                "recommended": best,
+                "questions": scored,
+                "sweep": sweep,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"📄 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fuzzy Index Benchmark - เปรียบเทียบ TrigramIndex.lookup กับการ scan ทุกคำแบบเส้นตรง
+
+ใช้ vocabulary จริงจาก faq.json (ผ่าน hr_corpus) แล้วขยายด้วยคำประสมสังเคราะห์ให้ได้ขนาดตาม --terms
+คำค้นสร้างจากการสะกดผิดแบบสุ่ม (แทนที่ / ลบ / เพิ่ม / สลับตัวอักษร / ตัดวรรณยุกต์) ของคำใน vocabulary
+รายงาน latency (avg / p95), จำนวน candidate ที่ต้องคำนวณ edit distance, recall และตรวจว่าผลลัพธ์ตรงกันทุกคำค้น
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend")
+sys.path.insert(0, os.path.abspath(backend_dir))
+
+from app.fuzzy_index import TrigramIndex, max_edits
+from app.hr_corpus import HRCorpus
+
+DEFAULT_FAQ = os.path.join(os.path.abspath(backend_dir), "data", "json", "faq.json")
+TONE_MARKS = "่้๊๋็์"
+THAI_LETTERS = "กขคงจชซดตถทนบปผพฟมยรลวสหอะาิีึืุูเแโใไ"
+
+
+def misspell(term: str, rng: random.Random) -> str:
+    chars = list(term)
+    tones = [i for i, ch in enumerate(chars) if ch in TONE_MARKS]
+    kind = rng.choice(["substitute", "delete", "insert", "transpose"] + (["tone"] * 2 if tones else []))
+    i = rng.randrange(len(chars))
+    alphabet = THAI_LETTERS if "\u0e00" <= term[0] <= "\u0e7f" else "abcdefghijklmnopqrstuvwxyz"
+    if kind == "tone":
+        del chars[rng.choice(tones)]
+    elif kind == "substitute":
+        chars[i] = rng.choice(alphabet)
+    elif kind == "delete":
+        del chars[i]
+    elif kind == "insert":
+        chars.insert(i, rng.choice(alphabet))
+    elif len(chars) > 1:
+        i = min(i, len(chars) - 2)
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+def run(index: TrigramIndex, queries: List[Dict[str, str]]) -> Dict[str, Any]:
+    timings = {"lookup": [], "scan": []}
+    mismatches = found = 0
+    index.lookups = index.candidates = 0
+    for query in queries:
+        started = time.perf_counter()
+        hits = index.lookup(query["typed"])
+        timings["lookup"].append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        expected = index.scan(query["typed"])
+        timings["scan"].append((time.perf_counter() - started) * 1000)
+        mismatches += hits != expected
+        found += any(hit.term == query["term"] for hit in hits)
+    result = {
+        "terms": len(index.terms),
+        "trigrams": len(index.postings),
+        "queries": len(queries),
+        "recall": round(found / len(queries), 4) if queries else 0.0,
+        "mismatches": mismatches,
+        "avg_candidates": round(index.candidates / index.lookups, 2) if index.lookups else 0.0,
+    }
+    for name, values in timings.items():
+        result[f"{name}_avg_ms"] = round(sum(values) / len(values), 4) if values else 0.0
+        result[f"{name}_p95_ms"] = round(percentile(values, 0.95), 4)
+    result["speedup"] = round(result["scan_avg_ms"] / result["lookup_avg_ms"], 1) if result["lookup_avg_ms"] else 0.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the trigram fuzzy index against a linear scan")
+    parser.add_argument("--faq", default=DEFAULT_FAQ)
+    parser.add_argument("--terms", default="0,2000,10000", help="comma-separated vocabulary sizes (0 = real only)")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="", help="write the results as JSON")
+    args = parser.parse_args()
+
+    snapshot = HRCorpus().snapshot(args.faq)
+    if snapshot is None or snapshot.index is None:
+        sys.exit(f"❌ Cannot load {args.faq}")
+    real_terms = sorted(snapshot.index.postings)
+    thai_terms = [t for t in real_terms if "\u0e00" <= t[0] <= "\u0e7f" and len(t) >= 3]
+
+    results = []
+    print(f"{'terms':>8}{'trigrams':>10}{'cands':>8}{'lookup ms':>11}{'p95':>9}{'scan ms':>10}{'p95':>9}"
+          f"{'speedup':>9}{'recall':>8}{'diff':>6}")
+    for size in [int(s) for s in args.terms.split(",")]:
+        rng = random.Random(args.seed)
+        terms = set(real_terms)
+        while len(terms) < size:
+            terms.add(rng.choice(thai_terms) + rng.choice(thai_terms))
+        index = TrigramIndex(terms)
+
+        queries = []
+        candidates = [t for t in index.terms if max_edits(len(t)) > 0]
+        while len(queries) < args.queries:
+            term = rng.choice(candidates)
+            typed = misspell(term, rng)
+            if typed != term and typed not in terms and len(typed) >= 3:
+                queries.append({"term": term, "typed": typed})
+
+        result = run(index, queries)
+        results.append(result)
+        print(f"{result['terms']:>8}{result['trigrams']:>10}{result['avg_candidates']:>8}"
+              f"{result['lookup_avg_ms']:>11.3f}{result['lookup_p95_ms']:>9.3f}"
+              f"{result['scan_avg_ms']:>10.3f}{result['scan_p95_ms']:>9.3f}"
+              f"{result['speedup']:>8}x{result['recall']:>8.1%}{result['mismatches']:>6}")
+
+    if any(r["mismatches"] for r in results):
+        print("\n⚠️ lookup() and scan() disagree on some queries")
+    else:
+        print("\n✅ lookup() returns the same hits as the linear scan for every query")
+
+    if args.output:
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": datetime.now().isoformat(), "faq": args.faq, "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"📄 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
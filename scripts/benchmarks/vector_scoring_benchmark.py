@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vector Scoring Benchmark - เปรียบเทียบการให้คะแนน FAQ แบบ loop เดิม (search_entries) กับ VectorScorer (NumPy)
+
+ขยาย faq.json เป็น corpus สังเคราะห์ขนาดตาม --sizes (ผสม keywords / คำถาม / คำตอบของ FAQ จริง)
+แล้วค้นด้วยชุดคำถามที่มี label รายงาน latency (avg / p95) และตรวจว่าคะแนนและลำดับตรงกันทุกคำถาม
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend")
+sys.path.insert(0, os.path.abspath(backend_dir))
+
+from app.hr_corpus import build_entries, search_entries
+from app.vector_scoring import NUMPY_AVAILABLE, VectorScorer
+
+DEFAULT_FAQ = os.path.join(os.path.abspath(backend_dir), "data", "json", "faq.json")
+DEFAULT_LABELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq_labelled_questions.json")
+
+
+def synthetic_corpus(data: Dict[str, Any], size: int, rng: random.Random) -> Dict[str, Any]:
+    """faq.json ที่มี FAQ อย่างน้อย `size` รายการ - รายการที่เพิ่มผสมข้อมูลจาก FAQ จริงสองรายการ"""
+    corpus = copy.deepcopy(data)
+    faqs = [faq for category in data["categories"] for faq in category.get("faqs", [])]
+    total = len(faqs)
+    extra = {"id": "synthetic", "name": "synthetic", "faqs": []}
+    while total < size:
+        a, b = rng.sample(faqs, 2)
+        questions = a["question"] if isinstance(a["question"], list) else [a["question"]]
+        extra["faqs"].append({
+            "id": f"syn_{total:05d}",
+            "question": [rng.choice(questions) + " " + str(total)],
+            "answer": b["answer"],
+            "keywords": rng.sample(a.get("keywords", []) + b.get("keywords", []),
+                                   min(4, len(a.get("keywords", []) + b.get("keywords", [])))),
+        })
+        total += 1
+    if extra["faqs"]:
+        corpus["categories"].append(extra)
+    return corpus
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized FAQ scoring against the Python loops")
+    parser.add_argument("--faq", default=DEFAULT_FAQ)
+    parser.add_argument("--labels", default=DEFAULT_LABELS)
+    parser.add_argument("--sizes", default="0,500,2000,5000", help="comma-separated corpus sizes (0 = faq.json)")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the question set per size")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="", help="write the results as JSON")
+    args = parser.parse_args()
+
+    if not NUMPY_AVAILABLE:
+        sys.exit("❌ numpy is not installed (pip install numpy)")
+    with open(args.faq, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    with open(args.labels, "r", encoding="utf-8") as f:
+        questions = [item["question"] for item in json.load(f)]
+
+    results = []
+    print(f"{'entries':>8}{'build ms':>10}{'loop ms':>10}{'p95':>8}{'numpy ms':>10}{'p95':>8}{'speedup':>9}{'diff':>6}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        entries = build_entries(synthetic_corpus(data, size, random.Random(args.seed)))
+        started = time.perf_counter()
+        scorer = VectorScorer(entries)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        timings = {"loop": [], "numpy": []}
+        mismatches = 0
+        for _ in range(args.repeat):
+            for question in questions:
+                started = time.perf_counter()
+                expected = search_entries(entries, question)
+                timings["loop"].append((time.perf_counter() - started) * 1000)
+                started = time.perf_counter()
+                actual = scorer.search(question)
+                timings["numpy"].append((time.perf_counter() - started) * 1000)
+                mismatches += actual != expected
+
+        result = {"entries": len(entries), "build_ms": round(build_ms, 2), "queries": len(timings["loop"]),
+                  "mismatches": mismatches}
+        for name, values in timings.items():
+            result[f"{name}_avg_ms"] = round(sum(values) / len(values), 4)
+            result[f"{name}_p95_ms"] = round(percentile(values, 0.95), 4)
+        result["speedup"] = round(result["loop_avg_ms"] / result["numpy_avg_ms"], 1) if result["numpy_avg_ms"] else 0.0
+        results.append(result)
+        print(f"{result['entries']:>8}{result['build_ms']:>10.1f}{result['loop_avg_ms']:>10.3f}"
+              f"{result['loop_p95_ms']:>8.3f}{result['numpy_avg_ms']:>10.3f}{result['numpy_p95_ms']:>8.3f}"
+              f"{result['speedup']:>8}x{result['mismatches']:>6}")
+
+    if any(r["mismatches"] for r in results):
+        print("\n⚠️ VectorScorer results differ from search_entries")
+    else:
+        print("\n✅ Same scores and ranking as search_entries for every question")
+
+    if args.output:
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": datetime.now().isoformat(), "faq": args.faq, "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"📄 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
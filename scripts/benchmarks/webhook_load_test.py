@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Webhook Load Test - ยิง webhook ที่ลงลายเซ็นเข้า /webhook ด้วยอัตราที่กำหนด แล้ววัด latency แบบ end-to-end
+
+- time-to-200: เวลาตั้งแต่ส่ง webhook จนได้ HTTP response
+- time-to-reply: เวลาตั้งแต่ส่ง webhook จน fake LINE server ได้รับ reply (ตาม replyToken) หรือ push ถึงผู้ใช้นั้น
+  (ต้องรัน backend โดยชี้ LINE_API_BASE_URL ไปที่ fake_line_server.py)
+
+ผลลัพธ์ p50/p95/p99 และจำนวน error ถูกเขียนเป็น JSON เพื่อเปรียบเทียบระหว่าง release
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_line_server import make_webhook, text_message_event
+
+# Weighted question mix (roughly what staff ask the HR bot)
+QUESTION_MIX = [
+    ("ลาป่วยได้กี่วันต่อปี", 12),
+    ("ลาพักร้อนต้องแจ้งล่วงหน้ากี่วัน", 10),
+    ("ขอใบรับรองเงินเดือนได้ที่ไหน", 6),
+    ("สวัสดิการค่ารักษาพยาบาลมีอะไรบ้าง", 8),
+    ("ลากิจได้กี่วัน", 6),
+    ("ค่านิยมองค์กรมีอะไรบ้าง", 5),
+    ("วัฒนธรรมองค์กรของเราคืออะไร", 4),
+    ("เบิกค่าเล่าเรียนบุตรได้ไหม", 4),
+    ("ทำงานล่วงเวลาคิดค่าตอบแทนอย่างไร", 4),
+    ("ลาคลอดได้กี่วัน", 3),
+    ("สวัสดีครับ", 6),
+    ("ขอบคุณค่ะ", 4),
+    ("ลาป่วย", 4),
+    ("วันหยุดประจำปี 2567 มีวันไหนบ้าง", 3),
+]
+
+
+def pick_question(rng: random.Random) -> str:
+    texts, weights = zip(*QUESTION_MIX)
+    return rng.choices(texts, weights=weights, k=1)[0]
+
+
+def follow_event(user_id: str, unfollow: bool = False) -> Dict[str, Any]:
+    event = text_message_event(user_id, "")
+    event.pop("message")
+    event["type"] = "unfollow" if unfollow else "follow"
+    if unfollow:
+        event.pop("replyToken")
+    return event
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"count": 0, "p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    values = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(values[min(len(values) - 1, max(0, int(round(p * len(values))) - 1))], 1)
+
+    return {
+        "count": len(values),
+        "p50": rank(0.50),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "mean": round(sum(values) / len(values), 1),
+        "max": round(values[-1], 1),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except Exception:
+        return None
+
+
+class LoadGenerator:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.users = [f"Uload{i:06d}" for i in range(args.users)]
+        self.sent: List[Dict[str, Any]] = []     # one entry per text message event
+        self.http: List[Dict[str, Any]] = []     # one entry per webhook request
+
+    def build_body(self):
+        events = []
+        for _ in range(self.rng.randint(1, self.args.max_events)):
+            user_id = self.rng.choice(self.users)
+            roll = self.rng.random()
+            if roll < self.args.follow_ratio:
+                events.append(follow_event(user_id))
+            elif roll < self.args.follow_ratio + self.args.unfollow_ratio:
+                events.append(follow_event(user_id, unfollow=True))
+            else:
+                events.append(text_message_event(user_id, pick_question(self.rng)))
+        return events
+
+    async def send_one(self, client: httpx.AsyncClient, events: List[Dict[str, Any]]):
+        body, headers = make_webhook(events, self.args.secret)
+        started = time.time()
+        try:
+            response = await client.post(self.args.target, content=body.encode("utf-8"), headers=headers)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        elapsed_ms = (time.time() - started) * 1000
+        self.http.append({"status": status, "ms": elapsed_ms, "events": len(events)})
+        for event in events:
+            if event["type"] == "message":
+                self.sent.append({"user_id": event["source"]["userId"], "reply_token": event["replyToken"],
+                                  "sent_at": started})
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        interval = 1.0 / self.args.rate
+        async with httpx.AsyncClient(timeout=self.args.timeout, limits=limits) as client:
+            semaphore = asyncio.Semaphore(self.args.concurrency)
+            tasks = []
+            started = time.monotonic()
+
+            async def fire(events):
+                async with semaphore:
+                    await self.send_one(client, events)
+
+            # Open-loop arrivals: request i is due at started + i * interval regardless of responses
+            for i in range(self.args.requests):
+                delay = started + i * interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(fire(self.build_body())))
+            await asyncio.gather(*tasks)
+            return time.monotonic() - started
+
+    async def collect_replies(self) -> List[float]:
+        """จับคู่ข้อความที่ส่งกับสิ่งที่ fake LINE ได้รับ: reply ตาม replyToken, ไม่งั้น push แรกถึงผู้ใช้นั้นหลังส่ง"""
+        if not self.args.fake_line or not self.sent:
+            return []
+        deadline = time.time() + self.args.reply_wait
+        since = min(s["sent_at"] for s in self.sent)
+        async with httpx.AsyncClient(timeout=30) as client:
+            while True:
+                deliveries = (await client.get(f"{self.args.fake_line}/_fake/deliveries",
+                                               params={"since": since})).json()
+                by_token = {d["reply_token"]: d["at"] for d in deliveries if d["kind"] == "reply"}
+                pushes: Dict[str, List[float]] = {}
+                for d in deliveries:
+                    if d["kind"] == "push":
+                        pushes.setdefault(d["to"], []).append(d["at"])
+                    elif d["kind"] == "multicast":
+                        for user_id in d["to"]:
+                            pushes.setdefault(user_id, []).append(d["at"])
+                matched = sum(1 for s in self.sent if s["reply_token"] in by_token or s["user_id"] in pushes)
+                if matched >= len(self.sent) or time.time() >= deadline:
+                    break
+                await asyncio.sleep(0.5)
+
+        latencies = []
+        for s in self.sent:
+            at = by_token.get(s["reply_token"])
+            if at is None:
+                at = next((t for t in sorted(pushes.get(s["user_id"], [])) if t >= s["sent_at"]), None)
+            if at is not None:
+                latencies.append((at - s["sent_at"]) * 1000)
+        return latencies
+
+    async def backend_mode(self) -> Optional[str]:
+        base = self.args.target.rsplit("/webhook", 1)[0]
+        try:
+            async with httpx.AsyncClient(timeout=5) as client:
+                return (await client.get(f"{base}/api/metrics")).json().get("webhook_mode")
+        except Exception:
+            return None
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the LINE /webhook endpoint")
+    parser.add_argument("--target", default="http://localhost:8000/webhook")
+    parser.add_argument("--fake-line", default="http://127.0.0.1:8081",
+                        help="fake_line_server.py base URL used to measure time-to-reply ('' to skip)")
+    parser.add_argument("--secret", default=os.getenv("LINE_CHANNEL_SECRET", ""))
+    parser.add_argument("--rate", type=float, default=20.0, help="webhook requests per second")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100, help="max requests in flight")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--max-events", type=int, default=3, help="events per webhook body (1..N)")
+    parser.add_argument("--follow-ratio", type=float, default=0.03)
+    parser.add_argument("--unfollow-ratio", type=float, default=0.01)
+    parser.add_argument("--reply-wait", type=float, default=60.0, help="seconds to wait for replies after sending")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="", help="release/config label stored in the results")
+    parser.add_argument("--output", default="webhook_load_results.json")
+    args = parser.parse_args()
+    if not args.secret:
+        parser.error("LINE_CHANNEL_SECRET is not set (use --secret)")
+
+    generator = LoadGenerator(args)
+    mode = await generator.backend_mode()
+    print(f"🚀 {args.requests} webhooks at {args.rate}/s -> {args.target} (webhook mode: {mode or 'unknown'})")
+    elapsed = await generator.run()
+    reply_ms = await generator.collect_replies()
+
+    statuses = Counter(str(h["status"]) for h in generator.http)
+    errors = sum(count for status, count in statuses.items() if status != "200")
+    results = {
+        "label": args.label,
+        "git_revision": git_revision(),
+        "timestamp": datetime.now().isoformat(),
+        "webhook_mode": mode,
+        "config": {k: v for k, v in vars(args).items() if k != "secret"},
+        "duration_seconds": round(elapsed, 3),
+        "achieved_rps": round(len(generator.http) / elapsed, 2) if elapsed else None,
+        "requests": len(generator.http),
+        "events": sum(h["events"] for h in generator.http),
+        "message_events": len(generator.sent),
+        "errors": errors,
+        "error_rate": round(errors / len(generator.http), 4) if generator.http else 0.0,
+        "status_counts": dict(statuses),
+        "time_to_200_ms": percentiles([h["ms"] for h in generator.http if h["status"] == 200]),
+        "time_to_reply_ms": percentiles(reply_ms),
+        "replies_missing": len(generator.sent) - len(reply_ms) if args.fake_line else None,
+    }
+
+    print(f"\n{'metric':<16}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name in ("time_to_200_ms", "time_to_reply_ms"):
+        p = results[name]
+        print(f"{name:<16}" + "".join(f"{(p[k] if p[k] is not None else '-'):>10}" for k in ("p50", "p95", "p99", "max")))
+    print(f"\nrequests={results['requests']} errors={errors} statuses={dict(statuses)} "
+          f"rps={results['achieved_rps']} replies_missing={results['replies_missing']}")
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"📄 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ ConversationMemory - จำกัดจำนวน turns / ผู้ใช้, spill ลง SQLite แล้วโหลดกลับ, สรุป turns ที่หลุดหน้าต่าง
+และ chat_history ที่ไม่เกิน token budget
+
+รัน: python scripts/testing/test_conversation_memory.py  (หรือ pytest scripts/testing/test_conversation_memory.py)
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend")))
+
+from app.answer_cache import estimate_tokens
+from app.memory_agent.conversation import ConversationMemory
+from app.memory_agent.summarizer import ExtractiveSummarizer
+
+
+def make_memory(**kwargs):
+    path = os.path.join(tempfile.mkdtemp(prefix="conversation-test-"), "memory.db")
+    return ConversationMemory(path, **kwargs), path
+
+
+def test_only_the_last_turns_are_kept():
+    memory, _ = make_memory(max_turns=4)
+    for i in range(5):
+        memory.append_exchange("U1", f"คำถาม {i}", f"คำตอบ {i}")
+    assert [t.content for t in memory.turns("U1")] == ["คำถาม 3", "คำตอบ 3", "คำถาม 4", "คำตอบ 4"]
+
+
+def test_evicted_user_is_reloaded_from_sqlite():
+    memory, _ = make_memory(max_users=2)
+    memory.append_exchange("U1", "ลาป่วยได้กี่วัน", "60 วันทำการ")
+    memory.append_exchange("U2", "สวัสดี", "สวัสดีค่ะ")
+    memory.append_exchange("U3", "ขอบคุณ", "ยินดีค่ะ")
+    assert memory.stats()["hot_users"] == 2
+    assert [t.content for t in memory.turns("U1")] == ["ลาป่วยได้กี่วัน", "60 วันทำการ"]
+    assert memory.stats()["sqlite_loads"] == 1
+
+
+def test_memory_survives_a_restart():
+    memory, path = make_memory()
+    memory.append_exchange("U1", "ลืมรหัสผ่าน", "ติดต่อกลุ่มงานข้อมูล")
+    memory.close()
+    reopened = ConversationMemory(path)
+    assert [t.content for t in reopened.turns("U1")] == ["ลืมรหัสผ่าน", "ติดต่อกลุ่มงานข้อมูล"]
+
+
+def test_dropped_turns_are_folded_into_the_summary():
+    memory, _ = make_memory(max_turns=2, summarizer=ExtractiveSummarizer())
+    memory.append_exchange("U1", "ลาป่วยได้กี่วัน", "60 วันทำการ")
+    memory.append_exchange("U1", "ลากิจล่ะ", "45 วันทำการ")
+    assert "ลาป่วยได้กี่วัน" in memory.summary("U1")
+    roles = [role for role, _ in memory.chat_history("U1")]
+    assert roles == ["system", "human", "ai"]
+
+
+def test_chat_history_fits_the_budget_and_keeps_the_newest_turns():
+    memory, _ = make_memory(max_turns=20)
+    for i in range(10):
+        memory.append_exchange("U1", f"คำถามที่ {i} " * 10, f"คำตอบที่ {i} " * 10)
+    history = memory.chat_history("U1", budget_tokens=100)
+    assert sum(estimate_tokens(content) for _, content in history) <= 100
+    assert history[-1] == ("ai", "คำตอบที่ 9 " * 10)
+    assert memory.chat_history("U-new") == []
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ KeyedEventDispatcher - event ของผู้ใช้คนเดียวกันต้องถูกประมวลผลตามลำดับ และ handler ที่ล้มเหลวไม่หยุด lane
+
+รัน: python scripts/testing/test_event_queue.py  (หรือ pytest scripts/testing)
+"""
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend")))
+
+from app.event_queue import KeyedEventDispatcher, event_source_key
+
+
+def make_event(user_id, seq):
+    return SimpleNamespace(source=SimpleNamespace(user_id=user_id), seq=seq)
+
+
+def run_dispatcher(events, dispatch, lanes=4):
+    async def main():
+        dispatcher = KeyedEventDispatcher(dispatch, lanes=lanes)
+        await dispatcher.start()
+        for event in events:
+            await dispatcher.put(event)
+        await dispatcher.stop(timeout=10)
+        return dispatcher.stats()
+    return asyncio.run(main())
+
+
+def test_same_user_events_keep_their_order():
+    seen = {}
+    lock = threading.Lock()
+
+    def dispatch(event):
+        time.sleep(random.uniform(0, 0.003))
+        with lock:
+            seen.setdefault(event.source.user_id, []).append(event.seq)
+
+    events = [make_event(f"U{i % 5}", i // 5) for i in range(100)]
+    stats = run_dispatcher(events, dispatch)
+    assert stats["processed"] == 100
+    for user_id, seqs in seen.items():
+        assert seqs == sorted(seqs), (user_id, seqs)
+
+
+def test_failing_handler_is_counted_and_lane_keeps_going():
+    done = []
+
+    def dispatch(event):
+        if event.seq == 0:
+            raise RuntimeError("boom")
+        done.append(event.seq)
+
+    stats = run_dispatcher([make_event("U1", i) for i in range(3)], dispatch, lanes=1)
+    assert stats["failed"] == 1
+    assert stats["processed"] == 2
+    assert done == [1, 2]
+
+
+def test_source_key_falls_back_to_group_and_room():
+    assert event_source_key(SimpleNamespace(source=SimpleNamespace(user_id=None, group_id="G1"))) == "G1"
+    assert event_source_key(SimpleNamespace(source=SimpleNamespace(room_id="R1"))) == "R1"
+    assert event_source_key(SimpleNamespace()) == ""
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")
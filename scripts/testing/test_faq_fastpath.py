@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ FaqFastPath กับ backend/data/json/faq.json - ตอบทันทีเฉพาะคำถามที่ตรงกับ FAQ ชัดเจน
+รวมกรณีที่เคยตอบผิดอย่างมั่นใจ (special command, คำกว้าง ๆ เช่น "hr" / "ข้าราชการ")
+
+รัน: python scripts/testing/test_faq_fastpath.py  (หรือ pytest scripts/testing/test_faq_fastpath.py)
+"""
+import os
+import sys
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+sys.path.insert(0, backend_dir)
+
+from app.faq_fastpath import GATE_REASONS, FaqFastPath
+from app.hr_corpus import HRCorpus
+
+FAQ_PATH = os.path.join(backend_dir, "data", "json", "faq.json")
+
+
+def make_fastpath():
+    return FaqFastPath(FAQ_PATH, min_score=16, min_margin=3, corpus=HRCorpus())
+
+
+def test_clear_question_is_answered():
+    fastpath = make_fastpath()
+    decision = fastpath.evaluate("ลาป่วยได้กี่วัน")
+    assert decision.answered, decision
+    assert decision.result["id"] == "leave_001"
+    assert fastpath.answer("ลาป่วยได้กี่วัน")
+    assert fastpath.stats()["answered"] == 1
+
+
+def test_special_commands_go_to_the_agent():
+    # Regression: "ติดต่อ HR" was answered with contact_004 (score 65, margin 30)
+    fastpath = make_fastpath()
+    for command in ("ติดต่อ HR", "ติดต่อ hr ครับ", "ดาวน์โหลดแบบฟอร์ม", "แชทกับเจ้าหน้าที่"):
+        decision = fastpath.evaluate(command)
+        assert not decision.answered and decision.reason == "special_command", (command, decision.reason)
+
+
+def test_generic_questions_go_to_the_agent():
+    # Regression: "hr" / "เบอร์ติดต่อ HR" got the bot-developer FAQ, "ข้าราชการ" got rec_006
+    fastpath = make_fastpath()
+    for question in ("hr", "HR", "เบอร์ติดต่อ HR", "ข้าราชการ", "เงินเดือน", "ลูกจ้าง", "สวัสดิการ"):
+        decision = fastpath.evaluate(question)
+        assert not decision.answered and decision.reason == "too_generic", (question, decision.reason)
+
+
+def test_ungrounded_match_goes_to_the_agent():
+    # The top FAQ shares words with the question but none of its keywords/questions say "คงเหลือ"
+    decision = make_fastpath().evaluate("วันลาคงเหลือของฉันเท่าไหร่")
+    assert not decision.answered and decision.reason == "ungrounded", decision.reason
+    assert decision.reason in GATE_REASONS
+
+
+def test_rejections_are_counted_by_reason():
+    fastpath = make_fastpath()
+    for question in ("ติดต่อ HR", "hr", "วันนี้อากาศเป็นยังไง"):
+        assert fastpath.answer(question) is None
+    rejected = fastpath.stats()["rejected"]
+    assert rejected["special_command"] == 1 and rejected["too_generic"] == 1 and rejected["no_match"] == 1
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ทดสอบการแก้คำสะกดผิด (hr_corpus.fuzzy_corrections / ranked_search) กับไฟล์ใน backend/data/json
+รวมกรณีที่เคยแก้คำที่ถูกอยู่แล้วให้ผิด ("วัน" -> "กัน", "ราช" -> "ราย", "ขั้น" -> "ชั้น")
+
+รัน: python scripts/testing/test_fuzzy_corrections.py  (หรือ pytest scripts/testing/test_fuzzy_corrections.py)
+"""
+import os
+import sys
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+sys.path.insert(0, backend_dir)
+
+from app.fuzzy_index import TrigramIndex, edit_distance
+from app.hr_corpus import HRCorpus, fuzzy_corrections, letter_count
+
+FAQ_PATH = os.path.join(backend_dir, "data", "json", "faq.json")
+CULTURE_PATH = os.path.join(backend_dir, "data", "json", "culture_org.json")
+
+corpus = HRCorpus()
+
+
+def corrections(path, query):
+    snapshot = corpus.snapshot(path)
+    return [(hit.query, hit.term) for hit in fuzzy_corrections(snapshot.index, snapshot.fuzzy, query)]
+
+
+def test_typos_are_corrected():
+    assert ("ลาปวย", "ลาป่วย") in corrections(FAQ_PATH, "ลาปวยได้กี่วัน")
+    assert ("ติดต่อสรรหาา", "ติดต่อสรรหา") in corrections(FAQ_PATH, "ติดต่อสรรหาา")
+
+
+def test_correct_words_are_left_alone():
+    # Regression: short dictionary words were "corrected" into their one-letter neighbours
+    assert corrections(CULTURE_PATH, "ลาคลอดได้กี่วัน") == []
+    assert corrections(CULTURE_PATH, "เกษียณอายุราชการปีนี้") == []
+    assert corrections(FAQ_PATH, "เกษียณอายุราชการปีนี้") == []
+    assert corrections(FAQ_PATH, "ขอเลื่อนขั้น") == []
+
+
+def test_note_only_on_results_that_use_the_correction():
+    results = corpus.ranked_search(FAQ_PATH, "ลาปวยได้กี่วัน")
+    assert results[0]["id"] == "leave_001"
+    assert results[0]["fuzzy"] == [("ลาปวย", "ลาป่วย", 1)]
+    snapshot = corpus.snapshot(FAQ_PATH)
+    with_term = {doc_id for doc_id, _ in snapshot.index.postings["ลาป่วย"]}
+    ids = {snapshot.entries[doc_id].result["id"] for doc_id in with_term}
+    for result in results:
+        assert ("fuzzy" in result) == (result["id"] in ids), result["id"]
+
+
+def test_letter_count_skips_vowel_and_tone_marks():
+    assert letter_count("ขั้น") == 2
+    assert letter_count("ลาป่วย") == 5
+    assert letter_count("hr") == 2
+
+
+def test_trigram_lookup_matches_linear_scan():
+    terms = ["ลาป่วย", "ลากิจ", "ลาพักผ่อน", "เงินเดือน", "สรรหา", "บรรจุ"]
+    index = TrigramIndex(terms)
+    for query in ("ลาปวย", "ลากจ", "เงนเดือน", "สรรหาา"):
+        hit = index.lookup(query, limit=1)[0]
+        best = min(terms, key=lambda term: edit_distance(query, term))
+        assert hit.distance == edit_distance(query, best), (query, hit, best)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")
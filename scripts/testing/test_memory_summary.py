@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ MemoryManager / SummaryWorker - สรุปแบบ incremental, summarizer ที่ส่งผ่าน constructor
+และการ refresh พร้อมกันจาก tool กับ worker (เคยชน UNIQUE line_user_id และนับ message_count ซ้ำ)
+
+ใช้ฐานข้อมูล SQLite ชั่วคราว (ตั้ง DATABASE_URL ก่อน import app)
+รัน: python scripts/testing/test_memory_summary.py  (หรือ pytest scripts/testing/test_memory_summary.py)
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend")))
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="memory-test-"), "test.db")
+
+from app.crud import create_chat_message, get_conversation_summary
+from app.database import Base, SessionLocal, engine
+from app.memory_agent.memory import MemoryManager, SummaryWorker
+from app.memory_agent.summarizer import ExtractiveSummarizer
+
+Base.metadata.create_all(bind=engine)
+
+
+def add_messages(user_id, count, start=0):
+    db = SessionLocal()
+    try:
+        for i in range(start, start + count):
+            create_chat_message(db, user_id, f"ข้อความ {i}", is_from_user=i % 2 == 0)
+    finally:
+        db.close()
+
+
+def stored_summary(user_id):
+    db = SessionLocal()
+    try:
+        return get_conversation_summary(db, user_id)
+    finally:
+        db.close()
+
+
+class CountingSummarizer:
+    """summarizer จำลองที่ช้าพอให้การ refresh สองทางซ้อนกัน"""
+
+    name = "counting"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.folded = 0
+
+    def __call__(self, previous, messages):
+        time.sleep(self.delay)
+        self.folded += len(messages)
+        return f"{previous}|{len(messages)}"
+
+
+def test_refresh_folds_only_new_messages():
+    summarizer = CountingSummarizer()
+    manager = MemoryManager(summarizer, batch_size=4)
+    add_messages("U-incremental", 10)
+    assert manager.refresh_summary("U-incremental")["new_messages"] == 10
+    assert manager.refresh_summary("U-incremental")["new_messages"] == 0
+    add_messages("U-incremental", 3, start=10)
+    result = manager.refresh_summary("U-incremental")
+    assert result["new_messages"] == 3
+    assert summarizer.folded == 13
+    assert stored_summary("U-incremental").message_count == 13
+
+
+def test_summarizer_is_per_instance():
+    # Regression: the summarizer used to be a class attribute that main.py assigned into
+    custom = CountingSummarizer()
+    assert MemoryManager(custom).summarizer is custom
+    assert isinstance(MemoryManager().summarizer, ExtractiveSummarizer)
+    assert not hasattr(MemoryManager, "default_summarizer")
+
+
+def test_concurrent_refreshes_count_each_message_once():
+    # Regression: the summary tool and SummaryWorker raced on the first insert and double-counted
+    add_messages("U-race", 40)
+    managers = [MemoryManager(CountingSummarizer(delay=0.05)) for _ in range(4)]
+    errors = []
+
+    def refresh(manager):
+        try:
+            manager.refresh_summary("U-race")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=refresh, args=(manager,)) for manager in managers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert stored_summary("U-race").message_count == 40
+
+
+def test_worker_refreshes_marked_users_once():
+    add_messages("U-worker-1", 2)
+    add_messages("U-worker-2", 3)
+    worker = SummaryWorker(MemoryManager(CountingSummarizer()), batch_size=10)
+    for user_id in ("U-worker-1", "U-worker-2", "U-worker-1"):
+        worker.mark(user_id)
+    assert worker.run_once() == 2
+    stats = worker.stats()
+    assert stats["refreshed"] == 2 and stats["messages_folded"] == 5 and stats["summarizer"] == "counting"
+    assert worker.run_once() == 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")
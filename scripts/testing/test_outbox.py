@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ Outbox - ส่งตามลำดับต่อผู้รับแม้มี retry, ใช้ retry key เดิมเมื่อส่งซ้ำ และข้อความค้างถูกส่งหลัง restart
+
+รัน: python scripts/testing/test_outbox.py  (หรือ pytest scripts/testing/test_outbox.py)
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend")))
+
+from app.line_client import LineApiError
+from app.outbox import Outbox, SENT
+
+
+class FakeLineApi:
+    """LINE API จำลอง - ล้มเหลว `failures` ครั้งแรกด้วย 500"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    async def push_message(self, to, messages, retry_key=None):
+        self.calls.append((to, [m["text"] for m in messages], retry_key))
+        if self.failures > 0:
+            self.failures -= 1
+            raise LineApiError(500, "boom")
+
+    async def multicast(self, to, messages, retry_key=None):
+        self.calls.append((tuple(to), [m["text"] for m in messages], retry_key))
+
+
+def text(value):
+    return [{"type": "text", "text": value}]
+
+
+def db_path():
+    return os.path.join(tempfile.mkdtemp(prefix="outbox-test-"), "outbox.db")
+
+
+def test_order_is_kept_across_a_failed_batch():
+    api = FakeLineApi(failures=1)
+
+    async def main():
+        outbox = Outbox(api, path=db_path(), retry_delay=0.2, poll_interval=0.05, batch_size=3)
+        for i in range(7):
+            outbox.enqueue("push", "U1", text(f"m{i}"))
+        outbox.enqueue("push", "U2", text("other"))
+        await outbox.start()
+        await asyncio.sleep(0.1)
+        outbox.enqueue("push", "U1", text("late"))
+        await asyncio.sleep(1.2)
+        await outbox.stop()
+
+    asyncio.run(main())
+    first, rest = api.calls[0], api.calls[1:]
+    delivered = [t for to, texts, _ in rest if to == "U1" for t in texts]
+    assert delivered == [f"m{i}" for i in range(7)] + ["late"]
+    # The retried request reuses the retry key of the failed one, so LINE can drop a duplicate
+    retried = next(call for call in rest if call[0] == "U1")
+    assert first[2] is not None and retried[2] == first[2]
+    assert any(to == "U2" for to, _, _ in rest)
+
+
+def test_send_waits_for_delivery():
+    api = FakeLineApi()
+
+    async def main():
+        outbox = Outbox(api, path=db_path(), poll_interval=0.05)
+        await outbox.start()
+        outbox_id = await outbox.push("U1", text("hello"), timeout=5)
+        status = outbox._status(outbox_id)[0]
+        await outbox.stop()
+        return status
+
+    assert asyncio.run(main()) == SENT
+    assert [texts for _, texts, _ in api.calls] == [["hello"]]
+
+
+def test_send_before_start_is_rejected():
+    outbox = Outbox(FakeLineApi(), path=db_path())
+
+    async def main():
+        await outbox.send("push", "U1", text("x"))
+
+    try:
+        asyncio.run(main())
+    except RuntimeError:
+        return
+    raise AssertionError("send() before start() must raise")
+
+
+def test_pending_messages_survive_a_restart():
+    path = db_path()
+    Outbox(FakeLineApi(), path=path).enqueue("push", "U1", text("queued before restart"))
+    api = FakeLineApi()
+
+    async def main():
+        outbox = Outbox(api, path=path, poll_interval=0.05)
+        await outbox.start()
+        await asyncio.sleep(0.3)
+        await outbox.stop()
+
+    asyncio.run(main())
+    assert [texts for _, texts, _ in api.calls] == [["queued before restart"]]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")
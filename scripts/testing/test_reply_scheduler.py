@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ ReplyDeadlineScheduler - reply เมื่อทันอายุ token, ack แล้ว push เมื่อไม่ทัน
+และ push ผ่าน outbox โดยไม่รอให้ส่งสำเร็จ (ไม่ block worker lane ระหว่าง retry)
+
+รัน: python scripts/testing/test_reply_scheduler.py  (หรือ pytest scripts/testing/test_reply_scheduler.py)
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend")))
+
+from app.line_client import LineApiError
+from app.reply_scheduler import (ACK_THEN_PUSH, PUSH, PUSH_AFTER_REPLY_FAILED, REPLY, ReplyContext,
+                                 ReplyDeadlineScheduler)
+
+
+class FakeLineApi:
+    def __init__(self, reply_status=None):
+        self.reply_status = reply_status
+        self.calls = []
+
+    async def reply_message(self, reply_token, messages):
+        self.calls.append(("reply", reply_token))
+        if self.reply_status:
+            raise LineApiError(self.reply_status, "Invalid reply token")
+
+    async def push_message(self, user_id, messages):
+        self.calls.append(("push", user_id))
+
+
+class RecordingOutbox:
+    """outbox จำลอง - push() ที่รอผลการส่งจะค้างตลอด ถ้า scheduler ใช้ push() แทน enqueue() test จะ timeout"""
+
+    def __init__(self):
+        self.enqueued = []
+
+    def enqueue(self, kind, target, messages, record_text=None, wake=True):
+        self.enqueued.append((kind, target, messages))
+        return len(self.enqueued)
+
+    async def push(self, *args, **kwargs):
+        await asyncio.Event().wait()
+
+
+def deliver(scheduler, reply, compute):
+    return asyncio.run(asyncio.wait_for(scheduler.deliver("U1", reply, compute), timeout=2))
+
+
+async def answer_after(seconds, text="คำตอบ"):
+    await asyncio.sleep(seconds)
+    return text
+
+
+def test_fast_answer_uses_the_reply_token():
+    api = FakeLineApi()
+    scheduler = ReplyDeadlineScheduler(api, deadline=1.0)
+    assert deliver(scheduler, ReplyContext("T1", time.time()), answer_after(0)) == REPLY
+    assert api.calls == [("reply", "T1")]
+
+
+def test_slow_answer_is_acknowledged_then_handed_to_the_outbox():
+    api, outbox = FakeLineApi(), RecordingOutbox()
+    scheduler = ReplyDeadlineScheduler(api, deadline=0.05, outbox=outbox)
+    assert deliver(scheduler, ReplyContext("T1", time.time()), answer_after(0.2)) == ACK_THEN_PUSH
+    assert api.calls == [("reply", "T1")]
+    assert outbox.enqueued == [("push", "U1", "คำตอบ")]
+
+
+def test_missing_token_pushes_without_waiting_for_delivery():
+    outbox = RecordingOutbox()
+    scheduler = ReplyDeadlineScheduler(FakeLineApi(), outbox=outbox)
+    assert deliver(scheduler, ReplyContext(None), answer_after(0)) == PUSH
+    assert len(outbox.enqueued) == 1
+
+
+def test_rejected_token_falls_back_to_push():
+    api = FakeLineApi(reply_status=400)
+    scheduler = ReplyDeadlineScheduler(api, deadline=1.0)
+    assert deliver(scheduler, ReplyContext("T1", time.time()), answer_after(0)) == PUSH_AFTER_REPLY_FAILED
+    assert api.calls == [("reply", "T1"), ("push", "U1")]
+    assert scheduler.stats()["outcomes"] == {PUSH_AFTER_REPLY_FAILED: 1}
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")